@@ -1,5 +1,8 @@
 from PIL import Image, ImageDraw, ImageFont
+from concurrent.futures import ThreadPoolExecutor
 import os
+import struct
+import zlib
 
 def merge_png_images_with_config(image_paths, output_path, config_info=None, direction='horizontal', spacing=0, output_format='PNG'):
     """
@@ -468,6 +471,198 @@ def merge_with_custom_config(image_paths, output_path, config_info=None, title=N
     merged_img.save(output_path, format=output_format, **save_kwargs)
     print(f"带配置信息的合并完成，输出图片: {output_path} (格式: {output_format})")
 
+class _StreamingPNGWriter:
+    """
+    逐行写入的PNG编码器 (8位RGB)
+
+    PIL只能一次性保存整张图，这里按条带追加扫描行并流式压缩为IDAT块，
+    内存中只保留当前条带和压缩缓冲区
+    """
+
+    def __init__(self, path, width, height, compress_level=6, chunk_size=1 << 20):
+        self.file = open(path, "wb")
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self.chunk_size = chunk_size
+        self.compressor = zlib.compressobj(compress_level)
+        self.buffer = bytearray()
+        self.file.write(b"\x89PNG\r\n\x1a\n")
+        # IHDR: 宽、高、位深8、颜色类型2 (RGB)、压缩0、滤波0、隔行0
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+    def _chunk(self, kind, data):
+        self.file.write(struct.pack(">I", len(data)))
+        self.file.write(kind)
+        self.file.write(data)
+        self.file.write(struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+    def _flush(self, force=False):
+        while len(self.buffer) >= self.chunk_size or (force and self.buffer):
+            self._chunk(b"IDAT", bytes(self.buffer[:self.chunk_size]))
+            del self.buffer[:self.chunk_size]
+
+    def write_strip(self, strip):
+        """追加一个条带 (宽度与输出相同的RGB图像)"""
+        if strip.mode != "RGB":
+            strip = strip.convert("RGB")
+        if strip.width != self.width:
+            raise ValueError(f"条带宽度 {strip.width} 与输出宽度 {self.width} 不一致")
+        raw = strip.tobytes()
+        stride = self.width * 3
+        for y in range(strip.height):
+            # 每个扫描行前加滤波类型0 (None)
+            self.buffer += self.compressor.compress(b"\x00" + raw[y * stride:(y + 1) * stride])
+            self._flush()
+        self.rows_written += strip.height
+
+    def close(self):
+        if self.rows_written != self.height:
+            raise ValueError(f"写入了 {self.rows_written} 行，应为 {self.height} 行")
+        self.buffer += self.compressor.flush()
+        self._flush(force=True)
+        self._chunk(b"IEND", b"")
+        self.file.close()
+
+
+def _load_tile(path, tile_size):
+    """解码一张图片，按需缩小到 tile_size 以内，透明背景合成为白色"""
+    img = Image.open(path)
+    if tile_size:
+        img.draft("RGB", tile_size)  # JPEG等格式可以在解码时直接降采样
+        img.thumbnail(tile_size, Image.LANCZOS, reducing_gap=2.0)
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1])
+        return background
+    return img.convert("RGB")
+
+
+def merge_png_grid_streaming(image_paths, output_path, config_info=None, rows=None, cols=None,
+                             tile_size=None, spacing=0, workers=None, preview_path=None,
+                             preview_width=1200):
+    """
+    以有限内存按网格合并大量图片，同时生成用于网页预览的小图
+
+    与 merge_png_grid_with_config 不同，不会一次打开全部图片并创建整张画布:
+    先只读取图片头部确定布局，然后逐行解码 (线程池并行解码下一行)、拼接为条带
+    并流式写入PNG，内存占用约为一行图片加一个条带
+
+    参数:
+    image_paths: 图片路径列表
+    output_path: 输出PNG路径
+    config_info: 配置信息字典
+    rows: 行数（如果未指定，会自动计算）
+    cols: 列数（如果未指定，会自动计算）
+    tile_size: 每张图片缩小到的最大尺寸 (宽, 高)，None 表示保持原始分辨率
+    spacing: 图片之间的间距（像素）
+    workers: 解码线程数（默认为CPU核数）
+    preview_path: 预览图路径（默认为输出路径加 _preview.jpg，传入False不生成）
+    preview_width: 预览图宽度（像素）
+    """
+    for path in image_paths:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"图片不存在: {path}")
+    if not image_paths:
+        raise ValueError("没有有效的图片需要合并")
+
+    # 计算网格布局
+    total_images = len(image_paths)
+    if cols is None and rows is None:
+        cols = max(1, int(total_images ** 0.5))  # 默认为近似正方形布局
+        rows = (total_images + cols - 1) // cols
+    elif rows is None:
+        rows = (total_images + cols - 1) // cols
+    elif cols is None:
+        cols = (total_images + rows - 1) // rows
+
+    # 只读取图片头部获取尺寸，按缩小后的尺寸统一网格
+    sizes = []
+    for path in image_paths:
+        with Image.open(path) as img:
+            width, height = img.size
+        if tile_size:
+            scale = min(1.0, tile_size[0] / width, tile_size[1] / height)
+            width, height = max(1, round(width * scale)), max(1, round(height * scale))
+        sizes.append((width, height))
+    cell_width = max(w for w, _ in sizes)
+    cell_height = max(h for _, h in sizes)
+
+    config_height = 80 if config_info else 0
+    grid_width = cols * cell_width + spacing * (cols - 1)
+    final_height = config_height + rows * cell_height + spacing * (rows - 1)
+
+    # 预览图按比例缩小，每个条带缩小后粘贴进去
+    preview_scale = min(1.0, preview_width / grid_width)
+    preview = None
+    if preview_path is not False:
+        preview_path = preview_path or os.path.splitext(output_path)[0] + "_preview.jpg"
+        preview = Image.new(
+            "RGB",
+            (max(1, round(grid_width * preview_scale)), max(1, round(final_height * preview_scale))),
+            (255, 255, 255),
+        )
+    preview_y = 0
+
+    writer = _StreamingPNGWriter(output_path, grid_width, final_height)
+
+    def emit(strip):
+        nonlocal preview_y
+        writer.write_strip(strip)
+        if preview is not None:
+            height = max(1, round(strip.height * preview_scale))
+            small = strip.resize((preview.width, height), Image.BILINEAR, reducing_gap=2.0)
+            preview.paste(small, (0, preview_y))
+            preview_y += height
+
+    try:
+        # 配置信息条带
+        if config_info:
+            header = Image.new("RGB", (grid_width, config_height), (240, 240, 240))
+            draw = ImageDraw.Draw(header)
+            try:
+                font = ImageFont.truetype("arial.ttf", 14)
+            except:
+                try:
+                    font = ImageFont.truetype("DejaVuSans.ttf", 14)
+                except:
+                    font = ImageFont.load_default()
+            y_pos = 10
+            for key, value in config_info.items():
+                draw.text((10, y_pos), f"{key}: {value}", fill=(0, 0, 0), font=font)
+                y_pos += 20
+            emit(header)
+
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+            def submit_row(row):
+                row_paths = image_paths[row * cols:(row + 1) * cols]
+                return [executor.submit(_load_tile, path, tile_size) for path in row_paths]
+
+            pending = submit_row(0)
+            for row in range(rows):
+                futures = pending
+                # 当前行拼接写入时，后台解码下一行
+                pending = submit_row(row + 1) if row + 1 < rows else []
+                strip = Image.new("RGB", (grid_width, cell_height), (255, 255, 255))
+                for col, future in enumerate(futures):
+                    img = future.result()
+                    x = col * (cell_width + spacing) + (cell_width - img.width) // 2
+                    strip.paste(img, (x, (cell_height - img.height) // 2))
+                    img.close()
+                emit(strip)
+                if spacing and row + 1 < rows:
+                    emit(Image.new("RGB", (grid_width, spacing), (255, 255, 255)))
+        writer.close()
+    except BaseException:
+        writer.file.close()
+        raise
+
+    print(f"流式网格合并完成，输出图片: {output_path} ({grid_width}x{final_height})")
+    if preview is not None:
+        preview.save(preview_path, format="JPEG", quality=85, optimize=True)
+        print(f"预览图: {preview_path} ({preview.width}x{preview.height})")
+
 # 示例用法
 if __name__ == "__main__":
     # 示例图片路径（请替换为实际路径）
@@ -513,3 +708,13 @@ if __name__ == "__main__":
         output_format='PNG',
         config_position='top'
     )
+
+    # 大量高分辨率图表: 流式合并，缩小到统一尺寸并生成网页预览图
+    merge_png_grid_streaming(
+        image_paths,
+        "grid_merged_streaming.png",
+        config_info=config,
+        cols=2,
+        tile_size=(1600, 1000),
+        spacing=10
+    )
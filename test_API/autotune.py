@@ -0,0 +1,291 @@
+import os
+import copy
+import json
+import math
+import random
+import itertools
+from typing import Dict, Any, List, Optional
+
+from sweep import expand_values, set_path, dimension_labels, _format_value, config_hash
+from ssh_connecting import VLLMAdapter
+
+AUTOTUNE_DIR = "autotune"
+
+
+def _resolve_space_path(path: str) -> str:
+    """搜索空间中不带前缀的参数名视为 vLLM 命令行参数 (backend_config.args.xxx)"""
+    return path if "." in path else f"args.{path}"
+
+
+def goodput(
+    test_results: List[Dict[str, Any]], attempted: int, slo: Dict[str, float]
+) -> Dict[str, Any]:
+    """
+    按延迟SLO计算有效吞吐量 (goodput)
+
+    Args:
+        test_results: 成功请求的结果列表
+        attempted: 发出的请求总数 (含失败请求)
+        slo: 延迟目标，ttft 单位为秒，tpot 单位为毫秒，未设置的指标不做限制
+
+    Returns:
+        包含 goodput_tokens (满足SLO请求的输出token/秒)、goodput_requests
+        (满足SLO的请求/秒)、slo_attainment (满足SLO的请求比例) 等字段的字典
+    """
+    ttft_slo = slo.get("ttft")
+    tpot_slo = slo.get("tpot")
+
+    def meets_slo(r):
+        if ttft_slo is not None and (r.get("ttft") is None or r["ttft"] > ttft_slo):
+            return False
+        if tpot_slo is not None and (r.get("tpot") is None or r["tpot"] > tpot_slo):
+            return False
+        return True
+
+    good = [r for r in test_results if meets_slo(r)]
+
+    # 测试墙钟时间: 最早发出的请求到最晚完成的请求
+    spans = [
+        (r["timestamp"] - (r.get("total_time") or r.get("time") or 0), r["timestamp"])
+        for r in test_results
+        if r.get("timestamp") is not None
+    ]
+    wall = max(e for _, e in spans) - min(s for s, _ in spans) if spans else 0
+    tokens = sum(r.get("token_count") or 0 for r in good)
+    return {
+        "requests": attempted,
+        "succeeded": len(test_results),
+        "good": len(good),
+        "slo_attainment": len(good) / attempted if attempted else 0.0,
+        "wall_time": wall,
+        "goodput_tokens": tokens / wall if wall > 0 else 0.0,
+        "goodput_requests": len(good) / wall if wall > 0 else 0.0,
+    }
+
+
+class AutoTuner:
+    """
+    vLLM 服务参数的黑盒自动调优
+
+    在 max-num-seqs / max-num-batched-tokens / gpu-memory-utilization /
+    block-size 等启动参数组成的搜索空间中，用逐次减半 (successive halving)
+    在有限的部署次数内寻找延迟SLO下goodput最高的配置:
+
+        - 第0轮从搜索空间中随机抽取若干候选，每个候选部署一次并运行少量请求
+        - 每轮按目标指标排序，保留前 1/eta 的候选，下一轮请求轮数乘以eta
+        - 直到只剩一个候选
+
+    每次试验记录到运行目录下的 autotune/trials.jsonl，结束后输出最佳配置与
+    启动命令 (autotune/best.json、autotune/best_command.sh)。
+    """
+
+    def __init__(self, orchestrator, tune_config: Dict[str, Any]):
+        """
+        初始化自动调优器
+
+        Args:
+            orchestrator: 测试编排器 (已初始化服务管理器并创建运行目录)
+            tune_config: 调优配置，包含:
+                - base: 测试模板 (backend 必须为 vllm)，其中的 concurrency /
+                  max_tokens 决定压测负载
+                - space: {参数: 取值} 搜索空间，取值格式与 sweeps 相同；
+                  不带前缀的参数名视为 vLLM 命令行参数
+                - slo: 延迟目标 {"ttft": 秒, "tpot": 毫秒}
+                - objective: 优化目标 goodput_tokens (默认) 或 goodput_requests
+                - min_attainment: 满足SLO的请求比例低于该值的配置视为不可行 (可选，默认0)
+                - budget: 最多部署次数 (默认12)
+                - eta: 每轮淘汰比例 (默认3)
+                - min_repeat: 第0轮的请求轮数 (默认1)
+                - seed: 随机种子 (默认0)
+                - name: 试验名称前缀 (默认 autotune)
+        """
+        self.orchestrator = orchestrator
+        self.base = tune_config.get("base", {})
+        if self.base.get("backend", "vllm") != "vllm":
+            raise ValueError("自动调优只支持vllm后端")
+        self.base.setdefault("backend", "vllm")
+
+        self.space = {
+            _resolve_space_path(path): expand_values(values)
+            for path, values in tune_config.get("space", {}).items()
+        }
+        if not self.space:
+            raise ValueError("自动调优配置缺少搜索空间 space")
+        for path in self.space:
+            arg = path.split(".")[-1]
+            if path.startswith("args.") and arg not in VLLMAdapter.SUPPORTED_ARGS:
+                raise ValueError(f"vLLM参数 {arg} 不在 SUPPORTED_ARGS 中")
+        self.labels = dimension_labels(list(self.space))
+
+        self.slo = tune_config.get("slo", {})
+        self.objective = tune_config.get("objective", "goodput_tokens")
+        self.min_attainment = tune_config.get("min_attainment", 0.0)
+        self.budget = max(1, int(tune_config.get("budget", 12)))
+        self.eta = max(2, int(tune_config.get("eta", 3)))
+        self.min_repeat = max(1, int(tune_config.get("min_repeat", 1)))
+        self.seed = tune_config.get("seed", 0)
+        self.prefix = tune_config.get("name", "autotune")
+
+        self.out_dir = os.path.join(orchestrator.run_dir, AUTOTUNE_DIR)
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.trials_path = os.path.join(self.out_dir, "trials.jsonl")
+        self.trials: List[Dict[str, Any]] = []
+        self.deployments = 0
+        self.finished = self._load_trials()
+
+    def _load_trials(self) -> Dict[str, Dict[str, Any]]:
+        """读取已有的试验记录 (续跑时跳过已完成的试验)"""
+        finished = {}
+        if os.path.exists(self.trials_path):
+            with open(self.trials_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        trial = json.loads(line)
+                    except ValueError:
+                        continue
+                    finished[trial["name"]] = trial
+        if finished:
+            print(f"已加载 {len(finished)} 个已完成的调优试验")
+        return finished
+
+    def _deployments_needed(self, n: int) -> int:
+        """n 个初始候选在逐次减半中需要的部署次数"""
+        total = 0
+        while True:
+            total += n
+            if n == 1:
+                return total
+            n = max(1, math.ceil(n / self.eta))
+
+    def _sample_candidates(self) -> List[Dict[str, Any]]:
+        """在部署预算内抽取尽量多的初始候选"""
+        size = 1
+        for values in self.space.values():
+            size *= len(values)
+        n = min(size, self.budget)
+        while n > 1 and self._deployments_needed(n) > self.budget:
+            n -= 1
+
+        paths = list(self.space)
+        rng = random.Random(self.seed)
+        if size <= 10000:
+            combos = list(itertools.product(*self.space.values()))
+            picked = rng.sample(combos, n)
+        else:
+            seen, picked = set(), []
+            while len(picked) < n:
+                combo = tuple(rng.choice(values) for values in self.space.values())
+                if combo not in seen:
+                    seen.add(combo)
+                    picked.append(combo)
+        print(f"搜索空间共 {size} 个配置，在 {self.budget} 次部署预算内评估 {n} 个初始候选")
+        return [dict(zip(paths, combo)) for combo in picked]
+
+    def _make_test(self, candidate: Dict[str, Any], rung: int, repeat: int) -> Dict[str, Any]:
+        test = copy.deepcopy(self.base)
+        for path, value in candidate.items():
+            set_path(test, path, value)
+        test["repeat"] = repeat
+        test["sweep"] = {self.labels[path]: value for path, value in candidate.items()}
+        test["name"] = "__".join(
+            [self.prefix, f"rung={rung}"]
+            + [f"{self.labels[path]}={_format_value(value)}" for path, value in candidate.items()]
+        )
+        test["config_hash"] = config_hash(test)
+        return test
+
+    def _score(self, trial: Dict[str, Any]) -> float:
+        if not trial.get("success") or trial["slo_attainment"] < self.min_attainment:
+            return -1.0
+        return trial[self.objective]
+
+    def _evaluate(self, candidate: Dict[str, Any], rung: int, repeat: int) -> Dict[str, Any]:
+        """部署候选配置并运行压测，返回试验记录"""
+        test = self._make_test(candidate, rung, repeat)
+        self.deployments += 1
+        if test["name"] in self.finished:
+            print(f"\n跳过已完成的调优试验: {test['name']}")
+            return self.finished[test["name"]]
+
+        print(f"\n[调优 第{rung}轮 {self.deployments}/{self.budget}] {test['name']}")
+        result = self.orchestrator.run_test(test)
+        result["sweep"] = test["sweep"]
+        result["config_hash"] = test["config_hash"]
+        self.orchestrator.add_result(result)
+        self.orchestrator.save_results()
+
+        attempted = repeat * len(self.orchestrator.config.get_prompts())
+        trial = {
+            "name": test["name"],
+            "rung": rung,
+            "repeat": repeat,
+            "candidate": candidate,
+            "config_hash": test["config_hash"],
+            "success": bool(result.get("success")),
+            "error": result.get("error"),
+            **goodput(result.get("test_results", []), attempted, self.slo),
+            "summary": result.get("summary", {}),
+            "cold_start": (result.get("cold_start") or {}).get("total"),
+        }
+        with open(self.trials_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(trial, ensure_ascii=False, default=str) + "\n")
+        print(
+            f"试验结果: goodput {trial['goodput_tokens']:.2f} tokens/s, "
+            f"{trial['goodput_requests']:.3f} 请求/秒, SLO达成率 {trial['slo_attainment']:.1%}"
+        )
+        return trial
+
+    def run(self) -> Optional[Dict[str, Any]]:
+        """
+        执行逐次减半搜索
+
+        Returns:
+            最佳试验记录 (附带 launch_command)，没有可行配置时返回None
+        """
+        survivors = self._sample_candidates()
+        rung, repeat = 0, self.min_repeat
+        while True:
+            trials = [self._evaluate(c, rung, repeat) for c in survivors]
+            self.trials.extend(trials)
+            ranked = sorted(trials, key=self._score, reverse=True)
+            keep = max(1, math.ceil(len(ranked) / self.eta))
+            if len(survivors) == 1 or self.deployments + keep > self.budget:
+                break
+            survivors = [t["candidate"] for t in ranked[:keep]]
+            print(f"\n第{rung}轮结束，保留 {keep} 个候选: {[t['name'] for t in ranked[:keep]]}")
+            rung += 1
+            repeat *= self.eta
+
+        # 最佳配置取最高一轮 (请求最多、估计最可靠) 中得分最高的试验
+        top_rung = max(t["rung"] for t in self.trials)
+        best = max((t for t in self.trials if t["rung"] == top_rung), key=self._score)
+        if self._score(best) < 0:
+            print("\n没有满足SLO的可行配置")
+            return None
+        return self._write_best(best)
+
+    def _write_best(self, best: Dict[str, Any]) -> Dict[str, Any]:
+        """输出最佳配置与对应的vLLM启动命令"""
+        backend_config = self._make_test(best["candidate"], best["rung"], best["repeat"])[
+            "backend_config"
+        ]
+        adapter = self.orchestrator.service_manager.adapters["vllm"]
+        command = adapter.build_command(backend_config)
+        if backend_config.get("gpu_ids"):
+            command = f"CUDA_VISIBLE_DEVICES={','.join(map(str, backend_config['gpu_ids']))} {command}"
+
+        best = dict(best, launch_command=command, backend_config=backend_config, slo=self.slo)
+        with open(os.path.join(self.out_dir, "best.json"), "w", encoding="utf-8") as f:
+            json.dump(best, f, indent=2, ensure_ascii=False, default=str)
+        with open(os.path.join(self.out_dir, "best_command.sh"), "w", encoding="utf-8") as f:
+            f.write("#!/bin/bash\n" + command + "\n")
+
+        print("\n自动调优完成:")
+        print(f"部署次数: {self.deployments}, 试验次数: {len(self.trials)}")
+        print(f"最佳配置: {best['candidate']}")
+        print(
+            f"goodput: {best['goodput_tokens']:.2f} tokens/s, SLO达成率 {best['slo_attainment']:.1%}"
+        )
+        print(f"启动命令: {command}")
+        print(f"试验记录: {self.trials_path}")
+        return best
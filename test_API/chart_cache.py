@@ -0,0 +1,115 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+from typing import Dict, Any
+
+INDEX_FILE = "index.json"
+
+
+def chart_key(spec: Dict[str, Any], version: str = "") -> str:
+    """图表的缓存键：图表数据与绘图选项的内容哈希 (不含输出路径)"""
+    content = {k: v for k, v in spec.items() if k != "path"}
+    content["_version"] = version
+    data = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+class ChartCache:
+    """
+    按内容哈希缓存已渲染的图表
+
+    图表规格 (数据切片 + 绘图选项) 没有变化时直接复制缓存中的PNG，只重新渲染
+    输入变化的图表。缓存总大小超过上限时按最近最少使用 (LRU) 淘汰。
+    """
+
+    def __init__(self, cache_dir: str, max_mb: float = 512, version: str = ""):
+        """
+        初始化图表缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_mb: 缓存大小上限 (MB)
+            version: 渲染代码版本，绘图逻辑变化后旧缓存自动失效
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.version = version
+        self.index_path = os.path.join(cache_dir, INDEX_FILE)
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index: Dict[str, Dict[str, Any]] = self._load_index()
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            print(f"图表缓存索引损坏，重建: {self.index_path}")
+            return {}
+        # 丢弃文件已不存在的条目
+        return {k: v for k, v in index.items() if os.path.exists(self._entry_path(k))}
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def key(self, spec: Dict[str, Any]) -> str:
+        return chart_key(spec, self.version)
+
+    def restore(self, spec: Dict[str, Any]) -> bool:
+        """
+        缓存命中时把图表复制到输出路径
+
+        Returns:
+            命中返回True，需要重新渲染返回False
+        """
+        key = self.key(spec)
+        entry = self.index.get(key)
+        if entry is None:
+            self.misses += 1
+            return False
+        try:
+            shutil.copyfile(self._entry_path(key), spec["path"])
+        except OSError:
+            del self.index[key]
+            self.misses += 1
+            return False
+        entry["last_used"] = time.time()
+        self.hits += 1
+        return True
+
+    def store(self, spec: Dict[str, Any]):
+        """把新渲染的图表加入缓存"""
+        if not os.path.exists(spec["path"]):
+            return
+        key = self.key(spec)
+        entry_path = self._entry_path(key)
+        tmp_path = entry_path + ".tmp"
+        shutil.copyfile(spec["path"], tmp_path)
+        os.replace(tmp_path, entry_path)
+        self.index[key] = {"size": os.path.getsize(entry_path), "last_used": time.time()}
+
+    def _evict(self):
+        """超过大小上限时淘汰最近最少使用的条目"""
+        total = sum(e["size"] for e in self.index.values())
+        for key, entry in sorted(self.index.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._entry_path(key))
+            except OSError:
+                pass
+            total -= entry["size"]
+            del self.index[key]
+
+    def save(self):
+        """淘汰超限条目并写回索引"""
+        self._evict()
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
@@ -0,0 +1,145 @@
+import os
+import json
+import hashlib
+import time
+import threading
+from typing import Dict, Any, List, Set, Tuple
+
+from records import REQUEST_FIELDS
+
+CHECKPOINT_FILE = "checkpoint.ndjson"
+
+
+def request_metrics(result: Dict[str, Any]) -> Dict[str, Any]:
+    """检查点只保存请求的数值指标 (不含提示词与生成文本)"""
+    metrics = {"success": bool(result.get("success"))}
+    for field in REQUEST_FIELDS:
+        if result.get(field) is not None:
+            metrics[field] = result[field]
+    return metrics
+
+
+def test_key(test_config: Dict[str, Any], prompts: List[str], max_tokens: int) -> str:
+    """
+    测试的检查点标识：名称 + 影响结果的配置内容哈希
+
+    repeat 不参与哈希，续跑时增加轮数可以复用已完成的轮次；
+    提示词或最大token数变化后，旧的检查点不再匹配
+    """
+    content = {
+        k: v for k, v in test_config.items() if k not in ("name", "repeat", "sweep", "config_hash")
+    }
+    content["_prompts"] = prompts
+    content["_max_tokens"] = test_config.get("max_tokens", max_tokens)
+    data = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+    digest = hashlib.sha1(data.encode("utf-8")).hexdigest()[:12]
+    return f"{test_config.get('name', 'unnamed_test')}#{digest}"
+
+
+class RunCheckpoint:
+    """
+    测试运行的检查点，记录到运行目录下的 checkpoint.ndjson
+
+    每完成一个请求 (测试, 轮次, 提示词) 追加一行只含数值指标的记录，测试全部完成后再追加一行
+    完成标记。文件只追加不改写，并保持打开: 请求记录每隔 flush_interval 秒刷新一次，
+    完成标记写入时才同步到磁盘，请求线程不会因等待磁盘同步而降低发出的负载。
+    进程中断时最多丢失最近 flush_interval 秒内完成的请求 (续跑时重新发送)。
+    """
+
+    def __init__(self, run_dir: str, flush_interval: float = 5.0):
+        self.path = os.path.join(run_dir, CHECKPOINT_FILE)
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self._file = None
+        self._last_flush = time.time()
+        self.requests: Dict[str, Dict[Tuple[int, int], Dict[str, Any]]] = {}
+        self.done_tests: Set[str] = set()
+        self.done_names: Set[str] = set()
+        self._load()
+
+    def _load(self):
+        """读取已有的检查点记录"""
+        if not os.path.exists(self.path):
+            return
+        count = 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # 中断时未写完的行
+                if record.get("type") == "request":
+                    slot = (record["round"], record["prompt_id"])
+                    # 旧版检查点保存了完整的结果，加载时同样只保留数值指标
+                    self.requests.setdefault(record["test"], {})[slot] = request_metrics(record["result"])
+                    count += 1
+                elif record.get("type") == "test_done":
+                    self.done_tests.add(record["test"])
+                    self.done_names.add(record["name"])
+        print(f"已加载检查点: {len(self.done_tests)} 个已完成测试，{count} 个已完成请求")
+
+    def _open(self):
+        """打开检查点文件用于追加 (调用方持有锁)"""
+        if self._file is None:
+            # 上次中断时未写完的行不能与新记录连在一起
+            partial = False
+            if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                with open(self.path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    partial = f.read(1) != b"\n"
+            self._file = open(self.path, "a", encoding="utf-8")
+            if partial:
+                self._file.write("\n")
+        return self._file
+
+    def _append(self, record: Dict[str, Any], sync: bool = False):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self.lock:
+            f = self._open()
+            f.write(line + "\n")
+            now = time.time()
+            if sync or now - self._last_flush >= self.flush_interval:
+                f.flush()
+                self._last_flush = now
+            if sync:
+                os.fsync(f.fileno())
+
+    def record_request(self, key: str, result: Dict[str, Any]):
+        """记录一个成功完成的请求"""
+        slot = (result["round"], result["prompt_id"])
+        metrics = request_metrics(result)
+        with self.lock:
+            self.requests.setdefault(key, {})[slot] = metrics
+        self._append(
+            {
+                "type": "request",
+                "test": key,
+                "round": result["round"],
+                "prompt_id": result["prompt_id"],
+                "result": metrics,
+            }
+        )
+
+    def mark_test_done(self, key: str, name: str):
+        """记录测试已完成且结果已保存，连同之前的请求记录一起同步到磁盘"""
+        with self.lock:
+            self.done_tests.add(key)
+            self.done_names.add(name)
+        self._append({"type": "test_done", "test": key, "name": name}, sync=True)
+
+    def close(self):
+        """刷新并关闭检查点文件 (运行结束或中断时调用)"""
+        with self.lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+
+    def is_test_done(self, key: str) -> bool:
+        return key in self.done_tests
+
+    def completed_requests(self, key: str) -> Dict[Tuple[int, int], Dict[str, Any]]:
+        """测试中已完成的请求: (轮次, 提示词序号) -> 结果"""
+        with self.lock:
+            return dict(self.requests.get(key, {}))
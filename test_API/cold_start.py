@@ -0,0 +1,231 @@
+import re
+import shlex
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+# vLLM日志行格式，例如:
+#   INFO 06-18 10:02:52 [loader.py:458] Loading weights took 6.34 seconds
+#   (VllmWorker rank=0 pid=123) INFO 06-18 10:02:52 [gpu_model_runner.py:1347] Model loading took ...
+VLLM_LOG_LINE = re.compile(
+    r"(?P<level>DEBUG|INFO|WARNING|ERROR|CRITICAL)\s+"
+    r"(?P<ts>\d{2}-\d{2} \d{2}:\d{2}:\d{2})(?:\.\d+)?\s+"
+    r"\[?(?P<source>[\w.]+:\d+)\]\s+(?P<message>.*)"
+)
+
+# 启动阶段标记: (事件名, 正则, 上报耗时所在的分组序号)
+VLLM_STARTUP_MARKERS = [
+    ("weights_start", re.compile(r"Starting to load model"), None),
+    ("weights_done", re.compile(r"Model loading took [\d.]+ ?GiB and ([\d.]+) seconds"), 1),
+    ("weights_done", re.compile(r"Loading weights took ([\d.]+) seconds"), 1),
+    ("weights_done", re.compile(r"Loading model weights took [\d.]+ ?GB"), None),
+    ("kv_cache", re.compile(r"# GPU blocks: \d+|GPU KV cache size: [\d,]+ tokens"), None),
+    ("graph_start", re.compile(r"Capturing (?:cudagraphs|the model for CUDA graphs|CUDA graph)"), None),
+    ("graph_done", re.compile(r"Graph capturing finished in ([\d.]+) secs"), 1),
+    ("engine_ready", re.compile(r"init engine \(profile, create kv cache, warmup model\) took ([\d.]+) seconds"), 1),
+]
+
+
+def parse_server_time(text: str) -> Optional[datetime]:
+    """解析 `date '+%Y-%m-%d %H:%M:%S.%N'` 的输出"""
+    text = text.strip()
+    if not text:
+        return None
+    if "." in text:
+        text = text[: text.index(".") + 7]  # 纳秒截断为微秒
+    for fmt in ("%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S"):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+class VLLMStartupParser:
+    """逐行解析vLLM日志中的启动阶段事件，供增量读取日志时使用"""
+
+    def __init__(self, launch_time: Optional[datetime] = None):
+        """
+        Args:
+            launch_time: 启动命令执行时的服务器本地时间 (可选)，
+                提供时事件偏移量相对于启动时刻，否则相对于第一条带时间戳的日志
+        """
+        self.origin = launch_time
+        self.events: List[Dict[str, Any]] = []
+
+    def feed(self, line: str) -> Optional[Dict[str, Any]]:
+        """
+        解析一行日志
+
+        Returns:
+            该行对应的启动阶段事件，不是启动事件时返回None
+        """
+        match = VLLM_LOG_LINE.search(line)
+        if not match:
+            return None
+
+        year = self.origin.year if self.origin else datetime.now().year
+        ts = datetime.strptime(f"{year}-{match.group('ts')}", "%Y-%m-%d %H:%M:%S")
+        if self.origin is None:
+            self.origin = ts
+        if not self.events:
+            self.events.append(
+                {"event": "first_log", "offset": (ts - self.origin).total_seconds(), "line": line.strip()}
+            )
+
+        message = match.group("message")
+        for event, pattern, group in VLLM_STARTUP_MARKERS:
+            marker = pattern.search(message)
+            if marker:
+                record = {"event": event, "offset": (ts - self.origin).total_seconds(), "line": line.strip()}
+                if group is not None:
+                    record["reported"] = float(marker.group(group))
+                self.events.append(record)
+                return record
+        return None
+
+
+def parse_vllm_startup_events(log_text: str, launch_time: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    从vLLM日志中提取启动阶段事件
+
+    Args:
+        log_text: 日志内容
+        launch_time: 启动命令执行时的服务器本地时间 (可选)
+
+    Returns:
+        事件列表，每项包含 event / offset (秒) / reported (日志中上报的耗时，可选) / line
+    """
+    parser = VLLMStartupParser(launch_time)
+    for line in log_text.splitlines():
+        parser.feed(line)
+    return parser.events
+
+
+def summarize_vllm_phases(events: List[Dict[str, Any]], total_time: float) -> Dict[str, Any]:
+    """
+    把启动事件汇总为各阶段耗时
+
+    日志时间戳只有秒级精度，日志中上报了耗时的阶段优先使用上报值
+    """
+    first = {}
+    for record in events:
+        first.setdefault(record["event"], record)
+
+    def offset(name):
+        return first[name]["offset"] if name in first else None
+
+    phases = {}
+    if "first_log" in first:
+        phases["process_start"] = offset("first_log")
+
+    if "weights_done" in first:
+        if "reported" in first["weights_done"]:
+            phases["weight_loading"] = first["weights_done"]["reported"]
+        else:
+            start = offset("weights_start")
+            if start is None:
+                start = offset("first_log") or 0.0
+            phases["weight_loading"] = offset("weights_done") - start
+
+    if "kv_cache" in first and "weights_done" in first:
+        phases["kv_cache_allocation"] = max(0.0, offset("kv_cache") - offset("weights_done"))
+
+    if "graph_done" in first:
+        if "reported" in first["graph_done"]:
+            phases["cuda_graph_capture"] = first["graph_done"]["reported"]
+        elif "graph_start" in first:
+            phases["cuda_graph_capture"] = offset("graph_done") - offset("graph_start")
+
+    engine_offsets = [r["offset"] for r in events if r["event"] != "first_log"]
+    if engine_offsets and total_time is not None:
+        phases["api_ready"] = max(0.0, total_time - max(engine_offsets))
+
+    return {k: round(v, 3) for k, v in phases.items()}
+
+
+def parse_ollama_load(response: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    解析Ollama /api/generate 响应中的加载耗时
+
+    Ollama以纳秒为单位返回 load_duration / total_duration
+    """
+    phases = {}
+    if response.get("load_duration") is not None:
+        phases["weight_loading"] = round(response["load_duration"] / 1e9, 3)
+    if response.get("total_duration") is not None:
+        phases["load_request_total"] = round(response["total_duration"] / 1e9, 3)
+    return phases
+
+
+class PageCacheController:
+    """
+    模型文件页缓存控制，用于区分冷启动与热启动
+
+    支持的模式:
+        - drop: 启动前把模型文件逐出页缓存 (冷启动)
+        - warm: 启动前把模型文件读入页缓存 (热启动)
+        - drop_all: 清空整个系统页缓存 (需要免密sudo)
+    """
+
+    MODES = ["drop", "warm", "drop_all"]
+
+    def __init__(self, ssh_manager):
+        self.ssh = ssh_manager
+
+    def _has_tool(self, tool: str) -> bool:
+        code, _, _ = self.ssh.execute_command(f"command -v {tool}")
+        return code == 0
+
+    def apply(self, mode: str, paths: List[str]) -> bool:
+        """
+        对模型文件执行页缓存操作
+
+        Args:
+            mode: drop / warm / drop_all
+            paths: 模型文件或目录列表
+
+        Returns:
+            成功返回True，否则返回False
+        """
+        if mode not in self.MODES:
+            print(f"不支持的页缓存模式: {mode}，可选: {self.MODES}")
+            return False
+
+        if mode == "drop_all":
+            code, _, err = self.ssh.execute_command(
+                "sync && echo 3 | sudo -n tee /proc/sys/vm/drop_caches > /dev/null", timeout=120
+            )
+            if code != 0:
+                print(f"清空系统页缓存失败 (需要免密sudo): {err}")
+                return False
+            print("已清空系统页缓存")
+            return True
+
+        existing = []
+        for path in paths:
+            code, _, _ = self.ssh.execute_command(f"test -e {shlex.quote(path)}")
+            if code == 0:
+                existing.append(shlex.quote(path))
+        if not existing:
+            print(f"未找到模型文件，跳过页缓存操作: {paths}")
+            return False
+
+        targets = " ".join(existing)
+        if self._has_tool("vmtouch"):
+            flag = "-e" if mode == "drop" else "-t"
+            cmd = f"vmtouch -q {flag} {targets}"
+        elif mode == "drop":
+            # GNU dd 的 iflag=nocache + count=0 会通知内核丢弃整个文件的缓存
+            cmd = (
+                f"find -L {targets} -type f -exec "
+                "dd if={} iflag=nocache count=0 status=none \\;"
+            )
+        else:
+            cmd = f"find -L {targets} -type f -exec cat {{}} + > /dev/null"
+
+        code, _, err = self.ssh.execute_command(cmd, timeout=1800)
+        if code != 0:
+            print(f"页缓存操作 {mode} 失败: {err}")
+            return False
+        print(f"已对模型文件执行页缓存操作: {mode}")
+        return True
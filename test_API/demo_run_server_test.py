@@ -1,10 +1,12 @@
-import paramiko
 import json
 import time
 import sys
 import requests
 import threading
 
+from ssh_connecting import SSHManager
+from log_follower import LogFollower
+
 
 def load_config(config_path="config.json"):
     """加载JSON配置文件"""
@@ -14,29 +16,7 @@ def load_config(config_path="config.json"):
         return json.load(f)
 
 
-def connect_ssh(ssh_config):
-    client = paramiko.SSHClient()
-    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-    if ssh_config.get("key_path"):
-        client.connect(
-            hostname=ssh_config["hostname"],
-            username=ssh_config["username"],
-            key_filename=ssh_config["key_path"],
-            port=ssh_config.get("port", 22),
-        )
-    else:
-        client.connect(
-            hostname=ssh_config["hostname"],
-            username=ssh_config["username"],
-            password=ssh_config["password"],
-            port=ssh_config.get("port", 22),
-        )
-
-    return client
-
-
-def start_vllm_service(ssh_client, test_config):
+def start_vllm_service(ssh_manager, test_config):
     backend_config = test_config["backend_config"]
     model_path = backend_config["model_path"]
     tp_size = backend_config["tensor_parallel_size"]
@@ -55,7 +35,7 @@ def start_vllm_service(ssh_client, test_config):
 
     # 使用screen在后台运行服务，但保留输出
     screen_cmd = f"screen -L -Logfile vllm_log.txt -dmS vllm_service bash -c '{cmd}'"
-    stdin, stdout, stderr = ssh_client.exec_command(screen_cmd)
+    stdin, stdout, stderr = ssh_manager.client.exec_command(screen_cmd)
 
     # 等待screen会话启动
     time.sleep(2)
@@ -70,16 +50,16 @@ def start_vllm_service(ssh_client, test_config):
     max_wait_time = 300
     start_time = time.time()
 
-    while not service_ready and (time.time() - start_time) < max_wait_time:
-        # 读取日志文件
-        stdin, stdout, stderr = ssh_client.exec_command("cat vllm_log.txt")
-        log_content = stdout.read().decode()
+    # 只读取上次轮询之后新增的日志
+    follower = LogFollower(ssh_manager, "vllm_log.txt")
 
-        # 打印最新的日志内容
-        print(log_content)
+    while not service_ready and (time.time() - start_time) < max_wait_time:
+        # 打印新增的日志内容
+        for line in follower.poll() or []:
+            print(line)
 
         # 检查是否包含服务启动完成的标志
-        if "Application startup complete" in log_content:
+        if follower.parser.ready:
             service_ready = True
             print("\n✅ VLLM service is now ready!")
             break
@@ -87,6 +67,7 @@ def start_vllm_service(ssh_client, test_config):
         # 等待一段时间再检查
         time.sleep(10)
 
+    follower.close()
     if not service_ready:
         print("\n❌ Timeout waiting for VLLM service to start.")
         return False
@@ -119,10 +100,13 @@ try:
     test_config = config["tests"][0]  # 使用第一个测试配置
 
     print(f"Connecting to {ssh_config['hostname']}...")
-    ssh_client = connect_ssh(ssh_config)
+    ssh_manager = SSHManager(ssh_config)
+    if not ssh_manager.connect():
+        raise ConnectionError("SSH connection failed")
+    ssh_client = ssh_manager.client
     print("Connected successfully!")
 
-    success = start_vllm_service(ssh_client, test_config)
+    success = start_vllm_service(ssh_manager, test_config)
 
     if success:
         print("\nVLLM service is fully operational and API is accessible.")
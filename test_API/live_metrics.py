@@ -0,0 +1,448 @@
+import sys
+import json
+import time
+import threading
+import itertools
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Callable, Optional
+
+# 实时看板页面：每秒请求一次 /api/live 并刷新
+DASHBOARD_HTML = """<!DOCTYPE html>
+<html lang="zh">
+<head>
+<meta charset="utf-8">
+<title>InferMatrix 实时监控</title>
+<style>
+body { font-family: sans-serif; margin: 24px; background: #f7f7f7; }
+h1 { font-size: 20px; }
+#test { color: #555; margin-bottom: 16px; }
+.grid { display: grid; grid-template-columns: repeat(4, 200px); gap: 12px; }
+.card { background: #fff; border-radius: 6px; padding: 12px; box-shadow: 0 1px 3px #ccc; }
+.label { color: #888; font-size: 12px; }
+.value { font-size: 24px; margin-top: 4px; }
+.alert { color: #c00; }
+button { margin-top: 16px; padding: 8px 16px; }
+</style>
+</head>
+<body>
+<h1>InferMatrix 实时监控</h1>
+<div id="test">等待测试开始...</div>
+<div class="grid" id="cards"></div>
+<button onclick="skip()">中止当前测试</button>
+<div id="status"></div>
+<script>
+const CARDS = [
+  ["tokens_per_s", "tokens/s", 1], ["requests_per_s", "请求/s", 2], ["in_flight", "进行中请求", 0],
+  ["error_rate", "错误率", -1], ["ttft_p50", "TTFT P50 (s)", 3], ["ttft_p95", "TTFT P95 (s)", 3],
+  ["itl_p50", "ITL P50 (ms)", 1], ["itl_p95", "ITL P95 (ms)", 1],
+  ["completed", "已完成请求", 0], ["errors", "失败请求", 0],
+  ["gpu_kv_cache_usage", "GPU KV cache (%)", 1], ["running", "后端运行/等待", null],
+];
+function fmt(value, digits) {
+  if (value === null || value === undefined) return "-";
+  if (digits === -1) return (value * 100).toFixed(1) + "%";
+  return Number(value).toFixed(digits);
+}
+async function refresh() {
+  try {
+    const s = await (await fetch("/api/live")).json();
+    document.getElementById("test").textContent = s.test
+      ? `测试: ${s.test} (${s.backend}, 并发 ${s.concurrency}) 已运行 ${s.elapsed.toFixed(0)} 秒，窗口 ${s.window} 秒`
+      : "等待测试开始...";
+    const telemetry = s.telemetry || {};
+    document.getElementById("cards").innerHTML = CARDS.map(([key, label, digits]) => {
+      let value;
+      if (key === "running") value = telemetry.running === undefined ? "-" : `${telemetry.running} / ${telemetry.waiting}`;
+      else if (key === "gpu_kv_cache_usage") value = fmt(telemetry[key], digits);
+      else value = fmt(s[key], digits);
+      return `<div class="card"><div class="label">${label}</div><div class="value">${value}</div></div>`;
+    }).join("");
+    document.getElementById("status").innerHTML = s.skip_reason
+      ? `<p class="alert">已请求中止: ${s.skip_reason}</p>` : "";
+  } catch (e) {
+    document.getElementById("status").innerHTML = `<p class="alert">连接断开</p>`;
+  }
+}
+async function skip() {
+  await fetch("/api/skip", {method: "POST"});
+  refresh();
+}
+setInterval(refresh, 1000);
+refresh();
+</script>
+</body>
+</html>
+"""
+
+
+class MetricsHub:
+    """
+    请求事件总线
+
+    测试器、编排器与后端日志跟踪把事件发布到总线，实时看板、指标导出等订阅者
+    同步接收。没有订阅者时发布直接返回，不影响测试本身的计时。
+
+    事件类型 (每个事件都带有 type / t (时间戳) / thread (发布线程)):
+        - test_start: test, backend, concurrency, config
+        - test_end: test, success
+        - request_start: id
+        - connect: id, status (收到响应头)
+        - first_byte: id (收到首个数据块)
+        - token: id (收到一个内容块)
+        - request_end: id, success, ttft, tpot, token_count, error
+        - backend: backend, event (deploy / ready / deploy_failed / reused / stopped)，ready 附带冷启动指标
+        - telemetry: 后端周期性统计，如 gpu_kv_cache_usage / running / waiting
+        - warmup: test, event (start / end)，end 附带预热摘要；预热请求本身不发布请求事件
+    """
+
+    def __init__(self):
+        self.subscribers: List[Callable[[Dict[str, Any]], None]] = []
+        self._ids = itertools.count(1)
+        self._skip = threading.Event()
+        self.skip_reason = None
+
+    @property
+    def active(self) -> bool:
+        return bool(self.subscribers)
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        self.subscribers = self.subscribers + [callback]
+
+    def unsubscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        self.subscribers = [s for s in self.subscribers if s is not callback]
+
+    def next_request_id(self) -> int:
+        return next(self._ids)
+
+    def publish(self, event_type: str, t: float = None, **fields):
+        """发布一个事件，订阅者异常不会影响测试"""
+        subscribers = self.subscribers
+        if not subscribers:
+            return
+        event = {"type": event_type, "t": t if t is not None else time.time(), "thread": threading.get_ident()}
+        event.update(fields)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"事件订阅者处理 {event_type} 失败: {e}")
+
+    def request_skip(self, reason: str = "手动中止"):
+        """请求中止当前测试，编排器在发出下一个请求前检查"""
+        if not self._skip.is_set():
+            self.skip_reason = reason
+            self._skip.set()
+            print(f"\n已请求中止当前测试: {reason}")
+
+    def skip_requested(self) -> bool:
+        return self._skip.is_set()
+
+    def clear_skip(self):
+        self._skip.clear()
+        self.skip_reason = None
+
+
+def _percentile(values: List[float], p: float) -> Optional[float]:
+    """最近秩百分位，values 需已排序"""
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, int(round(p / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+class LiveWindow:
+    """
+    滑动窗口内的实时指标
+
+    按秒分桶累计token数，TTFT与ITL (相邻内容块的间隔) 保存最近窗口内的样本，
+    快照时再排序求百分位，每个token事件只做一次加锁与追加。
+    """
+
+    def __init__(self, window: float = 30.0, max_samples: int = 100000):
+        """
+        Args:
+            window: 滑动窗口长度 (秒)
+            max_samples: 窗口内最多保留的ITL样本数
+        """
+        self.window = window
+        self.lock = threading.Lock()
+        self.token_buckets: deque = deque()  # [秒, token数]
+        self.itl: deque = deque(maxlen=max_samples)  # (时间, 间隔毫秒)
+        self.finished: deque = deque()  # (时间, 是否成功, ttft)
+        self.last_token: Dict[int, float] = {}  # 请求id -> 上一个内容块时间
+        self.in_flight = set()
+        self.telemetry: Dict[str, Any] = {}
+        self.test: Dict[str, Any] = {}
+        self.completed = 0
+        self.errors = 0
+
+    def on_event(self, event: Dict[str, Any]):
+        kind = event["type"]
+        t = event["t"]
+        with self.lock:
+            if kind == "token":
+                second = int(t)
+                if self.token_buckets and self.token_buckets[-1][0] == second:
+                    self.token_buckets[-1][1] += 1
+                else:
+                    self.token_buckets.append([second, 1])
+                previous = self.last_token.get(event["id"])
+                if previous is not None:
+                    self.itl.append((t, (t - previous) * 1000))
+                self.last_token[event["id"]] = t
+            elif kind == "request_start":
+                self.in_flight.add(event["id"])
+            elif kind == "request_end":
+                self.in_flight.discard(event.get("id"))
+                self.last_token.pop(event.get("id"), None)
+                success = bool(event.get("success"))
+                self.finished.append((t, success, event.get("ttft")))
+                self.completed += 1
+                self.errors += 0 if success else 1
+                # 没有逐token事件的请求 (如服务器端压测代理) 按完成时间计入token数
+                if event.get("id") is None and success and event.get("token_count"):
+                    self.token_buckets.append([int(t), int(event["token_count"])])
+            elif kind == "telemetry":
+                self.telemetry = {k: v for k, v in event.items() if k not in ("type", "thread")}
+            elif kind == "test_start":
+                self.test = {
+                    "test": event.get("test"),
+                    "backend": event.get("backend"),
+                    "concurrency": event.get("concurrency"),
+                    "started": t,
+                }
+                # 窗口只统计当前测试，避免上一个测试的错误率触发新测试的自动中止
+                self._reset()
+            elif kind == "warmup" and event.get("event") == "end":
+                # 正式测量从预热结束后开始
+                self.test["started"] = t
+                self._reset()
+
+    def _reset(self):
+        self.token_buckets.clear()
+        self.itl.clear()
+        self.finished.clear()
+        self.in_flight.clear()
+        self.last_token.clear()
+        self.completed = 0
+        self.errors = 0
+
+    def _trim(self, now: float):
+        start = now - self.window
+        while self.token_buckets and self.token_buckets[0][0] < int(start):
+            self.token_buckets.popleft()
+        while self.itl and self.itl[0][0] < start:
+            self.itl.popleft()
+        while self.finished and self.finished[0][0] < start:
+            self.finished.popleft()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前窗口的指标快照"""
+        now = time.time()
+        with self.lock:
+            self._trim(now)
+            tokens = sum(count for _, count in self.token_buckets)
+            itl = sorted(value for _, value in self.itl)
+            finished = list(self.finished)
+            snapshot = dict(self.test)
+            snapshot.update(
+                {
+                    "in_flight": len(self.in_flight),
+                    "completed": self.completed,
+                    "errors": self.errors,
+                    "telemetry": dict(self.telemetry),
+                }
+            )
+        started = snapshot.get("started")
+        span = min(self.window, now - started) if started else self.window
+        span = max(span, 1.0)
+        ttft = sorted(ttft for _, ok, ttft in finished if ok and ttft is not None)
+        snapshot.update(
+            {
+                "t": now,
+                "window": self.window,
+                "elapsed": now - started if started else 0.0,
+                "tokens_per_s": tokens / span,
+                "requests_per_s": len(finished) / span,
+                "error_rate": sum(1 for _, ok, _ in finished if not ok) / len(finished) if finished else 0.0,
+                "window_requests": len(finished),
+                "ttft_p50": _percentile(ttft, 50),
+                "ttft_p95": _percentile(ttft, 95),
+                "ttft_p99": _percentile(ttft, 99),
+                "itl_p50": _percentile(itl, 50),
+                "itl_p95": _percentile(itl, 95),
+                "itl_p99": _percentile(itl, 99),
+            }
+        )
+        return snapshot
+
+
+def format_snapshot(s: Dict[str, Any]) -> str:
+    """单行状态文本"""
+
+    def num(value, digits):
+        return "-" if value is None else f"{value:.{digits}f}"
+
+    line = (
+        f"[实时] {s.get('test') or '-'} | {s['tokens_per_s']:.1f} tok/s | 进行中 {s['in_flight']} | "
+        f"TTFT P50/P95 {num(s['ttft_p50'], 3)}/{num(s['ttft_p95'], 3)}s | "
+        f"ITL P50/P95 {num(s['itl_p50'], 1)}/{num(s['itl_p95'], 1)}ms | "
+        f"错误率 {s['error_rate'] * 100:.1f}% | 完成 {s['completed']}"
+    )
+    telemetry = s.get("telemetry") or {}
+    if "gpu_kv_cache_usage" in telemetry:
+        line += f" | KV {telemetry['gpu_kv_cache_usage']:.1f}%"
+    return line
+
+
+class LiveMonitor:
+    """
+    测试运行期间的实时看板
+
+    订阅事件总线，后台线程每隔 interval 秒:
+        - 采集后端遥测 (如果后端日志在被轮询) 并作为 telemetry 事件发布
+        - 刷新终端状态行，或在本地HTTP页面上提供最新快照
+        - 检查中止规则 (如错误率、TTFT P95 超过阈值)，满足时请求中止当前测试
+
+    HTTP页面: GET / 看板，GET /api/live 快照JSON，POST /api/skip 中止当前测试
+    """
+
+    def __init__(
+        self,
+        hub: MetricsHub,
+        config: Dict[str, Any],
+        telemetry_source: Callable[[], Optional[Dict[str, Any]]] = None,
+    ):
+        """
+        初始化实时看板
+
+        Args:
+            hub: 事件总线
+            config: live_metrics 配置段:
+                - window: 滑动窗口长度 (秒，默认30)
+                - interval: 刷新间隔 (秒，默认1)
+                - terminal: 是否在终端显示状态行 (默认True)
+                - http_port: 本地HTTP看板端口 (可选)
+                - http_host: HTTP看板监听地址 (默认127.0.0.1)
+                - abort_if: 中止规则，如 {"error_rate": 0.5, "ttft_p95": 10}
+                - abort_min_requests: 窗口内至少完成多少请求后才检查中止规则 (默认10)
+            telemetry_source: 返回后端最新统计的函数 (可选)
+        """
+        self.hub = hub
+        self.window = LiveWindow(config.get("window", 30))
+        self.interval = config.get("interval", 1.0)
+        self.terminal = config.get("terminal", True)
+        self.http_port = config.get("http_port")
+        self.http_host = config.get("http_host", "127.0.0.1")
+        self.abort_if = config.get("abort_if", {})
+        self.abort_min_requests = config.get("abort_min_requests", 10)
+        self.telemetry_source = telemetry_source
+        # 非终端输出 (如重定向到文件) 时降低状态行频率
+        self.log_every = config.get("log_every", 10)
+        self.routes: Dict[str, Callable[[], tuple]] = {
+            "/": lambda: ("text/html; charset=utf-8", DASHBOARD_HTML),
+            "/api/live": lambda: ("application/json", json.dumps(self.snapshot(), ensure_ascii=False)),
+        }
+        self._last_telemetry = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._server = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        snapshot = self.window.snapshot()
+        snapshot["skip_reason"] = self.hub.skip_reason
+        return snapshot
+
+    def start(self):
+        self.hub.subscribe(self.window.on_event)
+        if self.http_port:
+            self._start_http()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="live-monitor")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval * 2)
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        self.hub.unsubscribe(self.window.on_event)
+        if self.terminal and sys.stdout.isatty():
+            sys.stdout.write("\n")
+
+    def _start_http(self):
+        monitor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                route = monitor.routes.get(self.path.split("?")[0])
+                if route is None:
+                    self.send_error(404)
+                    return
+                content_type, body = route()
+                self._send(content_type, body)
+
+            def do_POST(self):
+                if self.path != "/api/skip":
+                    self.send_error(404)
+                    return
+                monitor.hub.request_skip("在实时看板中手动中止")
+                self._send("application/json", json.dumps({"ok": True}))
+
+            def _send(self, content_type, body):
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass  # 不打印访问日志
+
+        try:
+            self._server = ThreadingHTTPServer((self.http_host, self.http_port), Handler)
+        except OSError as e:
+            print(f"实时看板HTTP服务启动失败 ({self.http_host}:{self.http_port}): {e}")
+            return
+        threading.Thread(target=self._server.serve_forever, daemon=True, name="live-http").start()
+        print(f"实时看板: http://{self.http_host}:{self.http_port}/")
+
+    def _poll_telemetry(self):
+        if self.telemetry_source is None:
+            return
+        try:
+            stats = self.telemetry_source()
+        except Exception:
+            return
+        if stats and stats.get("t") != self._last_telemetry:
+            self._last_telemetry = stats.get("t")
+            fields = {k: v for k, v in stats.items() if k not in ("type", "t")}
+            self.hub.publish("telemetry", t=stats.get("t"), **fields)
+
+    def _check_abort(self, snapshot: Dict[str, Any]):
+        if self.hub.skip_requested() or snapshot["window_requests"] < self.abort_min_requests:
+            return
+        for metric, limit in self.abort_if.items():
+            value = snapshot.get(metric)
+            if value is not None and value > limit:
+                self.hub.request_skip(f"{metric}={value:.3f} 超过阈值 {limit}")
+                return
+
+    def _loop(self):
+        tick = 0
+        tty = sys.stdout.isatty()
+        while not self._stop.wait(self.interval):
+            tick += 1
+            self._poll_telemetry()
+            snapshot = self.snapshot()
+            self._check_abort(snapshot)
+            if not self.terminal or not snapshot.get("test"):
+                continue
+            if tty:
+                sys.stdout.write("\r\033[K" + format_snapshot(snapshot))
+                sys.stdout.flush()
+            elif tick % self.log_every == 0:
+                print(format_snapshot(snapshot))
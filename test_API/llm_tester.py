@@ -1,56 +1,189 @@
 import requests
 import json
 import time
+import queue
+import atexit
 import logging
+import logging.handlers
 import argparse
 import os
+import random
+import threading
 from typing import Dict, Any, Optional, List, Tuple
 import sys
 
+from raw_events import RawEventLog, compute_metrics, usage_from_chunk
 
-def setup_logger(log_dir="run_test_API", framework="llm", streaming=False):
-    """配置并返回日志记录器"""
-    # 创建日志目录
-    os.makedirs(log_dir, exist_ok=True)
 
-    # 创建日志文件名，包含框架名称和流式标志
+class _Json:
+    """延迟序列化: 只有日志记录真正被输出时才调用 json.dumps"""
+
+    __slots__ = ("obj",)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __str__(self):
+        return json.dumps(self.obj, ensure_ascii=False, default=str)
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    把日志记录原样放入队列，消息的格式化由监听线程完成
+
+    标准 QueueHandler 在调用线程中格式化消息，这里只保留记录本身，
+    因此日志参数在记录之后不能再被修改 (测试器中的参数都是新建的对象)
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class _LevelSampler(logging.Filter):
+    """按级别抽样: rates 中的级别只保留对应比例的记录，WARNING及以上默认全部保留"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = {logging.getLevelName(level.upper()): rate for level, rate in rates.items()}
+
+    def filter(self, record):
+        rate = self.rates.get(record.levelno, 1.0)
+        return rate >= 1 or random.random() < rate
+
+
+class _StructuredFormatter(logging.Formatter):
+    """每条记录输出一行JSON，extra={"fields": {...}} 中的字段作为结构化字段"""
+
+    def format(self, record):
+        entry = {
+            "t": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _TextFormatter(logging.Formatter):
+    """文本格式，结构化字段以 key=value 附加在消息之后"""
+
+    def format(self, record):
+        text = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            text += " " + " ".join(
+                f"{k}={v:.4f}" if isinstance(v, float) else f"{k}={v}" for k, v in fields.items()
+            )
+        return text
+
+
+# 每个 (框架, 模式) 一个日志记录器与一个后台监听线程，与测试器个数和并发度无关
+_LOGGERS: Dict[str, logging.Logger] = {}
+_LISTENERS: List[logging.handlers.QueueListener] = []
+_LOGGERS_LOCK = threading.Lock()
+
+
+def shutdown_logging():
+    """停止所有日志监听线程，写出队列中剩余的记录 (进程退出时自动调用)"""
+    with _LOGGERS_LOCK:
+        while _LISTENERS:
+            _LISTENERS.pop().stop()
+        for logger in _LOGGERS.values():
+            for handler in logger.handlers:
+                handler.close()
+        _LOGGERS.clear()
+
+
+atexit.register(shutdown_logging)
+
+
+def setup_logger(log_dir="run_test_API", framework="llm", streaming=False, config: Dict[str, Any] = None):
+    """
+    配置并返回日志记录器
+
+    请求线程只把记录放入队列，格式化与写文件/控制台由后台的 QueueListener 完成。
+    同一进程中相同框架与模式的测试器共用一个记录器和日志文件。
+
+    Args:
+        log_dir: 日志目录
+        framework: 框架名称
+        streaming: 是否为流式测试
+        config: tester_logging 配置段 (可选):
+            - level: 记录的最低级别 (默认DEBUG)，更低级别的日志调用直接返回，参数不会被格式化
+            - console_level: 控制台输出的最低级别 (默认INFO)
+            - format: 日志文件格式，json (每行一条结构化记录，默认) 或 text
+            - sample: 按级别的抽样比例，如 {"DEBUG": 0.01}，默认全部保留
+    """
+    config = config or {}
     stream_flag = "stream" if streaming else "normal"
-    log_filename = (
-        f"{log_dir}/{framework}_{stream_flag}_test_{time.strftime('%Y%m%d_%H%M%S')}.log"
-    )
+    name = f"LLM-Tester-{framework}-{stream_flag}"
+    with _LOGGERS_LOCK:
+        logger = _LOGGERS.get(name)
+        if logger is not None:
+            return logger
+
+        # 创建日志目录
+        os.makedirs(log_dir, exist_ok=True)
+
+        # 创建日志文件名，包含框架名称和流式标志
+        log_filename = (
+            f"{log_dir}/{framework}_{stream_flag}_test_{time.strftime('%Y%m%d_%H%M%S')}.log"
+        )
 
-    # 配置日志
-    logger = logging.getLogger(f"LLM-Tester-{framework}")
-    logger.setLevel(logging.DEBUG)
-
-    # 防止日志记录重复
-    if logger.handlers:
-        logger.handlers.clear()
-
-    # 添加文件处理器
-    file_handler = logging.FileHandler(
-        log_filename, encoding="utf-8"
-    )  # 配置一下utf-8编码
-    file_handler.setLevel(logging.DEBUG)
-    file_formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
-    file_handler.setFormatter(file_formatter)
-    logger.addHandler(file_handler)
+        # 配置日志
+        logger = logging.getLogger(name)
+        logger.setLevel(config.get("level", "DEBUG").upper())
+        logger.propagate = False
+
+        # 防止日志记录重复
+        if logger.handlers:
+            logger.handlers.clear()
+
+        # 文件处理器
+        file_handler = logging.FileHandler(
+            log_filename, encoding="utf-8"
+        )  # 配置一下utf-8编码
+        if config.get("format", "json") == "json":
+            file_handler.setFormatter(_StructuredFormatter())
+        else:
+            file_handler.setFormatter(
+                _TextFormatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+            )
+
+        # 控制台处理器
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setLevel(config.get("console_level", "INFO").upper())
+        console_handler.setFormatter(_TextFormatter("%(asctime)s - %(levelname)s - %(message)s"))
 
-    # 添加控制台处理器
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.INFO)
-    console_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-    console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
+        # 请求线程只做抽样判断与入队
+        queue_handler = _LazyQueueHandler(queue.SimpleQueue())
+        if config.get("sample"):
+            queue_handler.addFilter(_LevelSampler(config["sample"]))
+        logger.addHandler(queue_handler)
 
-    return logger
+        listener = logging.handlers.QueueListener(
+            queue_handler.queue, file_handler, console_handler, respect_handler_level=True
+        )
+        listener.start()
+        _LISTENERS.append(listener)
+        _LOGGERS[name] = logger
+        return logger
 
 
 class LLMTester:
     def __init__(
-        self, framework: str, url: str, model: str = None, streaming: bool = False
+        self,
+        framework: str,
+        url: str,
+        model: str = None,
+        streaming: bool = False,
+        hub=None,
+        chunk_sample_rate: float = 1.0,
+        log_config: Dict[str, Any] = None,
     ):
         """
         初始化LLM测试工具
@@ -60,11 +193,16 @@ class LLMTester:
             url: API端点URL
             model: 模型名称
             streaming: 是否进行流式测试
+            hub: 事件总线 (可选)，性能测试时发布请求开始、首个数据块、每个内容块与请求结束事件
+            chunk_sample_rate: 保留完整流式块内容 (原始文本) 的请求比例，其余请求只记录块的时间与token数
+            log_config: 日志配置 (可选)，见 setup_logger
         """
         self.framework = framework.lower()
         self.url = url
         self.model = model
         self.streaming = streaming
+        self.hub = hub
+        self.chunk_sample_rate = chunk_sample_rate
         self.headers = {"Content-Type": "application/json"}
 
         # 根据框架设置API端点
@@ -80,9 +218,9 @@ class LLMTester:
                 self.url = f"{self.url.rstrip('/')}/v1/completions"
 
         # 设置日志记录器
-        self.logger = setup_logger(framework=framework, streaming=streaming)
+        self.logger = setup_logger(framework=framework, streaming=streaming, config=log_config)
         self.logger.info(
-            f"初始化 {framework} 测试，URL: {url}, 模型: {model}, 流式模式: {streaming}"
+            "初始化 %s 测试，URL: %s, 模型: %s, 流式模式: %s", framework, url, model, streaming
         )
 
     def check_service(self) -> Tuple[bool, Optional[Dict[str, Any]]]:
@@ -103,9 +241,7 @@ class LLMTester:
 
             if response.status_code < 400:
                 response_data = response.json() if response.content else None
-                self.logger.info(
-                    f"服务检查成功: {json.dumps(response_data, indent=2, ensure_ascii=False) if response_data else 'No content'}"
-                )
+                self.logger.info("服务检查成功: %s", _Json(response_data) if response_data else "No content")
                 return True, response_data
 
             error_info = {
@@ -135,13 +271,17 @@ class LLMTester:
                 "options": {"temperature": temperature, "num_predict": max_tokens},
             }
         elif self.framework in ["vllm", "lmstudio"]:
-            return {
+            payload = {
                 "model": self.model,
                 "prompt": prompt,
                 "max_tokens": max_tokens,
                 "temperature": temperature,
                 "stream": stream,
             }
+            if stream and self.framework == "vllm":
+                # 最后一个流式块附带服务端统计的token用量
+                payload["stream_options"] = {"include_usage": True}
+            return payload
         else:
             # 通用格式
             return {
@@ -155,65 +295,84 @@ class LLMTester:
     def test_completion(self, prompt: str, max_tokens: int = 50) -> Dict[str, Any]:
         """测试完成接口并记录返回格式"""
         payload = self.format_request_payload(prompt, max_tokens)
-        self.logger.info(
-            f"测试完成接口，请求: {json.dumps(payload, ensure_ascii=False)}"
-        )
+        self.logger.debug("测试完成接口，请求: %s", _Json(payload))
 
+        raw = None
         try:
             start_time = time.time()
+            raw = RawEventLog(start_time)
             response = requests.post(
                 self.url, headers=self.headers, json=payload, timeout=30
             )
+            raw.response(response.status_code, time.time())
             total_time = time.time() - start_time
 
             if response.status_code == 200:
                 result = response.json()
-                self.logger.info(f"请求成功，耗时: {total_time:.4f}秒")
+                raw.usage = usage_from_chunk(result)
+                raw.finish(time.time())
                 self.logger.info(
-                    f"响应格式: {json.dumps(result, indent=2, ensure_ascii=False)}"
+                    "请求成功", extra={"fields": {"total_time": total_time, "status": response.status_code}}
                 )
-                return {
+                self.logger.debug("响应格式: %s", _Json(result))
+                completion = {
                     "success": True,
                     "time": total_time,
                     "status_code": response.status_code,
                     "response": result,
+                    "raw": raw.to_dict(),
                 }
+                completion.update(compute_metrics(completion["raw"]))
+                return completion
             else:
+                raw.finish(time.time(), error=response.text)
                 self.logger.error(
-                    f"请求失败，状态码: {response.status_code}, 原因: {response.text}"
+                    "请求失败，状态码: %s, 原因: %s", response.status_code, response.text
                 )
                 return {
                     "success": False,
                     "time": total_time,
                     "status_code": response.status_code,
                     "error": response.text,
+                    "raw": raw.to_dict(),
                 }
         except Exception as e:
-            self.logger.error(f"请求异常: {e}")
+            self.logger.error("请求异常: %s", e)
+            if raw is not None:
+                raw.finish(time.time(), error=str(e))
+                return {"success": False, "error": str(e), "raw": raw.to_dict()}
             return {"success": False, "error": str(e)}
 
-    def test_streaming(self, prompt: str, max_tokens: int = 50) -> Dict[str, Any]:
-        """测试流式接口并记录返回格式"""
+    def test_streaming(
+        self, prompt: str, max_tokens: int = 50, request_id: int = None
+    ) -> Dict[str, Any]:
+        """测试流式接口并记录返回格式 (request_id 不为空时向事件总线发布逐块事件)"""
+        hub = self.hub if request_id is not None and self.hub and self.hub.active else None
         payload = self.format_request_payload(prompt, max_tokens, stream=True)
-        self.logger.info(
-            f"测试流式接口，请求: {json.dumps(payload, ensure_ascii=False)}"
-        )
+        self.logger.debug("测试流式接口，请求: %s", _Json(payload))
 
+        raw = None
         try:
             start_time = time.time()
+            raw = RawEventLog(start_time)
             response = requests.post(
                 self.url, headers=self.headers, json=payload, stream=True, timeout=30
             )
+            raw.response(response.status_code, time.time())
+            if hub:
+                hub.publish("connect", id=request_id, status=response.status_code)
 
             if response.status_code == 200:
                 first_chunk_time = None
-                last_content_chunk_time = None  # 记录最后一个内容块的时间
+                # 只有被抽样的请求保留每个块的原始文本，其余请求只有原始事件中的时间与token数
+                keep_chunks = self.chunk_sample_rate >= 1 or random.random() < self.chunk_sample_rate
                 chunks = []
-                content_chunks = []  # 只包含实际内容的块
+                chunk_count = 0
+                content_chunk_count = 0  # 只包含实际内容的块
                 complete_text = ""
                 token_count = 0
 
-                self.logger.info("开始接收流式响应...")
+                self.logger.debug("开始接收流式响应...")
 
                 for i, chunk in enumerate(response.iter_lines()):
                     if chunk:
@@ -222,34 +381,38 @@ class LLMTester:
                         # 记录首个响应的时间
                         if first_chunk_time is None:
                             first_chunk_time = current_time
-                            self.logger.info(
-                                f"首个响应到达 (TTFT): {first_chunk_time - start_time:.4f}秒"
-                            )
+                            if hub:
+                                hub.publish("first_byte", t=current_time, id=request_id)
+                            self.logger.debug("首个响应到达 (TTFT): %.4f秒", first_chunk_time - start_time)
 
+                        chunk_content = ""
+                        is_content_chunk = False  # 标记这个块是否包含内容
                         try:
                             chunk_text = chunk.decode("utf-8")
-                            chunk_content = ""
-                            is_content_chunk = False  # 标记这个块是否包含内容
 
-                            # 记录所有原始块数据
-                            self.logger.debug(f"块 {i}: {chunk_text}")
+                            # 记录被抽样请求的原始块数据
+                            if keep_chunks:
+                                self.logger.debug("块 %d: %s", i, chunk_text)
 
                             # 处理不同框架的流式格式
                             if self.framework == "ollama":
                                 # Ollama格式: JSON
                                 chunk_data = json.loads(chunk_text)
+                                if chunk_data.get("done"):
+                                    raw.usage = usage_from_chunk(chunk_data)
                                 if "response" in chunk_data:
                                     chunk_content = chunk_data["response"]
                                     complete_text += chunk_content
                                     token_count += 1  # 近似计数
                                     is_content_chunk = True
-                                    last_content_chunk_time = current_time
                             elif self.framework in ["vllm", "lmstudio"]:
                                 # OpenAI兼容格式: data: {...}
                                 if chunk_text.startswith("data: "):
                                     chunk_text = chunk_text[6:]
                                 if chunk_text.strip() and chunk_text != "[DONE]":
                                     chunk_data = json.loads(chunk_text)
+                                    if chunk_data.get("usage"):
+                                        raw.usage = usage_from_chunk(chunk_data)
                                     if (
                                         "choices" in chunk_data
                                         and len(chunk_data["choices"]) > 0
@@ -261,7 +424,6 @@ class LLMTester:
                                             complete_text += chunk_content
                                             token_count += 1  # 近似计数
                                             is_content_chunk = True
-                                            last_content_chunk_time = current_time
                                         elif (
                                             "delta" in chunk_data["choices"][0]
                                             and "content"
@@ -273,96 +435,90 @@ class LLMTester:
                                             complete_text += chunk_content
                                             token_count += 1  # 近似计数
                                             is_content_chunk = True
-                                            last_content_chunk_time = current_time
-
-                            chunk_info = {
-                                "index": i,
-                                "time": current_time - start_time,
-                                "content": chunk_text,
-                                "extracted_text": chunk_content,
-                                "is_content": is_content_chunk,
-                            }
 
-                            chunks.append(chunk_info)
+                            if keep_chunks:
+                                chunks.append(
+                                    {
+                                        "index": i,
+                                        "time": current_time - start_time,
+                                        "content": chunk_text,
+                                        "extracted_text": chunk_content,
+                                        "is_content": is_content_chunk,
+                                    }
+                                )
+                            chunk_count += 1
                             if is_content_chunk:
-                                content_chunks.append(chunk_info)
+                                content_chunk_count += 1
+                                if hub:
+                                    hub.publish("token", t=current_time, id=request_id)
 
                         except Exception as e:
-                            self.logger.error(f"解析响应块错误: {e}, 块内容: {chunk}")
-
-                total_time = time.time() - start_time
-                ttft = first_chunk_time - start_time if first_chunk_time else None
-
-                # 计算实际的TPOT，只考虑内容块
-                if (
-                    first_chunk_time
-                    and last_content_chunk_time
-                    and len(content_chunks) > 1
-                ):
-                    content_generation_time = last_content_chunk_time - first_chunk_time
-                    tokens_per_second = (
-                        token_count / content_generation_time
-                        if content_generation_time > 0
-                        else 0
-                    )
-                    tpot = (
-                        1000 / tokens_per_second if tokens_per_second > 0 else 0
-                    )  # 转换为每个token的生成时间（ms）
-                else:
-                    tpot = 0
-                    tokens_per_second = 0
-
-                # 最终结果输出
-                self.logger.info(f"==============流式请求完成==============")
-                self.logger.info(
-                    f"流式请求完成，总耗时: {content_generation_time:.4f}秒"
-                )
-                self.logger.info(
-                    f"结束响应到达，结尾耗时: {total_time-content_generation_time:.4f}秒"
-                )
-                self.logger.info(f"TTFT (首个令牌延迟): {ttft:.4f} seconds")
-                self.logger.info(f"TPOT (令牌生成间隔): {tpot:.2f} millisecond")
+                            self.logger.error("解析响应块错误: %s, 块内容: %s", e, chunk)
+
+                        # 原始事件: 到达时间与token数，指标由指标阶段统一计算
+                        raw.chunk(current_time, 1 if is_content_chunk else 0, len(chunk_content))
+
+                raw.finish(time.time())
+                metrics = compute_metrics(raw.to_dict())
+                total_time = metrics["total_time"]
+                ttft = metrics["ttft"]
+                tpot = metrics["tpot"]  # 转换为每个token的生成时间（ms）
+                tokens_per_second = metrics["throughput"]
+                token_count = metrics["token_count"]
+                if ttft is None:
+                    raise ValueError("流式响应中没有收到任何数据块")
+
+                # 最终结果输出: 一条结构化记录 (总耗时、TTFT秒、TPOT毫秒、吞吐量tokens/秒、token与块数)
                 self.logger.info(
-                    f"Throughput (令牌生成速率): {tokens_per_second:.2f} tokens/second"
+                    "流式请求完成",
+                    extra={
+                        "fields": {
+                            "total_time": total_time,
+                            "ttft": ttft,
+                            "tpot": tpot,
+                            "throughput": tokens_per_second,
+                            "token_count": token_count,
+                            "chunks": chunk_count,
+                            "content_chunks": content_chunk_count,
+                        }
+                    },
                 )
-                self.logger.info(
-                    f"Token_count (令牌生成数量): {token_count:.2f} tokens"
-                )
-                self.logger.info(
-                    f"总共接收 {len(chunks)} 个数据块，其中内容块 {len(content_chunks)} 个"
-                )
-                self.logger.info(f"完整文本: {complete_text}")
-
-                # 保存所有块的详细信息
-                chunks_filename = f"run_test_API/{self.framework}_stream_chunks_{time.strftime('%Y%m%d_%H%M%S')}.json"
-                with open(chunks_filename, "w", encoding="utf-8") as f:
-                    json.dump(chunks, f, indent=2, ensure_ascii=False)
-                self.logger.info(f"所有流式响应块详情已保存到: {chunks_filename}")
+                self.logger.debug("完整文本: %s", complete_text)
 
-                return {
+                streaming_result = {
                     "success": True,
                     "total_time": total_time,
                     "ttft": ttft,
                     "tpot": tpot,  # 每个token的生成时间（ms）
                     "throughput": tokens_per_second,  # 吞吐量（tokens/second）
-                    "chunk_count": len(chunks),
-                    "content_chunk_count": len(content_chunks),
+                    "chunk_count": chunk_count,
+                    "content_chunk_count": content_chunk_count,
                     "complete_text": complete_text,
                     "token_count": token_count,  # 实际token数量
-                    "chunks_file": chunks_filename,
+                    "metrics_version": metrics["metrics_version"],
+                    "raw": raw.to_dict(),
                 }
+                # 被抽样的请求附带所有块的详细信息，由调用方写入每个测试的压缩记录文件
+                if keep_chunks:
+                    streaming_result["chunks"] = chunks
+                return streaming_result
 
             else:
+                raw.finish(time.time(), error=response.text)
                 self.logger.error(
-                    f"流式请求失败，状态码: {response.status_code}, 原因: {response.text}"
+                    "流式请求失败，状态码: %s, 原因: %s", response.status_code, response.text
                 )
                 return {
                     "success": False,
                     "status_code": response.status_code,
                     "error": response.text,
+                    "raw": raw.to_dict(),
                 }
         except Exception as e:
-            self.logger.error(f"流式请求异常: {e}")
+            self.logger.error("流式请求异常: %s", e)
+            if raw is not None:
+                raw.finish(time.time(), error=str(e))
+                return {"success": False, "error": str(e), "raw": raw.to_dict()}
             return {"success": False, "error": str(e)}
 
     def run_full_test(
@@ -418,14 +574,7 @@ class LLMTester:
                 f"run_test_API/llm_test_{self.framework}_{stream_flag}_{timestamp}.json"
             )
 
-            # 如果是流式测试，将chunks信息直接包含在results中
-            if (
-                self.streaming
-                and "streaming_test" in results
-                and results["streaming_test"].get("success")
-            ):
-                results["streaming_test"]["chunks"] = chunks  # 直接包含chunks数据
-                del results["streaming_test"]["chunks_file"]  # 删除原来的文件引用
+            # 流式测试的chunks信息已直接包含在results中 (streaming_test.chunks)
 
             os.makedirs("run_test_API", exist_ok=True)
             with open(result_filename, "w", encoding="utf-8") as f:
@@ -451,22 +600,34 @@ class LLMTester:
             - token_count: 生成的token数量
             - total_time: 总耗时（秒）
         """
+        hub = self.hub if self.hub and self.hub.active else None
+        request_id = hub.next_request_id() if hub else None
+        if hub:
+            hub.publish("request_start", id=request_id)
+
         if self.streaming:
-            result = self.test_streaming(prompt, max_tokens)
+            result = self.test_streaming(prompt, max_tokens, request_id)
         else:
             result = self.test_completion(prompt, max_tokens)
 
         if result.get("success"):
-            return {
+            metrics = {
                 "success": True,
                 "ttft": result.get("ttft"),
                 "tpot": result.get("tpot"),
                 "throughput": result.get("throughput"),
                 "token_count": result.get("token_count"),
                 "total_time": result.get("total_time"),
+                "metrics_version": result.get("metrics_version"),
             }
         else:
-            return {"success": False, "error": result.get("error")}
+            metrics = {"success": False, "error": result.get("error")}
+        for field in ("raw", "chunks"):
+            if field in result:
+                metrics[field] = result[field]
+        if hub:
+            hub.publish("request_end", id=request_id, **metrics)
+        return metrics
 
 
 def main():
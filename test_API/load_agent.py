@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+InferMatrix 远程压测代理
+
+该脚本会被上传到推理服务器上运行，直接访问 localhost 上的推理服务，
+从而避免把客户端与服务器之间的网络往返时间计入 TTFT 等指标。
+
+注意: 本文件只能依赖Python标准库，远程主机上不保证安装了 requests 等第三方包。
+
+与编排器之间的协议 (按行传输的紧凑JSON):
+    编排器 -> 代理 (stdin):
+        SYNC <n>        时钟同步探测，代理立即回复自身时间
+        JOB <json>      测试任务描述，收到后开始压测
+    代理 -> 编排器 (stdout):
+        {"type": "ready"}                     代理已启动
+        {"type": "sync", "n": n, "t": ts}     时钟同步回复
+        {"type": "result", ...}               单个请求的结果与原始事件 (raw)
+        {"type": "done", "count": n}          全部请求完成
+        {"type": "error", "error": msg}       代理级错误
+"""
+
+import json
+import queue
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+_output_lock = threading.Lock()
+
+
+def emit(message):
+    """输出一行紧凑JSON到stdout"""
+    line = json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+    with _output_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+
+def build_payload(job, prompt):
+    """根据不同框架构造请求数据，与 LLMTester.format_request_payload 保持一致"""
+    framework = job["framework"]
+    stream = job.get("streaming", True)
+    if framework == "ollama":
+        return {
+            "model": job["model"],
+            "prompt": prompt,
+            "stream": stream,
+            "options": {
+                "temperature": job.get("temperature", 0.7),
+                "num_predict": job["max_tokens"],
+            },
+        }
+    payload = {
+        "model": job["model"],
+        "prompt": prompt,
+        "max_tokens": job["max_tokens"],
+        "temperature": job.get("temperature", 0.7),
+        "stream": stream,
+    }
+    if stream and framework == "vllm":
+        # 最后一个流式块附带服务端统计的token用量
+        payload["stream_options"] = {"include_usage": True}
+    return payload
+
+
+class RawEvents:
+    """
+    单个请求的原始事件，格式与 raw_events.RawEventLog 相同
+
+    时间均为相对请求开始的秒数 (start 为代理所在服务器的时钟)，
+    数据块记录为 [时间, token数, 字符数]
+    """
+
+    def __init__(self, start):
+        self.start = start
+        self.status = None
+        self.headers = None
+        self.chunks = []
+        self.usage = {}
+        self.end = None
+        self.error = None
+
+    def response(self, status, t):
+        self.status = status
+        self.headers = round(t - self.start, 6)
+
+    def chunk(self, t, tokens=0, chars=0):
+        self.chunks.append([round(t - self.start, 6), tokens, chars])
+
+    def finish(self, t, error=None):
+        self.end = round(t - self.start, 6)
+        self.error = error
+
+    def to_dict(self):
+        raw = {
+            "format": 1,
+            "start": self.start,
+            "status": self.status,
+            "headers": self.headers,
+            "chunks": self.chunks,
+            "end": self.end,
+        }
+        if self.usage:
+            raw["usage"] = self.usage
+        if self.error:
+            raw["error"] = self.error
+        return raw
+
+
+def usage_from_chunk(data):
+    """从响应 (或最后一个流式块) 中提取token用量，与 raw_events.usage_from_chunk 相同"""
+    usage = data.get("usage")
+    if isinstance(usage, dict):
+        return {k: v for k, v in usage.items() if isinstance(v, (int, float))}
+    if "eval_count" in data:
+        return {
+            "completion_tokens": data.get("eval_count"),
+            "prompt_tokens": data.get("prompt_eval_count"),
+        }
+    return {}
+
+
+def parse_chunk(framework, line):
+    """解析一行流式响应，返回 (是否内容块, 文本, 用量)"""
+    if framework == "ollama":
+        data = json.loads(line)
+        usage = usage_from_chunk(data) if data.get("done") else {}
+        if "response" in data:
+            return True, data["response"], usage
+        return False, "", usage
+
+    if line.startswith("data: "):
+        line = line[6:]
+    if not line.strip() or line == "[DONE]":
+        return False, "", {}
+    data = json.loads(line)
+    usage = usage_from_chunk(data) if data.get("usage") else {}
+    choices = data.get("choices") or []
+    if choices:
+        if "text" in choices[0]:
+            return True, choices[0]["text"], usage
+        delta = choices[0].get("delta") or {}
+        if "content" in delta:
+            return True, delta["content"], usage
+    return False, "", usage
+
+
+def _failure(raw, error, status_code=None):
+    raw.finish(time.time(), error=error)
+    result = {"success": False, "error": error, "raw": raw.to_dict()}
+    if status_code is not None:
+        result["status_code"] = status_code
+    return result
+
+
+def run_request(job, prompt):
+    """
+    执行单个请求并记录原始事件
+
+    与 LLMTester 相同，TTFT / TPOT / 吞吐量不在代理中计算，
+    由编排器按原始事件 (raw) 和当前的指标版本统一计算
+    """
+    streaming = job.get("streaming", True)
+    request = urllib.request.Request(
+        job["url"],
+        data=json.dumps(build_payload(job, prompt)).encode("utf-8"),
+        headers=job.get("headers", {"Content-Type": "application/json"}),
+        method="POST",
+    )
+
+    start_time = time.time()
+    raw = RawEvents(start_time)
+    try:
+        response = urllib.request.urlopen(request, timeout=job.get("timeout", 30))
+    except urllib.error.HTTPError as e:
+        raw.response(e.code, time.time())
+        return _failure(raw, str(e), e.code)
+    except Exception as e:
+        return _failure(raw, str(e))
+
+    chunk_count = 0
+    content_chunk_count = 0
+    try:
+        with response:
+            raw.response(response.status, time.time())
+            if not streaming:
+                body = response.read()
+                try:
+                    raw.usage = usage_from_chunk(json.loads(body))
+                except ValueError:
+                    pass
+            else:
+                for raw_line in response:
+                    line = raw_line.strip()
+                    if not line:
+                        continue
+                    current_time = time.time()
+                    try:
+                        is_content, text, usage = parse_chunk(job["framework"], line.decode("utf-8"))
+                    except ValueError:
+                        is_content, text, usage = False, "", {}
+                    if usage:
+                        raw.usage = usage
+                    chunk_count += 1
+                    if is_content:
+                        content_chunk_count += 1
+                    raw.chunk(current_time, 1 if is_content else 0, len(text))
+    except Exception as e:
+        return _failure(raw, str(e))
+
+    raw.finish(time.time())
+    result = {"success": True, "raw": raw.to_dict()}
+    if streaming:
+        result.update({"chunk_count": chunk_count, "content_chunk_count": content_chunk_count})
+    return result
+
+
+def worker(job, tasks, slot):
+    """并发槽位工作线程，从任务队列中取出 (轮次, 提示序号) 执行"""
+    prompts = job["prompts"]
+    while True:
+        try:
+            round_index, prompt_id = tasks.get_nowait()
+        except queue.Empty:
+            return
+        result = run_request(job, prompts[prompt_id])
+        result.update(
+            {"type": "result", "round": round_index, "prompt_id": prompt_id, "slot": slot}
+        )
+        emit(result)
+
+
+def run_job(job):
+    """按照任务描述执行全部请求"""
+    tasks = queue.Queue()
+    for round_index in range(job.get("repeat", 1)):
+        for prompt_id in range(len(job["prompts"])):
+            tasks.put((round_index, prompt_id))
+
+    total = tasks.qsize()
+    concurrency = max(1, int(job.get("concurrency", 1)))
+    threads = [
+        threading.Thread(target=worker, args=(job, tasks, slot), daemon=True)
+        for slot in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    emit({"type": "done", "count": total})
+
+
+def main():
+    emit({"type": "ready", "t": time.time()})
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("SYNC"):
+            parts = line.split()
+            emit({"type": "sync", "n": int(parts[1]) if len(parts) > 1 else 0, "t": time.time()})
+        elif line.startswith("JOB "):
+            try:
+                job = json.loads(line[4:])
+            except ValueError as e:
+                emit({"type": "error", "error": f"任务描述解析失败: {e}"})
+                return 1
+            run_job(job)
+            return 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+import os
+import re
+import time
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from cold_start import VLLMStartupParser
+
+# 服务就绪标记
+READY_PATTERN = re.compile(r"Application startup complete|GET /v1/models HTTP/1\.1\" 200 OK")
+
+# 周期性统计日志，例如:
+#   Engine 000: Avg prompt throughput: 12.0 tokens/s, Avg generation throughput: 35.2 tokens/s,
+#   Running: 2 reqs, Waiting: 0 reqs, GPU KV cache usage: 1.3%, Prefix cache hit rate: 0.0%
+STATS_PATTERN = re.compile(r"Avg prompt throughput:")
+STATS_FIELD = re.compile(r"([A-Za-z][A-Za-z ]*?):\s*(-?[\d.]+)\s*(?:tokens/s|reqs|%)?(?:,|$)")
+
+# 告警与错误
+WARNING_PATTERN = re.compile(
+    r"\b(?:WARNING|ERROR|CRITICAL)\b|level=(?:WARN|ERROR)|Traceback \(most recent call last\)|(?i:out of memory)"
+)
+
+
+def _field_name(label: str) -> str:
+    """把日志中的字段名转换为指标名，如 'GPU KV cache usage' -> 'gpu_kv_cache_usage'"""
+    return re.sub(r"\s+", "_", label.strip().lower())
+
+
+class LogEventParser:
+    """
+    把后端日志行解析为结构化事件
+
+    事件类型:
+        - startup: 启动阶段 (权重加载、KV cache分配、CUDA graph捕获等)
+        - ready: 服务就绪
+        - stats: 周期性吞吐量/队列/KV cache使用率统计
+        - warning: 告警、错误与异常堆栈
+    """
+
+    def __init__(
+        self, launch_time: Optional[datetime] = None, max_warnings: int = 200, max_stats: int = 2000
+    ):
+        """
+        初始化解析器
+
+        Args:
+            launch_time: 启动命令执行时的服务器本地时间 (可选)，用于对齐启动事件
+            max_warnings: 最多保留的告警条数
+            max_stats: 最多保留的统计条数 (vLLM 默认每10秒一条，约5.5小时)
+        """
+        self.startup = VLLMStartupParser(launch_time)
+        self.ready = False
+        self.stats: deque = deque(maxlen=max_stats)
+        self.warnings: deque = deque(maxlen=max_warnings)
+        self.warning_count = 0
+
+    def feed(self, line: str, received_at: float = None) -> Optional[Dict[str, Any]]:
+        """解析一行日志，返回解析出的事件 (没有时返回None)"""
+        received_at = received_at if received_at is not None else time.time()
+        event = None
+
+        startup = self.startup.feed(line)
+        if startup is not None:
+            event = {"type": "startup", "t": received_at, "event": startup["event"]}
+        elif READY_PATTERN.search(line):
+            if self.ready:
+                return None
+            self.ready = True
+            event = {"type": "ready", "t": received_at}
+        elif STATS_PATTERN.search(line):
+            message = line[STATS_PATTERN.search(line).start():]
+            event = {"type": "stats", "t": received_at}
+            for label, value in STATS_FIELD.findall(message):
+                event[_field_name(label)] = float(value)
+            self.stats.append(event)
+        elif WARNING_PATTERN.search(line):
+            event = {"type": "warning", "t": received_at, "line": line.strip()[:500]}
+            self.warnings.append(event)
+            self.warning_count += 1
+        return event
+
+    @property
+    def startup_events(self) -> List[Dict[str, Any]]:
+        return self.startup.events
+
+
+class LogFollower:
+    """
+    增量跟踪服务器上的日志文件
+
+    记录已读取的字节偏移量，每次轮询只读取新增的字节，通过同一个SFTP会话完成
+    (本地模式直接读文件)，日志越长也不会增加每次轮询的开销。文件被截断或重建时
+    从头开始读取。
+    """
+
+    def __init__(
+        self,
+        ssh_manager,
+        path: str,
+        launch_time: Optional[datetime] = None,
+        tail_lines: int = 200,
+        max_read: int = 4 * 1024 * 1024,
+    ):
+        """
+        初始化日志跟踪器
+
+        Args:
+            ssh_manager: SSH管理器
+            path: 日志文件路径 (远程路径中的 ~/ 视为用户主目录)
+            launch_time: 启动命令执行时的服务器本地时间 (可选)
+            tail_lines: 内存中保留的最近日志行数
+            max_read: 单次轮询最多读取的字节数
+        """
+        self.ssh = ssh_manager
+        self.path = path
+        self.offset = 0
+        self.max_read = max_read
+        self.parser = LogEventParser(launch_time)
+        self.lines: deque = deque(maxlen=tail_lines)
+        self.bytes_read = 0
+        self._partial = b""
+        self._sftp = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _resolve_path(self) -> str:
+        if self.ssh.local_mode:
+            return os.path.expanduser(self.path)
+        # SFTP的相对路径以用户主目录为起点
+        return self.path[2:] if self.path.startswith("~/") else self.path
+
+    def _read_new_bytes(self) -> Optional[bytes]:
+        """读取偏移量之后的新字节，文件不存在时返回None"""
+        path = self._resolve_path()
+        if self.ssh.local_mode:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                return None
+            if size < self.offset:
+                self._reset()
+            with open(path, "rb") as f:
+                f.seek(self.offset)
+                return f.read(self.max_read)
+
+        if self._sftp is None:
+            self._sftp = self.ssh.acquire_sftp()
+            if self._sftp is None:
+                return None
+        try:
+            size = self._sftp.stat(path).st_size
+        except IOError:
+            return None
+        if size < self.offset:
+            self._reset()
+        if size == self.offset:
+            return b""
+        with self._sftp.open(path, "rb") as f:
+            f.seek(self.offset)
+            return f.read(min(size - self.offset, self.max_read))
+
+    def _reset(self):
+        """日志文件被截断或重建"""
+        print(f"日志文件 {self.path} 已被截断，从头读取")
+        self.offset = 0
+        self._partial = b""
+
+    def poll(self) -> Optional[List[str]]:
+        """
+        读取新增的完整日志行并解析事件
+
+        Returns:
+            新增的日志行；日志文件不存在时返回None
+        """
+        with self._lock:
+            try:
+                data = self._read_new_bytes()
+            except (IOError, OSError) as e:
+                print(f"读取日志 {self.path} 失败: {e}")
+                self._drop_session()
+                return []
+            if data is None:
+                return None
+
+            self.offset += len(data)
+            self.bytes_read += len(data)
+            data = self._partial + data
+            lines = data.split(b"\n")
+            self._partial = lines.pop()
+
+            received_at = time.time()
+            decoded = []
+            for raw in lines:
+                # 进度条等使用\r刷新同一行，只保留最后的状态
+                line = raw.decode("utf-8", errors="replace").rstrip("\r").split("\r")[-1]
+                decoded.append(line)
+                self.lines.append(line)
+                self.parser.feed(line, received_at)
+            return decoded
+
+    def tail(self, lines: int = 20) -> List[str]:
+        """最近读取到的若干行日志"""
+        with self._lock:
+            return list(self.lines)[-lines:]
+
+    def start(self, interval: float = 5.0):
+        """启动后台线程定期轮询 (用于长时间测试期间持续采集统计日志)"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(interval):
+                self.poll()
+
+        self._thread = threading.Thread(target=loop, name="log-follower", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台轮询，并读取剩余的日志"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.poll()
+
+    def _drop_session(self):
+        if self._sftp is not None:
+            try:
+                self._sftp.close()
+            except Exception:
+                pass
+            self._sftp = None
+
+    def close(self):
+        """停止轮询并归还SFTP会话"""
+        self.stop()
+        with self._lock:
+            if self._sftp is not None:
+                self.ssh.release_sftp(self._sftp)
+                self._sftp = None
+
+    def timeline(self, since: float = None) -> Dict[str, Any]:
+        """
+        导出结构化事件时间序列
+
+        Args:
+            since: 只导出该时间 (本地时钟) 之后的统计与告警 (可选)
+
+        Returns:
+            包含 startup / stats / warnings 等字段的字典
+        """
+        with self._lock:
+            stats = [e for e in self.parser.stats if since is None or e["t"] >= since]
+            warnings = [e for e in self.parser.warnings if since is None or e["t"] >= since]
+            return {
+                "log_file": self.path,
+                "bytes_read": self.bytes_read,
+                "startup": [
+                    {k: v for k, v in e.items() if k != "line"} for e in self.parser.startup_events
+                ],
+                "stats": stats,
+                "warnings": warnings,
+                "warning_count": self.parser.warning_count,
+            }
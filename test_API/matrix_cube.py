@@ -0,0 +1,299 @@
+"""
+跨运行目录的性能矩阵
+
+把多个运行目录中的测试结果合并为一个带命名维度的矩阵 (cube)：
+后端、主机/GPU、模型、量化方式、扫描维度以及所有后端参数都是维度，
+测试汇总统计 (如 throughput_p50 / ttft_p95) 是指标。支持按维度快速切片、
+透视为二维表，并导出CSV、Markdown表格与热力图。
+
+用法:
+    python matrix_cube.py results/run_* --rows backend --cols hardware --metric throughput_p50
+    python matrix_cube.py results/run_* --rows backend,model --cols hardware --where quantization=awq \\
+        --markdown matrix.md --csv matrix.csv --heatmap matrix.png
+    python matrix_cube.py results/run_* --dims
+"""
+
+import os
+import sys
+import glob
+import json
+import argparse
+from typing import Dict, Any, List, Iterable, Optional
+
+import numpy as np
+
+from records import RECORDS_FILE, iter_record_chunks
+
+RUN_META_FILE = "run_meta.json"
+
+# 固定维度，其余维度来自扫描与后端参数
+BASE_DIMENSIONS = ["backend", "hardware", "host", "model", "quantization", "test", "run"]
+
+# Markdown表格中指标的显示单位
+METRIC_UNITS = {
+    "throughput": "tok/s",
+    "ttft": "s",
+    "tpot": "ms",
+    "total_time": "s",
+}
+
+
+def _label(value: Any) -> str:
+    """维度取值统一转换为字符串，路径只保留最后一段"""
+    if value is None:
+        return "none"
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+    return text.rstrip("/").split("/")[-1] or text
+
+
+def load_run(run_dir: str) -> List[Dict[str, Any]]:
+    """
+    读取一个运行目录的测试级结果 (不含请求明细)
+
+    优先读取 records.ndjson 中的测试记录，旧运行目录读取 test_results.json
+    """
+    records_path = os.path.join(run_dir, RECORDS_FILE)
+    tests: Dict[str, Dict[str, Any]] = {}
+    if os.path.exists(records_path):
+        for chunk in iter_record_chunks(records_path):
+            for record in chunk:
+                if record.get("type") == "test":
+                    tests[record.get("name")] = record
+    else:
+        result_path = os.path.join(run_dir, "test_results.json")
+        if not os.path.exists(result_path):
+            return []
+        with open(result_path, "r", encoding="utf-8") as f:
+            for result in json.load(f):
+                result.pop("test_results", None)
+                tests[result.get("name")] = result
+    return [t for t in tests.values() if t.get("success")]
+
+
+def load_run_meta(run_dir: str) -> Dict[str, Any]:
+    path = os.path.join(run_dir, RUN_META_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def cell_row(result: Dict[str, Any], meta: Dict[str, Any], run_dir: str) -> Dict[str, Any]:
+    """把一个测试结果展开为矩阵中的一行: 维度 (字符串) + 指标 (数值)"""
+    config = result.get("config") or {}
+    args = config.get("args") or {}
+    model = config.get("model_path") or config.get("model") or result.get("model")
+    gpus = meta.get("gpus") or []
+
+    dims = {
+        "backend": result.get("backend"),
+        "hardware": meta.get("hardware") or (gpus[0]["name"] if gpus else meta.get("host")),
+        "host": meta.get("host"),
+        "model": model,
+        "quantization": args.get("quantization") or config.get("quantization"),
+        "test": result.get("name"),
+        "run": os.path.basename(os.path.normpath(run_dir)),
+        "concurrency": result.get("concurrency", 1),
+        "streaming": result.get("streaming"),
+    }
+    for name, value in args.items():
+        dims.setdefault(name, value)
+    for name, value in (result.get("sweep") or {}).items():
+        dims.setdefault(name, value)
+
+    row = {k: _label(v) for k, v in dims.items()}
+    for name, value in (result.get("summary") or {}).items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            row[name] = float(value)
+    return row
+
+
+class MatrixCube:
+    """
+    带命名维度的性能矩阵
+
+    每行是一个测试结果，维度列为字符串，指标列为数值。构建时为每个维度建立
+    倒排索引 (取值 -> 行号数组)，切片时对索引求交集，不需要扫描全部行。
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        import pandas as pd
+
+        self.frame = pd.DataFrame(rows)
+        self.dimensions = [
+            c for c in self.frame.columns if self.frame[c].dtype == object
+        ]
+        self.metrics = [c for c in self.frame.columns if c not in self.dimensions]
+        if self.dimensions:
+            self.frame[self.dimensions] = self.frame[self.dimensions].fillna("none")
+        self.index: Dict[str, Dict[str, np.ndarray]] = {
+            dim: {
+                value: np.asarray(positions, dtype=np.int64)
+                for value, positions in self.frame.groupby(dim, sort=False).indices.items()
+            }
+            for dim in self.dimensions
+        }
+
+    @classmethod
+    def from_run_dirs(cls, run_dirs: Iterable[str]) -> "MatrixCube":
+        """从多个运行目录构建矩阵"""
+        rows = []
+        for run_dir in run_dirs:
+            if not os.path.isdir(run_dir):
+                continue
+            meta = load_run_meta(run_dir)
+            tests = load_run(run_dir)
+            rows.extend(cell_row(result, meta, run_dir) for result in tests)
+            print(f"已读取 {run_dir}: {len(tests)} 个测试")
+        return cls(rows)
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def values(self, dim: str) -> List[str]:
+        """维度的全部取值"""
+        return sorted(self.index.get(dim, {}))
+
+    def slice(self, **criteria) -> "MatrixCube":
+        """
+        按维度取值切片
+
+        Args:
+            criteria: {维度: 取值或取值列表}，如 backend="vllm", model=["Qwen-7B", "Qwen-14B"]
+
+        Returns:
+            只包含匹配行的新矩阵
+        """
+        positions = None
+        for dim, wanted in criteria.items():
+            if dim not in self.index:
+                raise KeyError(f"未知维度: {dim}，可用维度: {', '.join(self.dimensions)}")
+            wanted = wanted if isinstance(wanted, (list, tuple, set)) else [wanted]
+            matched = [self.index[dim].get(_label(v)) for v in wanted]
+            matched = [m for m in matched if m is not None]
+            rows = np.unique(np.concatenate(matched)) if matched else np.empty(0, dtype=np.int64)
+            positions = rows if positions is None else np.intersect1d(positions, rows)
+        if positions is None:
+            return self
+        return MatrixCube(self.frame.iloc[positions].to_dict("records"))
+
+    def pivot(self, rows: List[str], cols: List[str], metric: str, agg: str = "median"):
+        """
+        透视为二维表
+
+        Args:
+            rows: 行维度 (多个维度时组合为多级索引)
+            cols: 列维度
+            metric: 指标，如 throughput_p50 / ttft_p95
+            agg: 同一单元格有多个结果 (如多次运行) 时的聚合方式
+
+        Returns:
+            pandas.DataFrame
+        """
+        if metric not in self.metrics:
+            raise KeyError(f"未知指标: {metric}，可用指标: {', '.join(self.metrics)}")
+        return self.frame.pivot_table(
+            index=rows, columns=cols, values=metric, aggfunc=agg, sort=True
+        )
+
+    @staticmethod
+    def to_markdown(table, metric: str, precision: int = 0) -> str:
+        """
+        把透视表渲染为README风格的Markdown表格
+
+        例如 | Backend | RTX 4090 | A100 |，单元格形如 137 tok/s
+        """
+        unit = METRIC_UNITS.get(metric.rsplit("_", 1)[0], "")
+
+        def header(value):
+            return " / ".join(map(str, value)) if isinstance(value, tuple) else str(value)
+
+        row_name = " / ".join(n.capitalize() for n in table.index.names if n)
+        columns = [header(c) for c in table.columns]
+        lines = [
+            "| " + " | ".join([row_name] + columns) + " |",
+            "|" + "|".join(["---"] * (len(columns) + 1)) + "|",
+        ]
+        for key, values in table.iterrows():
+            cells = [
+                "-" if np.isnan(v) else f"{v:.{precision}f} {unit}".strip() for v in values
+            ]
+            lines.append("| " + " | ".join([f"**{header(key)}**"] + cells) + " |")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def to_heatmap(table, metric: str, path: str, title: str = None):
+        """把透视表渲染为热力图"""
+        import matplotlib
+
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
+        height = max(4, 0.6 * len(table.index) + 2)
+        width = max(6, 1.4 * len(table.columns) + 3)
+        plt.figure(figsize=(width, height))
+        sns.heatmap(table, annot=True, fmt=".1f", cmap="viridis", cbar_kws={"label": metric})
+        plt.title(title or metric)
+        plt.tight_layout()
+        plt.savefig(path, dpi=150)
+        plt.close()
+
+
+def _parse_where(items: List[str]) -> Dict[str, List[str]]:
+    criteria: Dict[str, List[str]] = {}
+    for item in items or []:
+        dim, _, value = item.partition("=")
+        criteria.setdefault(dim, []).extend(value.split(","))
+    return criteria
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="跨运行目录的性能矩阵")
+    parser.add_argument("run_dirs", nargs="+", help="运行目录 (支持通配符，如 results/run_*)")
+    parser.add_argument("--rows", default="backend", help="行维度，多个维度用逗号分隔")
+    parser.add_argument("--cols", default="hardware", help="列维度，多个维度用逗号分隔")
+    parser.add_argument("--metric", default="throughput_p50", help="指标 (默认 throughput_p50)")
+    parser.add_argument("--agg", default="median", help="同一单元格多个结果的聚合方式")
+    parser.add_argument("--where", nargs="+", help="切片条件，如 model=Qwen-7B quantization=awq,gptq")
+    parser.add_argument("--precision", type=int, default=0, help="Markdown表格的小数位数")
+    parser.add_argument("--csv", help="导出透视表CSV")
+    parser.add_argument("--markdown", help="导出Markdown表格")
+    parser.add_argument("--heatmap", help="导出热力图PNG")
+    parser.add_argument("--dims", action="store_true", help="列出全部维度及取值")
+    args = parser.parse_args(argv)
+
+    run_dirs = [d for pattern in args.run_dirs for d in sorted(glob.glob(pattern)) or [pattern]]
+    cube = MatrixCube.from_run_dirs(run_dirs)
+    if not len(cube):
+        print("没有找到测试结果")
+        return 1
+
+    if args.dims:
+        for dim in cube.dimensions:
+            print(f"{dim}: {', '.join(cube.values(dim))}")
+        print(f"指标: {', '.join(cube.metrics)}")
+        return 0
+
+    if args.where:
+        cube = cube.slice(**_parse_where(args.where))
+    table = cube.pivot(args.rows.split(","), args.cols.split(","), args.metric, args.agg)
+    markdown = cube.to_markdown(table, args.metric, args.precision)
+    print(f"\n{args.metric} ({table.size} 个单元格):\n")
+    print(markdown)
+
+    if args.csv:
+        table.to_csv(args.csv)
+        print(f"已导出CSV: {args.csv}")
+    if args.markdown:
+        with open(args.markdown, "w", encoding="utf-8") as f:
+            f.write(markdown)
+        print(f"已导出Markdown: {args.markdown}")
+    if args.heatmap:
+        cube.to_heatmap(table, args.metric, args.heatmap)
+        print(f"已导出热力图: {args.heatmap}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, List, Optional
+
+from cold_start import PageCacheController
+
+
+class ModelPrefetcher:
+    """
+    模型预取器：在当前测试运行期间，后台准备后续测试所需的模型
+
+    - Ollama: 通过 /api/pull 提前拉取
+    - vLLM: 通过 stage_from (rsync) 或 download 配置提前暂存权重，可限速
+    - 可选在暂存后预热页缓存，使下一次部署从热存储启动
+
+    无法限速的工作 (Ollama拉取、页缓存预热，以及未设置 bwlimit_kbps 的暂存/下载)
+    推迟到当前测试的测量结束后 (measuring() 之外) 再执行，避免干扰测量
+    """
+
+    def __init__(self, service_manager, prefetch_config: Dict[str, Any] = None):
+        """
+        初始化模型预取器
+
+        Args:
+            service_manager: 服务管理器
+            prefetch_config: 预取配置，包含:
+                - lookahead: 向后预取的测试数量 (可选，默认1)
+                - bwlimit_kbps: 后台下载带宽上限KB/s (可选，默认不限速)
+                - prewarm: 暂存后是否预热页缓存 (可选，默认False)
+        """
+        prefetch_config = prefetch_config or {}
+        self.service_manager = service_manager
+        self.lookahead = prefetch_config.get("lookahead", 1)
+        self.bwlimit_kbps = prefetch_config.get("bwlimit_kbps")
+        self.prewarm = prefetch_config.get("prewarm", False)
+        # 单线程执行，避免多个后台下载相互争抢带宽
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+        self.jobs: Dict[tuple, Future] = {}
+        self.lock = threading.Lock()
+        self.idle = threading.Event()  # 没有测试在测量时置位
+        self.idle.set()
+        self._closed = False
+
+    @contextmanager
+    def measuring(self):
+        """包裹一个测试的运行，期间推迟无法限速的后台工作"""
+        self.idle.clear()
+        try:
+            yield
+        finally:
+            self.idle.set()
+
+    def _wait_idle(self, what: str) -> bool:
+        """等待当前测试结束，预取器已关闭时返回False"""
+        if not self.idle.is_set():
+            print(f"{what} 无法限速，推迟到当前测试结束后执行")
+            self.idle.wait()
+        return not self._closed
+
+    @staticmethod
+    def model_key(test_config: Dict[str, Any]) -> Optional[tuple]:
+        """测试所需模型的唯一标识 (后端, 模型)"""
+        backend = test_config.get("backend")
+        backend_config = test_config.get("backend_config", {})
+        model = backend_config.get("model", backend_config.get("model_path"))
+        if not backend or not model:
+            return None
+        return backend, model
+
+    def schedule(self, upcoming_tests: List[Dict[str, Any]]):
+        """为接下来的若干个测试安排后台模型准备"""
+        for test_config in upcoming_tests[: self.lookahead]:
+            key = self.model_key(test_config)
+            if key is None:
+                continue
+            with self.lock:
+                if key in self.jobs:
+                    continue
+                print(f"后台预取模型: {key[1]} ({key[0]})")
+                self.jobs[key] = self.executor.submit(self._prepare, test_config)
+
+    def wait_for(self, test_config: Dict[str, Any], timeout: float = None) -> Optional[bool]:
+        """
+        部署前等待该测试的预取任务完成，避免与未完成的下载冲突
+
+        Returns:
+            预取结果；未安排预取时返回None
+        """
+        key = self.model_key(test_config)
+        with self.lock:
+            job = self.jobs.get(key)
+        if job is None:
+            return None
+        if not job.done():
+            print(f"等待模型 {key[1]} 预取完成...")
+        try:
+            return job.result(timeout=timeout)
+        except Exception as e:
+            print(f"模型 {key[1]} 预取失败: {e}")
+            return False
+
+    def _prepare(self, test_config: Dict[str, Any]) -> bool:
+        """在后台线程中准备模型"""
+        backend = test_config.get("backend")
+        backend_config = test_config.get("backend_config", {})
+        adapter = self.service_manager.adapters.get(backend)
+        if adapter is None:
+            return False
+
+        # Ollama由服务端拉取模型，客户端无法限速
+        if (backend != "vllm" or not self.bwlimit_kbps) and not self._wait_idle(f"预取模型 {backend}"):
+            return False
+        if not adapter.prepare_model(backend_config, bwlimit_kbps=self.bwlimit_kbps):
+            return False
+
+        # 冷启动测试 (page_cache=drop) 不做预热，以免影响测量
+        if self.prewarm and backend == "vllm" and backend_config.get("page_cache") != "drop":
+            if not self._wait_idle("页缓存预热"):
+                return False
+            PageCacheController(self.service_manager.ssh_manager).apply(
+                "warm", [backend_config.get("model_path")]
+            )
+        return True
+
+    def shutdown(self):
+        """取消尚未开始的预取任务，等待测量结束的任务直接放弃"""
+        self._closed = True
+        self.idle.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
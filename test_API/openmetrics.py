@@ -0,0 +1,265 @@
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Callable, Optional
+
+from stats import MetricSketch
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# 直方图分桶上界 (秒)
+TTFT_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30]
+ITL_BUCKETS = [0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1]
+
+# 导出的分位数
+QUANTILES = [0.5, 0.9, 0.95, 0.99]
+
+# 后端遥测中导出为 gauge 的字段
+TELEMETRY_FIELDS = {
+    "gpu_kv_cache_usage": "GPU KV cache使用率 (%)",
+    "running": "后端正在运行的请求数",
+    "waiting": "后端排队等待的请求数",
+    "avg_generation_throughput": "后端统计的生成吞吐量 (tokens/s)",
+    "avg_prompt_throughput": "后端统计的预填充吞吐量 (tokens/s)",
+}
+
+
+def _label_name(name: str) -> str:
+    """把扫描维度名转换为合法的标签名，如 max-num-seqs -> max_num_seqs"""
+    name = re.sub(r"[^a-zA-Z0-9_]", "_", str(name))
+    return name if re.match(r"[a-zA-Z_]", name) else f"_{name}"
+
+
+def _labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for name, value in labels.items():
+        text = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{name}="{text}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Series:
+    """一个 (测试, 后端) 的计数器与延迟摘要"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.tokens = 0
+        # 与报告相同的可合并摘要，保证分位数与报告一致；样本先缓存，抓取时批量并入
+        self.sketches = {"ttft": MetricSketch(), "tpot": MetricSketch(), "itl": MetricSketch()}
+        self.pending: Dict[str, List[float]] = {name: [] for name in self.sketches}
+
+    def flush(self):
+        for name, values in self.pending.items():
+            if values:
+                self.sketches[name].update(values)
+                self.pending[name] = []
+
+
+class OpenMetricsExporter:
+    """
+    以 OpenMetrics 文本格式导出压测端观测到的指标，供 Prometheus 抓取
+
+    订阅事件总线，按 (测试, 后端) 累计:
+        - infermatrix_requests_total / infermatrix_errors_total / infermatrix_tokens_total
+        - infermatrix_ttft_seconds / infermatrix_itl_seconds 直方图
+        - infermatrix_latency_quantile_seconds: TTFT / TPOT / ITL 分位数
+    以及当前测试信息 (infermatrix_test_info，带配置标签)、进行中请求数与后端遥测。
+
+    延迟统计使用与报告相同的 MetricSketch，分位数与报告中的数值一致；
+    计数器在整个运行期间单调递增，符合 Prometheus 的计数器语义。
+    """
+
+    def __init__(
+        self,
+        hub,
+        config: Dict[str, Any],
+        telemetry_source: Callable[[], Optional[Dict[str, Any]]] = None,
+    ):
+        """
+        初始化导出器
+
+        Args:
+            hub: 事件总线
+            config: openmetrics 配置段:
+                - port: 监听端口 (默认9400)
+                - host: 监听地址 (默认0.0.0.0，供其他主机上的Prometheus抓取)
+            telemetry_source: 返回后端最新统计的函数 (可选)
+        """
+        self.hub = hub
+        self.port = config.get("port", 9400)
+        self.host = config.get("host", "0.0.0.0")
+        self.telemetry_source = telemetry_source
+        self.lock = threading.Lock()
+        self.series: Dict[tuple, _Series] = {}
+        self.current: Optional[tuple] = None
+        self.info: Dict[str, Any] = {}
+        self.in_flight = set()
+        self.last_token: Dict[int, float] = {}
+        self._server = None
+
+    def on_event(self, event: Dict[str, Any]):
+        kind = event["type"]
+        with self.lock:
+            if kind == "test_start":
+                self.current = (event.get("test"), event.get("backend"))
+                self.series.setdefault(self.current, _Series())
+                self.info = self._test_info(event)
+                self.in_flight.clear()
+                self.last_token.clear()
+                return
+            if self.current is None:
+                return
+            series = self.series[self.current]
+            if kind == "token":
+                previous = self.last_token.get(event["id"])
+                if previous is not None:
+                    series.pending["itl"].append(event["t"] - previous)
+                self.last_token[event["id"]] = event["t"]
+            elif kind == "request_start":
+                self.in_flight.add(event["id"])
+            elif kind == "request_end":
+                self.in_flight.discard(event.get("id"))
+                self.last_token.pop(event.get("id"), None)
+                series.requests += 1
+                if not event.get("success"):
+                    series.errors += 1
+                    return
+                series.tokens += int(event.get("token_count") or 0)
+                for name in ("ttft", "tpot"):
+                    if event.get(name) is not None:
+                        series.pending[name].append(event[name])
+            elif kind == "test_end":
+                self.info = {}
+                self.in_flight.clear()
+
+    @staticmethod
+    def _test_info(event: Dict[str, Any]) -> Dict[str, Any]:
+        """当前测试的配置标签"""
+        config = event.get("config") or {}
+        info = {
+            "test": event.get("test"),
+            "backend": event.get("backend"),
+            "model": config.get("model_path") or config.get("model") or "unknown",
+            "concurrency": event.get("concurrency", 1),
+        }
+        if event.get("config_hash"):
+            info["config_hash"] = event["config_hash"]
+        for name, value in (event.get("sweep") or {}).items():
+            info.setdefault(_label_name(name), value)
+        return info
+
+    def render(self) -> str:
+        """生成 OpenMetrics 文本"""
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"# HELP {name} {help_text}")
+
+        with self.lock:
+            for series in self.series.values():
+                series.flush()
+            items = sorted(self.series.items(), key=lambda item: tuple(map(str, item[0])))
+            info = dict(self.info)
+            in_flight = len(self.in_flight)
+
+            for name, attr, help_text in (
+                ("infermatrix_requests", "requests", "已完成的请求数"),
+                ("infermatrix_errors", "errors", "失败的请求数"),
+                ("infermatrix_tokens", "tokens", "收到的输出token数"),
+            ):
+                family(name, "counter", help_text)
+                for (test, backend), series in items:
+                    labels = _labels({"test": test, "backend": backend})
+                    lines.append(f"{name}_total{labels} {getattr(series, attr)}")
+
+            for metric, bounds, help_text in (
+                ("ttft", TTFT_BUCKETS, "首个token延迟 (秒)"),
+                ("itl", ITL_BUCKETS, "相邻输出token间隔 (秒)"),
+            ):
+                name = f"infermatrix_{metric}_seconds"
+                family(name, "histogram", help_text)
+                for (test, backend), series in items:
+                    sketch = series.sketches[metric]
+                    base = {"test": test, "backend": backend}
+                    for bound in bounds + [float("inf")]:
+                        labels = _labels(dict(base, le=_number(float(bound))))
+                        lines.append(f"{name}_bucket{labels} {sketch.count_at_most(bound)}")
+                    lines.append(f"{name}_count{_labels(base)} {sketch.count}")
+                    lines.append(f"{name}_sum{_labels(base)} {_number(sketch.total)}")
+
+            name = "infermatrix_latency_quantile_seconds"
+            family(name, "gauge", "TTFT / TPOT / ITL 分位数 (秒)，与报告使用相同的估计方法")
+            for (test, backend), series in items:
+                for metric, scale in (("ttft", 1), ("tpot", 1000), ("itl", 1)):
+                    sketch = series.sketches[metric]
+                    if not sketch.count:
+                        continue
+                    for q in QUANTILES:
+                        labels = _labels({"test": test, "backend": backend, "metric": metric, "quantile": q})
+                        lines.append(f"{name}{labels} {_number(sketch.quantile(q) / scale)}")
+
+        family("infermatrix_test", "info", "当前运行的测试及其配置")
+        if info:
+            lines.append(f"infermatrix_test_info{_labels(info)} 1")
+        family("infermatrix_in_flight_requests", "gauge", "进行中的请求数")
+        lines.append(f"infermatrix_in_flight_requests {in_flight}")
+
+        telemetry = None
+        if self.telemetry_source is not None:
+            try:
+                telemetry = self.telemetry_source()
+            except Exception:
+                telemetry = None
+        if telemetry:
+            backend = info.get("backend", "")
+            for field, help_text in TELEMETRY_FIELDS.items():
+                if field in telemetry:
+                    name = f"infermatrix_backend_{field}"
+                    family(name, "gauge", help_text)
+                    lines.append(f"{name}{_labels({'backend': backend})} {_number(telemetry[field])}")
+
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def start(self):
+        self.hub.subscribe(self.on_event)
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                data = exporter.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass  # 不打印抓取日志
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            print(f"OpenMetrics 导出启动失败 ({self.host}:{self.port}): {e}")
+            return
+        threading.Thread(target=self._server.serve_forever, daemon=True, name="openmetrics").start()
+        print(f"OpenMetrics 指标: http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        self.hub.unsubscribe(self.on_event)
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
@@ -0,0 +1,272 @@
+import os
+import sys
+import atexit
+import time
+import signal
+import asyncio
+import threading
+import subprocess
+from collections import deque
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Dict, Any, List, Optional, Union
+
+
+class ManagedProcess:
+    """受管后端进程的状态"""
+
+    def __init__(self, name: str, process, log_file: Optional[str], detached: bool):
+        self.name = name
+        self.process = process
+        self.pid = process.pid
+        self.log_file = log_file
+        self.detached = detached
+        self.started_at = time.time()
+        self.recent_output: deque = deque(maxlen=50)
+        self.stream_task = None
+
+    @property
+    def returncode(self) -> Optional[int]:
+        return self.process.returncode
+
+
+class ProcessSupervisor:
+    """
+    本地模式下的后端进程管理器
+
+    - 每个后端在独立的进程组 (会话) 中启动，停止时只向该进程组发送信号，
+      不会像 pkill -f 那样误杀名称相近的其他进程
+    - 进程输出由后台线程中的asyncio事件循环异步写入日志文件
+    - 按PID检查进程状态，并从 /proc 读取进程组的CPU与内存占用
+    """
+
+    def __init__(self):
+        self.processes: Dict[str, ManagedProcess] = {}
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, name="process-supervisor", daemon=True
+        )
+        self.thread.start()
+        # 编排器退出时停止非分离模式的进程 (否则它们会因输出管道关闭而异常退出)
+        atexit.register(self.stop_all)
+
+    def _run(self, coro, timeout: float = None):
+        """在事件循环线程中执行协程并等待结果"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def start(
+        self,
+        name: str,
+        command: Union[str, List[str]],
+        log_file: str = None,
+        env: Dict[str, str] = None,
+        cwd: str = None,
+        detach: bool = False,
+    ) -> Optional[int]:
+        """
+        启动后端进程
+
+        Args:
+            name: 进程名称 (如 vllm / ollama)，同名进程已在运行时先停止
+            command: 命令字符串 (通过shell执行) 或参数列表
+            log_file: 输出日志文件 (可选，不指定时丢弃输出)
+            env: 额外的环境变量 (可选)
+            cwd: 工作目录 (可选)
+            detach: 为True时进程输出直接写入日志文件，编排器退出后服务继续运行
+
+        Returns:
+            进程PID，启动失败时返回None
+        """
+        if self.is_running(name):
+            self.stop(name)
+        try:
+            managed = self._run(self._start(name, command, log_file, env, cwd, detach), timeout=30)
+        except (OSError, FutureTimeout) as e:
+            print(f"启动进程 {name} 失败: {e}")
+            return None
+        self.processes[name] = managed
+        print(f"已启动进程 {name} (PID {managed.pid})")
+        return managed.pid
+
+    async def _start(self, name, command, log_file, env, cwd, detach) -> ManagedProcess:
+        kwargs = {"cwd": cwd, "stdin": subprocess.DEVNULL}
+        if env:
+            kwargs["env"] = {**os.environ, **env}
+        if os.name == "nt":
+            kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs["start_new_session"] = True  # 新会话，进程组ID等于PID
+
+        log_handle = None
+        if detach and log_file:
+            log_handle = open(log_file, "wb")
+            kwargs.update(stdout=log_handle, stderr=subprocess.STDOUT)
+        elif detach:
+            kwargs.update(stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            kwargs.update(stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+        try:
+            if isinstance(command, str):
+                process = await asyncio.create_subprocess_shell(command, **kwargs)
+            else:
+                process = await asyncio.create_subprocess_exec(*command, **kwargs)
+        finally:
+            if log_handle:
+                log_handle.close()  # 子进程已继承文件描述符
+
+        managed = ManagedProcess(name, process, log_file, detach)
+        if not detach:
+            managed.stream_task = asyncio.ensure_future(self._stream_output(managed))
+        return managed
+
+    async def _stream_output(self, managed: ManagedProcess):
+        """把进程输出异步写入日志文件，并保留最近的输出行"""
+        log_handle = open(managed.log_file, "wb") if managed.log_file else None
+        try:
+            while True:
+                line = await managed.process.stdout.readline()
+                if not line:
+                    break
+                managed.recent_output.append(line.decode("utf-8", errors="replace").rstrip())
+                if log_handle:
+                    log_handle.write(line)
+                    log_handle.flush()
+        finally:
+            if log_handle:
+                log_handle.close()
+        await managed.process.wait()
+
+    def is_running(self, name: str) -> bool:
+        """按PID检查受管进程是否仍在运行"""
+        managed = self.processes.get(name)
+        if managed is None:
+            return False
+        return managed.returncode is None  # 由事件循环在子进程退出时设置
+
+    def pid(self, name: str) -> Optional[int]:
+        managed = self.processes.get(name)
+        return managed.pid if managed else None
+
+    def stop(self, name: str, timeout: float = 15) -> bool:
+        """
+        停止受管进程：先向整个进程组发送SIGTERM，超时后发送SIGKILL
+
+        Returns:
+            进程已停止 (或本来就不在运行) 返回True
+        """
+        managed = self.processes.get(name)
+        if managed is None:
+            return True
+        if not self.is_running(name):
+            del self.processes[name]
+            return True
+
+        print(f"停止进程 {name} (进程组 {managed.pid})...")
+        try:
+            stopped = self._run(self._stop(managed, timeout), timeout=timeout + 15)
+        except FutureTimeout:
+            stopped = False
+        if stopped:
+            del self.processes[name]
+            print(f"进程 {name} 已停止，退出码: {managed.returncode}")
+        else:
+            print(f"进程 {name} 未能停止")
+        return stopped
+
+    async def _stop(self, managed: ManagedProcess, timeout: float) -> bool:
+        self._signal_group(managed, graceful=True)
+        try:
+            await asyncio.wait_for(managed.process.wait(), timeout)
+        except asyncio.TimeoutError:
+            print(f"进程 {managed.name} 在 {timeout} 秒内未退出，强制终止")
+            self._signal_group(managed, graceful=False)
+            try:
+                await asyncio.wait_for(managed.process.wait(), 10)
+            except asyncio.TimeoutError:
+                return False
+        # 清理主进程退出后仍残留在进程组中的子进程 (它们也会占用输出管道)
+        self._signal_group(managed, graceful=False)
+        if managed.stream_task:
+            try:
+                await asyncio.wait_for(managed.stream_task, 5)
+            except asyncio.TimeoutError:
+                managed.stream_task.cancel()
+        return True
+
+    @staticmethod
+    def _signal_group(managed: ManagedProcess, graceful: bool):
+        try:
+            if os.name == "nt":
+                if graceful:
+                    managed.process.send_signal(signal.CTRL_BREAK_EVENT)
+                else:
+                    subprocess.run(
+                        ["taskkill", "/F", "/T", "/PID", str(managed.pid)],
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.DEVNULL,
+                    )
+            else:
+                os.killpg(managed.pid, signal.SIGTERM if graceful else signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def stop_all(self):
+        """停止全部非分离模式的受管进程"""
+        for name in list(self.processes):
+            if not self.processes[name].detached:
+                self.stop(name)
+
+    def recent_output(self, name: str, lines: int = 20) -> List[str]:
+        """进程最近的输出行 (仅非分离模式)"""
+        managed = self.processes.get(name)
+        return list(managed.recent_output)[-lines:] if managed else []
+
+    def status(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        进程状态与资源占用
+
+        Returns:
+            包含 pid / running / returncode / uptime 以及 (Linux下) 进程组的
+            num_processes / rss_mb / cpu_seconds 的字典，未受管时返回None
+        """
+        managed = self.processes.get(name)
+        if managed is None:
+            return None
+        info = {
+            "pid": managed.pid,
+            "running": self.is_running(name),
+            "returncode": managed.returncode,
+            "uptime": round(time.time() - managed.started_at, 1),
+        }
+        if info["running"]:
+            info.update(self._group_usage(managed.pid))
+        return info
+
+    @staticmethod
+    def _group_usage(pgid: int) -> Dict[str, Any]:
+        """从 /proc 汇总进程组内所有进程的CPU时间与常驻内存"""
+        if not sys.platform.startswith("linux"):
+            return {}
+        ticks = os.sysconf("SC_CLK_TCK")
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        count, cpu_ticks, rss_pages = 0, 0, 0
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat", "rb") as f:
+                    stat = f.read().decode()
+            except OSError:
+                continue
+            # 第2个字段(进程名)可能包含空格，从最后一个右括号之后开始解析
+            fields = stat[stat.rindex(")") + 2:].split()
+            if int(fields[2]) != pgid:
+                continue
+            count += 1
+            cpu_ticks += int(fields[11]) + int(fields[12])  # utime + stime
+            rss_pages += int(fields[21])
+        return {
+            "num_processes": count,
+            "cpu_seconds": round(cpu_ticks / ticks, 2),
+            "rss_mb": round(rss_pages * page_size / 1024 ** 2, 1),
+        }
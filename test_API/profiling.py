@@ -0,0 +1,289 @@
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+from records import safe_name
+
+PROFILE_DIR = "profiles"
+
+
+def _percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class StackSampler:
+    """
+    采样式分析器: 后台线程定期读取被监测线程的调用栈，累计折叠栈 (collapsed stacks)
+
+    开销只与采样频率有关，不影响被测代码中每个函数调用的耗时；
+    输出格式可直接用于 flamegraph.pl 或 speedscope。
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.threads = set()  # 被监测的线程
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def watch(self, ident: int):
+        self.threads.add(ident)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="stack-sampler")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self.threads):
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def top_functions(self, limit: int = 20) -> List[tuple]:
+        """按自身采样数 (栈顶) 排序的函数"""
+        own = Counter()
+        for stack, count in self.stacks.items():
+            own[stack.rsplit(";", 1)[-1]] += count
+        return own.most_common(limit)
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class LagTicker:
+    """
+    调度延迟探针: 固定间隔休眠并记录实际唤醒的延迟
+
+    客户端线程争用GIL或CPU饱和时，唤醒延迟明显增大
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags: List[float] = []  # 毫秒
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="lag-ticker")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        expected = time.perf_counter() + self.interval
+        while not self._stop.wait(max(0.0, expected - time.perf_counter())):
+            now = time.perf_counter()
+            self.lags.append(max(0.0, (now - expected) * 1000))
+            expected = now + self.interval
+
+
+class TestProfiler:
+    """
+    单个测试的客户端性能分析 (--profile)
+
+    - request(): 包裹每个请求 (请求循环与流式块解析)，记录线程CPU时间，
+      cprofile 模式下在该线程上启用确定性分析
+    - section(): 包裹汇总统计等主线程上的工作
+    - finish(): 停止分析，保存分析文件并计算每token的客户端CPU开销与调度延迟，
+      判断客户端 (而不是服务器) 是否限制了吞吐量
+
+    分析文件保存在 运行目录/profiles/ 下: sample 模式为折叠栈 (<测试名>.folded)，
+    cprofile 模式为 pstats 文件 (<测试名>.prof)，两种模式都写出 <测试名>.txt 摘要与
+    <测试名>.json 指标。
+    """
+
+    def __init__(self, name: str, run_dir: str, config: Dict[str, Any], concurrency: int = 1):
+        """
+        初始化分析器并开始计时
+
+        Args:
+            name: 测试名称
+            run_dir: 运行目录
+            config: profile 配置段:
+                - mode: sample (采样，默认) 或 cprofile (确定性分析，开销较大)
+                - interval: 采样间隔 (秒，默认0.005)
+                - lag_interval: 调度延迟探针间隔 (秒，默认0.01)
+                - cpu_threshold: 进程CPU占用 (核) 超过该值时认为客户端是瓶颈 (默认0.8，受GIL限制约1核)
+                - lag_threshold_ms: 调度延迟P99超过该值时认为客户端是瓶颈 (默认20)
+            concurrency: 测试的并发度。Python 3.12+ 的 cProfile 基于 sys.monitoring，
+                同一时刻只能有一个分析器启用，并发请求时 cprofile 模式退回 sample 模式
+        """
+        self.name = name
+        self.out_dir = os.path.join(run_dir, PROFILE_DIR)
+        self.mode = config.get("mode", "sample")
+        if self.mode == "cprofile" and concurrency > 1 and sys.version_info >= (3, 12):
+            print("Python 3.12+ 不支持多个线程同时启用 cProfile，并发测试改用 sample 模式分析")
+            self.mode = "sample"
+        self.cpu_threshold = config.get("cpu_threshold", 0.8)
+        self.lag_threshold_ms = config.get("lag_threshold_ms", 20)
+        self.lock = threading.Lock()
+        self.request_cpu = 0.0
+        self.requests = 0
+        self.profiles: List[cProfile.Profile] = []
+        self._local = threading.local()
+
+        self.sampler = StackSampler(config.get("interval", 0.005)) if self.mode == "sample" else None
+        self.ticker = LagTicker(config.get("lag_interval", 0.01))
+        self.ticker.start()
+        if self.sampler:
+            self.sampler.watch(threading.get_ident())
+            self.sampler.start()
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+
+    def _thread_profile(self) -> cProfile.Profile:
+        profile = getattr(self._local, "profile", None)
+        if profile is None:
+            profile = self._local.profile = cProfile.Profile()
+            with self.lock:
+                self.profiles.append(profile)
+        return profile
+
+    @contextmanager
+    def request(self):
+        """包裹一个请求"""
+        if self.sampler:
+            self.sampler.watch(threading.get_ident())
+        profile = self._thread_profile() if self.mode == "cprofile" else None
+        cpu = time.thread_time()
+        if profile:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile:
+                profile.disable()
+            elapsed = time.thread_time() - cpu
+            with self.lock:
+                self.request_cpu += elapsed
+                self.requests += 1
+
+    @contextmanager
+    def section(self):
+        """包裹主线程上的其他工作 (如汇总统计)"""
+        profile = self._thread_profile() if self.mode == "cprofile" else None
+        if profile:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile:
+                profile.disable()
+
+    def finish(self, test_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        停止分析并保存结果
+
+        Args:
+            test_results: 测试的成功请求结果，用于统计token数
+
+        Returns:
+            客户端开销指标，client_bound 为True时附带原因 reasons
+        """
+        wall = time.perf_counter() - self.wall_start
+        process_cpu = time.process_time() - self.cpu_start
+        self.ticker.stop()
+        if self.sampler:
+            self.sampler.stop()
+
+        tokens = sum(r.get("token_count") or 0 for r in test_results)
+        lags = self.ticker.lags
+        metrics = {
+            "mode": self.mode,
+            "wall_time": wall,
+            "process_cpu": process_cpu,
+            "cpu_util": process_cpu / wall if wall > 0 else 0.0,
+            "requests": self.requests,
+            "tokens": tokens,
+            "request_cpu": self.request_cpu,
+            "cpu_per_request_ms": self.request_cpu / self.requests * 1000 if self.requests else None,
+            "cpu_per_token_us": self.request_cpu / tokens * 1e6 if tokens else None,
+            "lag_p50_ms": _percentile(lags, 50),
+            "lag_p99_ms": _percentile(lags, 99),
+            "lag_max_ms": max(lags) if lags else None,
+        }
+        reasons = []
+        if metrics["cpu_util"] >= self.cpu_threshold:
+            reasons.append(f"进程CPU占用 {metrics['cpu_util']:.2f} 核 (阈值 {self.cpu_threshold})")
+        if metrics["lag_p99_ms"] is not None and metrics["lag_p99_ms"] >= self.lag_threshold_ms:
+            reasons.append(f"调度延迟P99 {metrics['lag_p99_ms']:.1f} 毫秒 (阈值 {self.lag_threshold_ms})")
+        metrics["client_bound"] = bool(reasons)
+        metrics["reasons"] = reasons
+
+        self._save(metrics)
+        self._print(metrics)
+        return metrics
+
+    def _save(self, metrics: Dict[str, Any]):
+        os.makedirs(self.out_dir, exist_ok=True)
+        base = os.path.join(self.out_dir, safe_name(self.name))
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(metrics, f, indent=2, ensure_ascii=False)
+
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            if self.sampler:
+                self.sampler.save(base + ".folded")
+                f.write(f"采样数: {self.sampler.samples}，间隔 {self.sampler.interval * 1000:.1f} 毫秒\n")
+                f.write("按自身采样数排序的函数:\n")
+                total = sum(self.sampler.stacks.values()) or 1
+                for function, count in self.sampler.top_functions():
+                    f.write(f"{count:8d} {count / total:7.1%}  {function}\n")
+            elif self.profiles:
+                stats = pstats.Stats(self.profiles[0], stream=f)
+                for profile in self.profiles[1:]:
+                    stats.add(profile)
+                stats.dump_stats(base + ".prof")
+                stats.sort_stats("cumulative").print_stats(30)
+        print(f"性能分析结果已保存: {base}.*")
+
+    def _print(self, m: Dict[str, Any]):
+        def num(value, digits, unit):
+            return "-" if value is None else f"{value:.{digits}f}{unit}"
+
+        print(
+            f"客户端开销: CPU占用 {m['cpu_util']:.2f} 核, 每token CPU {num(m['cpu_per_token_us'], 1, '微秒')}, "
+            f"每请求 CPU {num(m['cpu_per_request_ms'], 2, '毫秒')}, "
+            f"调度延迟 P50/P99/最大 {num(m['lag_p50_ms'], 2, '')}/{num(m['lag_p99_ms'], 2, '')}/{num(m['lag_max_ms'], 2, '')}毫秒"
+        )
+        if self.mode == "cprofile":
+            print("注意: cProfile 模式会放大客户端CPU开销，判断测量开销请使用 sample 模式")
+        if m["client_bound"]:
+            print("!" * 72)
+            print("!! 警告: 客户端 (压测端) 可能正在限制吞吐量，本测试的结果不能反映服务器性能!")
+            for reason in m["reasons"]:
+                print(f"!!   - {reason}")
+            print("!! 建议降低并发、使用服务器端压测代理 (remote_agent) 或在更强的机器上运行压测")
+            print("!" * 72)
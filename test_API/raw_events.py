@@ -0,0 +1,305 @@
+"""
+请求原始事件日志与版本化的指标计算
+
+测试器为每个请求记录紧凑的原始事件 (响应头、每个数据块的到达时间与token数、
+状态码、usage)，TTFT / TPOT / 吞吐量等指标全部由本模块的指标阶段从原始事件计算，
+并在结果中记录指标版本 (metrics_version)。指标定义修改后新增一个版本，
+用命令行对已有运行目录离线重算，不需要重新部署服务。
+
+用法:
+    python raw_events.py results/run_20250101_120000 --version 2
+    python raw_events.py results/run_* --version 2 --output-name metrics_v2
+"""
+
+import os
+import sys
+import glob
+import json
+import argparse
+from typing import Dict, Any, List, Optional, Callable
+
+from records import (
+    RECORDS_FILE,
+    RAW_EVENTS_FILE,
+    EVENTS_DIR,
+    iter_record_chunks,
+    iter_current_chunks,
+    request_record,
+    test_record,
+    chunked,
+)
+from stats import METRICS, summarize_requests
+
+# 原始事件格式版本
+RAW_FORMAT = 1
+
+# 测试时使用的指标版本
+METRICS_VERSION = "1"
+
+
+class RawEventLog:
+    """
+    单个请求的原始事件
+
+    时间均为相对请求开始的秒数，数据块记录为 [时间, token数, 字符数]，
+    非内容块 (如角色、结束标记、usage) 的token数为0。
+    """
+
+    def __init__(self, start: float):
+        self.start = start
+        self.status = None
+        self.headers = None
+        self.chunks: List[List[float]] = []
+        self.usage: Dict[str, Any] = {}
+        self.end = None
+        self.error = None
+
+    def response(self, status: int, t: float):
+        """收到响应头"""
+        self.status = status
+        self.headers = round(t - self.start, 6)
+
+    def chunk(self, t: float, tokens: int = 0, chars: int = 0):
+        """收到一个数据块"""
+        self.chunks.append([round(t - self.start, 6), tokens, chars])
+
+    def finish(self, t: float, error: str = None):
+        self.end = round(t - self.start, 6)
+        self.error = error
+
+    def to_dict(self) -> Dict[str, Any]:
+        raw = {
+            "format": RAW_FORMAT,
+            "start": self.start,
+            "status": self.status,
+            "headers": self.headers,
+            "chunks": self.chunks,
+            "end": self.end,
+        }
+        if self.usage:
+            raw["usage"] = self.usage
+        if self.error:
+            raw["error"] = self.error
+        return raw
+
+
+def usage_from_chunk(data: Dict[str, Any]) -> Dict[str, Any]:
+    """从响应 (或最后一个流式块) 中提取token用量"""
+    usage = data.get("usage")
+    if isinstance(usage, dict):
+        return {k: v for k, v in usage.items() if isinstance(v, (int, float))}
+    if "eval_count" in data:
+        # Ollama 在最后一个块中给出生成与提示词token数
+        return {
+            "completion_tokens": data.get("eval_count"),
+            "prompt_tokens": data.get("prompt_eval_count"),
+        }
+    return {}
+
+
+def _non_streaming(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """非流式请求只有总耗时与服务端给出的token数"""
+    return {
+        "ttft": None,
+        "tpot": None,
+        "throughput": None,
+        "token_count": (raw.get("usage") or {}).get("completion_tokens"),
+        "total_time": raw.get("end"),
+    }
+
+
+def metrics_v1(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    版本1: 测试器最初的指标定义
+
+    - ttft: 首个数据块 (包括非内容块) 的到达时间
+    - token_count: 内容块个数 (近似token数)
+    - throughput: token_count / (最后一个内容块时间 - 首个数据块时间)
+    - tpot: 1000 / throughput (毫秒)，内容块少于2个时为0
+    """
+    chunks = raw.get("chunks") or []
+    if not chunks:
+        return _non_streaming(raw)
+    content = [c for c in chunks if c[1] > 0]
+    token_count = sum(c[1] for c in content)
+    ttft = chunks[0][0] if chunks else None
+    throughput = 0.0
+    if chunks and len(content) > 1:
+        generation_time = content[-1][0] - chunks[0][0]
+        throughput = token_count / generation_time if generation_time > 0 else 0.0
+    return {
+        "ttft": ttft,
+        "tpot": 1000 / throughput if throughput > 0 else 0,
+        "throughput": throughput,
+        "token_count": token_count,
+        "total_time": raw.get("end"),
+    }
+
+
+def metrics_v2(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    版本2: 与常用推理基准一致的定义
+
+    - ttft: 首个内容token的到达时间
+    - token_count: 服务端 usage 中的 completion_tokens (没有时为内容块token数)
+    - tpot: (最后一个内容块时间 - 首个内容块时间) / (token_count - 1) (毫秒)，不含首个token
+    - throughput: token_count / 总耗时
+    """
+    if not raw.get("chunks"):
+        return _non_streaming(raw)
+    content = [c for c in raw["chunks"] if c[1] > 0]
+    usage = raw.get("usage") or {}
+    token_count = usage.get("completion_tokens") or sum(c[1] for c in content)
+    total_time = raw.get("end")
+    ttft = content[0][0] if content else None
+    tpot = 0
+    if len(content) > 1 and token_count > 1:
+        tpot = (content[-1][0] - content[0][0]) / (token_count - 1) * 1000
+    return {
+        "ttft": ttft,
+        "tpot": tpot,
+        "throughput": token_count / total_time if total_time else 0.0,
+        "token_count": token_count,
+        "total_time": total_time,
+    }
+
+
+METRIC_VERSIONS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    "1": metrics_v1,
+    "2": metrics_v2,
+}
+
+
+def compute_metrics(raw: Dict[str, Any], version: str = METRICS_VERSION) -> Dict[str, Any]:
+    """
+    按指定版本的定义从原始事件计算请求指标
+
+    Returns:
+        ttft / tpot / throughput / token_count / total_time 与 metrics_version
+    """
+    if version not in METRIC_VERSIONS:
+        raise ValueError(f"未知的指标版本: {version}，可用版本: {', '.join(METRIC_VERSIONS)}")
+    metrics = METRIC_VERSIONS[version](raw)
+    metrics["metrics_version"] = version
+    return metrics
+
+
+def iter_raw_events(run_dir: str):
+    """
+    按顺序读取运行目录中每个请求的原始事件记录
+
+    读取 events/ 下每个测试的压缩文件，同时兼容旧版运行目录中的 raw_events.ndjson
+    """
+    paths = sorted(glob.glob(os.path.join(run_dir, EVENTS_DIR, "*.ndjson.gz")), key=os.path.getmtime)
+    legacy = os.path.join(run_dir, RAW_EVENTS_FILE)
+    if os.path.exists(legacy):
+        paths.insert(0, legacy)
+    for path in paths:
+        for chunk in iter_record_chunks(path):
+            yield from chunk
+
+
+def recompute_run(run_dir: str, version: str, output_name: str = None) -> Optional[str]:
+    """
+    用指定版本的指标定义重算一个运行目录
+
+    结果写入 <运行目录>/<output_name>/ 下的 records.ndjson 与 test_results.json
+    (test_results.json 只含测试级记录)，可以直接用于 matrix_cube.py 或
+    run_tests.py --resume <目录> --generate-report
+
+    没有原始事件的测试 (如旧版压测代理的测试) 无法重算，原样复制其测试与请求记录，
+    保留原来的 metrics_version 并打印警告
+
+    Returns:
+        输出目录，运行目录中没有原始事件时返回None
+    """
+    requests_by_test: Dict[str, List[Dict[str, Any]]] = {}
+    for event in iter_raw_events(run_dir):
+        result = {k: v for k, v in event.items() if k not in ("type", "raw", "test", "backend", "concurrency")}
+        raw = event.get("raw") or {}
+        result["success"] = raw.get("status") == 200 and not raw.get("error")
+        if result["success"]:
+            result.update(compute_metrics(raw, version))
+        requests_by_test.setdefault(event.get("test"), []).append(
+            dict(result, _backend=event.get("backend"), _concurrency=event.get("concurrency", 1))
+        )
+    if not requests_by_test:
+        print(f"{run_dir} 中没有原始事件记录 ({EVENTS_DIR}/ 或 {RAW_EVENTS_FILE})，无法重算")
+        return None
+
+    # 测试级记录: 配置等字段沿用原记录，汇总统计重新计算
+    tests: Dict[str, Dict[str, Any]] = {}
+    copied: Dict[str, List[Dict[str, Any]]] = {}  # 没有原始事件的测试的请求记录
+    records_path = os.path.join(run_dir, RECORDS_FILE)
+    if os.path.exists(records_path):
+        for chunk in iter_current_chunks(records_path):
+            for record in chunk:
+                if record.get("type") == "test":
+                    tests[record.get("name")] = record
+                elif record.get("type") == "request" and record.get("test") not in requests_by_test:
+                    copied.setdefault(record.get("test"), []).append(record)
+    skipped = [name for name in tests if name not in requests_by_test]
+    if skipped:
+        print(
+            f"警告: {len(skipped)} 个测试没有原始事件，无法按指标版本 {version} 重算，"
+            f"原样复制 (保留原来的指标版本): {', '.join(skipped)}"
+        )
+
+    out_dir = os.path.join(run_dir, output_name or f"metrics_v{version}")
+    os.makedirs(out_dir, exist_ok=True)
+
+    def records():
+        for name, results in requests_by_test.items():
+            succeeded = [r for r in results if r["success"]]
+            test = dict(tests.get(name) or {"name": name, "success": True})
+            test.pop("type", None)
+            summary = {
+                k: v for k, v in (test.get("summary") or {}).items()
+                if not any(k.startswith(f"{m}_") for m in METRICS)
+            }
+            summary.update(summarize_requests(succeeded))
+            test.update({"summary": summary, "metrics_version": version})
+            yield test_record(test)
+            for r in results:
+                yield request_record(name, r.pop("_backend"), r.pop("_concurrency"), r)
+        for name in skipped:
+            yield tests[name]
+            yield from copied.get(name, [])
+
+    tests_out = []
+    with open(os.path.join(out_dir, RECORDS_FILE), "w", encoding="utf-8") as f:
+        for chunk in chunked(records()):
+            for record in chunk:
+                if record["type"] == "test":
+                    tests_out.append({k: v for k, v in record.items() if k != "type"})
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    with open(os.path.join(out_dir, "test_results.json"), "w", encoding="utf-8") as f:
+        json.dump(tests_out, f, indent=2, ensure_ascii=False, default=str)
+
+    for test in tests_out:
+        summary = test.get("summary") or {}
+        if "ttft_p50" in summary and test.get("name") not in skipped:
+            print(
+                f"{test['name']}: TTFT P50 {summary['ttft_p50']:.4f}秒, TPOT P50 {summary['tpot_p50']:.2f}毫秒, "
+                f"吞吐量 P50 {summary['throughput_p50']:.2f}个/秒"
+            )
+    print(f"已按指标版本 {version} 重算 {len(tests_out) - len(skipped)} 个测试: {out_dir}")
+    return out_dir
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="从原始事件日志离线重算请求指标")
+    parser.add_argument("run_dirs", nargs="+", help="运行目录 (支持通配符)")
+    parser.add_argument(
+        "--version", default=METRICS_VERSION, choices=sorted(METRIC_VERSIONS), help="指标定义版本"
+    )
+    parser.add_argument("--output-name", help="输出子目录名 (默认 metrics_v<版本>)")
+    args = parser.parse_args(argv)
+
+    run_dirs = [d for pattern in args.run_dirs for d in sorted(glob.glob(pattern)) or [pattern]]
+    done = [d for d in run_dirs if os.path.isdir(d) and recompute_run(d, args.version, args.output_name)]
+    return 0 if done else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+import os
+import re
+import gzip
+import json
+import threading
+from typing import Dict, Any, List, Iterator, Iterable
+
+RECORDS_FILE = "records.ndjson"
+RAW_EVENTS_FILE = "raw_events.ndjson"  # 旧版运行目录中的原始事件 (单个未压缩文件)
+EVENTS_DIR = "events"  # 每个测试一个压缩的原始事件文件: events/<测试名>.ndjson.gz
+
+# 测试整体重跑 (如续跑压测代理测试) 的标记，之前该测试的请求记录作废
+RESTART_MARK = '"type":"restart"'
+
+# 请求记录中保留的数值字段 (不含生成文本与流式块)
+REQUEST_FIELDS = [
+    "round", "prompt_id", "timestamp", "ttft", "tpot", "throughput", "token_count", "total_time",
+    "metrics_version",
+]
+
+# 测试记录中不保留的字段 (请求级数据已单独记录)
+TEST_EXCLUDED_FIELDS = ("test_results", "warmup_results")
+
+
+def safe_name(name: str) -> str:
+    """把测试名称转换为可用作文件名的字符串"""
+    return re.sub(r"[^\w.=-]+", "_", name or "unnamed_test")
+
+
+def request_record(name: str, backend: str, concurrency: int, result: Dict[str, Any]) -> Dict[str, Any]:
+    """把单个请求的结果压缩为只含数值指标的记录"""
+    record = {
+        "type": "request",
+        "test": name,
+        "backend": backend,
+        "concurrency": concurrency,
+        "success": bool(result.get("success")),
+    }
+    for field in REQUEST_FIELDS:
+        if result.get(field) is not None:
+            record[field] = result[field]
+    return record
+
+
+def test_record(result: Dict[str, Any]) -> Dict[str, Any]:
+    """测试级记录：名称、配置、汇总统计等，不含请求明细"""
+    record = {k: v for k, v in result.items() if k not in TEST_EXCLUDED_FIELDS}
+    record["type"] = "test"
+    return record
+
+
+def records_from_results(results: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """把内存中的测试结果 (test_results.json 格式) 转换为记录流"""
+    for result in results:
+        yield test_record(result)
+        for r in result.get("test_results", []):
+            yield request_record(
+                result.get("name"), result.get("backend"), result.get("concurrency", 1), r
+            )
+
+
+class RecordWriter:
+    """
+    把请求级与测试级记录流式追加到运行目录下的 records.ndjson
+
+    每个请求完成时追加一行，只含数值指标；测试完成时追加一行测试记录。
+    报告与统计按块读取该文件，内存占用与结果规模无关。
+
+    请求的原始事件 (块到达时间与token数，被抽样请求还包括每个块的原始文本)
+    写入每个测试一个的 gzip 压缩NDJSON文件，测试记录写入时关闭该测试的文件。
+    """
+
+    def __init__(self, run_dir: str, compress_level: int = 6, flush_every: int = 200):
+        """
+        Args:
+            run_dir: 运行目录
+            compress_level: 原始事件文件的压缩级别 (1-9)
+            flush_every: 原始事件每写入多少条刷新一次 (中断时最多丢失这么多条)
+        """
+        self.path = os.path.join(run_dir, RECORDS_FILE)
+        self.events_dir = os.path.join(run_dir, EVENTS_DIR)
+        self.compress_level = compress_level
+        self.flush_every = flush_every
+        self.lock = threading.Lock()
+        self._event_files: Dict[str, Any] = {}
+        self._pending: Dict[str, int] = {}
+
+    @staticmethod
+    def _dumps(record: Dict[str, Any]) -> str:
+        return json.dumps(record, ensure_ascii=False, default=str, separators=(",", ":"))
+
+    def _append(self, record: Dict[str, Any]):
+        line = self._dumps(record)
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def record_raw(self, name: str, backend: str, concurrency: int, result: Dict[str, Any]):
+        """追加一个请求的原始事件，离线重算指标时使用"""
+        record = {
+            "type": "raw",
+            "test": name,
+            "backend": backend,
+            "concurrency": concurrency,
+            "round": result.get("round"),
+            "prompt_id": result.get("prompt_id"),
+            "timestamp": result.get("timestamp"),
+            "raw": result.get("raw"),
+        }
+        if result.get("chunks"):
+            record["chunks"] = result["chunks"]
+        line = self._dumps(record) + "\n"
+        with self.lock:
+            f = self._event_files.get(name)
+            if f is None:
+                os.makedirs(self.events_dir, exist_ok=True)
+                # 续跑时以追加方式打开，gzip文件由多个成员组成，读取时自动连接
+                path = os.path.join(self.events_dir, safe_name(name) + ".ndjson.gz")
+                f = self._event_files[name] = gzip.open(
+                    path, "at", encoding="utf-8", compresslevel=self.compress_level
+                )
+            f.write(line)
+            self._pending[name] = self._pending.get(name, 0) + 1
+            if self._pending[name] >= self.flush_every:
+                f.flush()
+                self._pending[name] = 0
+
+    def record_request(self, name: str, backend: str, concurrency: int, result: Dict[str, Any]):
+        self._append(request_record(name, backend, concurrency, result))
+
+    def record_warmup(self, name: str, backend: str, concurrency: int, result: Dict[str, Any]):
+        """追加一个预热请求的记录 (type 为 warmup，汇总统计只读取 type 为 request 的记录)"""
+        record = request_record(name, backend, concurrency, result)
+        record["type"] = "warmup"
+        self._append(record)
+
+    def record_restart(self, name: str):
+        """
+        标记测试整体重跑，读取时 (iter_current_chunks) 跳过此前该测试的请求记录；
+        此前该测试的原始事件同样作废，直接删除
+        """
+        self._append({"type": "restart", "test": name})
+        self.close_events(name)
+        path = os.path.join(self.events_dir, safe_name(name) + ".ndjson.gz")
+        if os.path.exists(path):
+            os.remove(path)
+
+    def record_test(self, result: Dict[str, Any]):
+        self._append(test_record(result))
+        self.close_events(result.get("name"))
+
+    def close_events(self, name: str = None):
+        """关闭一个测试 (默认全部测试) 的原始事件文件"""
+        with self.lock:
+            names = [name] if name is not None else list(self._event_files)
+            for n in names:
+                f = self._event_files.pop(n, None)
+                if f is not None:
+                    f.close()
+                self._pending.pop(n, None)
+
+
+def iter_record_chunks(path: str, chunk_size: int = 50000) -> Iterator[List[Dict[str, Any]]]:
+    """
+    按块读取记录文件
+
+    Args:
+        path: records.ndjson 路径 (.gz 结尾时按gzip读取)
+        chunk_size: 每块的记录数
+
+    Yields:
+        记录列表 (最多 chunk_size 条)，中断时未写完的行会被跳过
+    """
+    chunk = []
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            try:
+                chunk.append(json.loads(line))
+            except ValueError:
+                continue
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def chunked(records: Iterable[Dict[str, Any]], chunk_size: int = 50000) -> Iterator[List[Dict[str, Any]]]:
+    """把记录流切分为块"""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_current_chunks(path: str, chunk_size: int = 50000) -> Iterator[List[Dict[str, Any]]]:
+    """
+    按块读取记录文件，跳过被整体重跑的测试在重跑标记之前的请求记录
+
+    先按文本扫描重跑标记 (不解析JSON)，没有标记时与 iter_record_chunks 相同；
+    内存占用只与重跑的测试数有关
+
+    Args:
+        path: records.ndjson 路径
+        chunk_size: 每块的记录数
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    restarts: Dict[str, int] = {}  # 测试名 -> 最后一个重跑标记的行号
+    with opener(path, "rt", encoding="utf-8") as f:
+        for index, line in enumerate(f):
+            if RESTART_MARK in line:
+                try:
+                    restarts[json.loads(line).get("test")] = index
+                except ValueError:
+                    continue
+    if not restarts:
+        yield from iter_record_chunks(path, chunk_size)
+        return
+
+    chunk = []
+    with opener(path, "rt", encoding="utf-8") as f:
+        for index, line in enumerate(f):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("type") == "request" and index < restarts.get(record.get("test"), -1):
+                continue
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,209 @@
+import os
+import json
+import time
+from typing import Dict, Any, List, Optional, Callable
+from urllib.parse import urlsplit, urlunsplit
+
+from raw_events import compute_metrics
+from ssh_connecting import SSHManager
+
+# 压测代理脚本 (只依赖标准库)，运行时上传到服务器
+AGENT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "load_agent.py")
+
+
+def localize_url(url: str) -> str:
+    """把API URL中的主机名替换为localhost，供服务器本机上的代理使用"""
+    parts = urlsplit(url)
+    netloc = "localhost"
+    if parts.port:
+        netloc = f"localhost:{parts.port}"
+    return urlunsplit((parts.scheme, netloc, parts.path, parts.query, parts.fragment))
+
+
+class RemoteLoadRunner:
+    """
+    在服务器端运行压测代理，并把结果按本地时钟合并回编排器
+
+    代理只记录每个请求的原始事件 (与本地测试器的格式相同)，指标在这里按当前的
+    指标版本计算，原始事件保留在结果的 raw 字段中，供离线重算使用
+    """
+
+    def __init__(self, ssh_manager: SSHManager, agent_config: Dict[str, Any] = None):
+        """
+        初始化远程压测执行器
+
+        Args:
+            ssh_manager: SSH管理器
+            agent_config: 代理配置，包含:
+                - python: 远程Python解释器 (可选，默认python3)
+                - remote_path: 代理脚本上传路径 (可选)
+                - sync_probes: 时钟同步探测次数 (可选，默认8)
+                - timeout: 单个请求超时时间(秒) (可选，默认30)
+        """
+        agent_config = agent_config or {}
+        self.ssh = ssh_manager
+        self.python = agent_config.get("python", "python3")
+        self.remote_path = agent_config.get("remote_path", "/tmp/infermatrix_load_agent.py")
+        self.sync_probes = agent_config.get("sync_probes", 8)
+        self.timeout = agent_config.get("timeout", 30)
+        self.clock_offset = 0.0  # 远程时钟 - 本地时钟 (秒)
+        self.sync_rtt = None
+
+    def _deploy_agent(self) -> Optional[str]:
+        """上传代理脚本，返回远程脚本路径"""
+        if self.ssh.local_mode:
+            return AGENT_SCRIPT
+        if not self.ssh.upload_file(AGENT_SCRIPT, self.remote_path):
+            print("压测代理上传失败")
+            return None
+        return self.remote_path
+
+    def _sync_clock(self, channel) -> bool:
+        """
+        通过代理通道估计时钟偏移
+
+        取往返时间最短的一次探测，假设上下行延迟对称:
+            offset = 远程时间 - (发送时间 + 接收时间) / 2
+        """
+        best = None
+        for n in range(self.sync_probes):
+            send_time = time.time()
+            channel.send_line(f"SYNC {n}")
+            line = channel.read_line()
+            recv_time = time.time()
+            if not line:
+                return False
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if message.get("type") != "sync":
+                continue
+            rtt = recv_time - send_time
+            if best is None or rtt < best[0]:
+                best = (rtt, message["t"] - (send_time + recv_time) / 2)
+
+        if best is None:
+            return False
+        self.sync_rtt, self.clock_offset = best
+        print(
+            f"时钟同步完成: 偏移 {self.clock_offset * 1000:.2f}毫秒, "
+            f"往返 {self.sync_rtt * 1000:.2f}毫秒"
+        )
+        return True
+
+    def run(
+        self,
+        framework: str,
+        api_url: str,
+        model: str,
+        prompts: List[str],
+        max_tokens: int,
+        repeat: int = 1,
+        streaming: bool = True,
+        concurrency: int = 1,
+        on_result: Callable[[Dict[str, Any]], None] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        在服务器上执行压测
+
+        Args:
+            framework: 框架名称
+            api_url: 编排器视角的API URL
+            model: 模型名称
+            prompts: 测试提示词
+            max_tokens: 最大生成token数
+            repeat: 重复轮数
+            streaming: 是否使用流式API
+            concurrency: 并发请求数
+            on_result: 每收到一个结果时的回调 (可选)
+
+        Returns:
+            结果列表，格式与 LLMTester.run_performance_test 一致 (包括原始事件 raw)，
+            并附带 prompt_id / prompt / round / timestamp 字段
+        """
+        agent_path = self._deploy_agent()
+        if not agent_path:
+            return []
+
+        headers = {"Content-Type": "application/json"}
+        if framework == "vllm":
+            headers["Authorization"] = "Bearer no-key-required"
+
+        job = {
+            "framework": framework,
+            "url": localize_url(api_url),
+            "model": model,
+            "prompts": prompts,
+            "max_tokens": max_tokens,
+            "repeat": repeat,
+            "streaming": streaming,
+            "concurrency": concurrency,
+            "headers": headers,
+            "timeout": self.timeout,
+        }
+
+        channel = self.ssh.open_command_channel(f"{self.python} -u {agent_path}")
+        if channel is None:
+            print("无法启动压测代理")
+            return []
+
+        results = []
+        try:
+            ready = channel.read_line()
+            if not ready:
+                print(f"压测代理启动失败: {channel.read_stderr()}")
+                return []
+
+            if not self._sync_clock(channel):
+                print("时钟同步失败，按零偏移处理")
+                self.clock_offset = 0.0
+
+            print(f"压测代理开始执行: {job['url']} (并发 {concurrency})")
+            channel.send_line("JOB " + json.dumps(job, separators=(",", ":"), ensure_ascii=False))
+
+            while True:
+                line = channel.read_line()
+                if not line:
+                    print(f"压测代理意外退出: {channel.read_stderr()}")
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+
+                if message.get("type") == "done":
+                    break
+                if message.get("type") == "error":
+                    print(f"压测代理错误: {message.get('error')}")
+                    break
+                if message.get("type") != "result":
+                    continue
+
+                results.append(self._to_local_result(message, prompts))
+                if on_result:
+                    on_result(results[-1])
+        finally:
+            channel.close()
+
+        return results
+
+    def _to_local_result(self, message: Dict[str, Any], prompts: List[str]) -> Dict[str, Any]:
+        """把代理结果转换为本地时钟下的测试结果"""
+        result = {k: v for k, v in message.items() if k not in ("type", "start_ts", "end_ts")}
+        raw = result.get("raw")
+        if raw:
+            # 原始事件中的时间相对请求开始，只需把开始时间换算到本地时钟
+            raw["start"] -= self.clock_offset
+            result["start_time"] = raw["start"]
+            result["timestamp"] = raw["start"] + (raw.get("end") or 0)
+            if result.get("success") and result.get("chunk_count") == 0:
+                result.update({"success": False, "error": "流式响应中没有收到任何数据块"})
+            elif result.get("success"):
+                result.update(compute_metrics(raw))
+        else:
+            result["timestamp"] = time.time()
+        result["prompt"] = prompts[message["prompt_id"]]
+        result["measured_by"] = "remote_agent"
+        result["clock_offset"] = self.clock_offset
+        return result
@@ -0,0 +1,190 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List
+
+# 图表渲染函数在子进程中执行，参数只包含可序列化的普通数据 (字典、列表)，
+# matplotlib / seaborn 在渲染时才导入，CLI启动时不需要加载绘图库
+
+# 绘图逻辑变化时递增，使图表缓存中的旧图失效
+RENDER_VERSION = "1"
+
+CHINESE_FONTS = ["SimHei", "Microsoft YaHei", "WenQuanYi Micro Hei", "Heiti TC", "Arial Unicode MS"]
+
+
+def _setup_matplotlib():
+    """使用非交互式后端导入matplotlib，并设置中文字体"""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    plt.rcParams["font.sans-serif"] = CHINESE_FONTS
+    plt.rcParams["axes.unicode_minus"] = False  # 解决负号显示问题
+    return plt
+
+
+def chinese_font():
+    """获取中文字体属性，确保中文显示正常"""
+    from matplotlib.font_manager import FontProperties
+
+    # 尝试使用系统中可能的中文字体
+    return FontProperties(family=CHINESE_FONTS + ["DejaVu Sans"])
+
+
+def render_metric_chart(spec: Dict[str, Any]) -> str:
+    """
+    绘制单个指标随横坐标参数变化的折线图
+
+    Args:
+        spec: 图表规格，包含:
+            - path: 输出文件路径
+            - backend / metric_name / y_unit / test_param: 标题与坐标轴
+            - series: {图例名称: [(横坐标, 数值), ...]} 已按横坐标排序
+            - dpi: 分辨率 (可选，默认300)
+
+    Returns:
+        输出文件路径
+    """
+    plt = _setup_matplotlib()
+    import seaborn as sns
+
+    plt.figure(figsize=(10, 6))
+    sns.set_style("whitegrid")
+
+    # 绘制折线
+    for model, points in spec["series"].items():
+        x = [p[0] for p in points]
+        y = [p[1] for p in points]
+        plt.plot(x, y, marker="o", label=model, linewidth=2, markersize=6)
+
+    # 图表设置
+    test_param = spec["test_param"]
+    plt.xlabel(test_param, fontsize=12)
+    plt.ylabel(f"{spec['metric_name']} ({spec['y_unit']})", fontsize=12)
+    plt.title(f"{spec['backend']} - {spec['metric_name']} vs {test_param}", fontsize=14)
+    plt.legend(title="Models", fontsize=10)
+    plt.xticks(rotation=45, ha="right")
+    plt.tight_layout()
+
+    plt.savefig(spec["path"], dpi=spec.get("dpi", 300))
+    plt.close()
+    return spec["path"]
+
+
+def render_combined_chart(spec: Dict[str, Any]) -> str:
+    """
+    绘制合并大图：顶部为配置信息，下面每个指标一幅子图
+
+    Args:
+        spec: 图表规格，包含:
+            - path: 输出文件路径
+            - backend / test_param: 标题与坐标轴
+            - config_text: 配置信息文本
+            - metrics: [{metric_name, y_unit, series}, ...]，series 格式同 render_metric_chart
+            - dpi: 分辨率 (可选，默认300)
+
+    Returns:
+        输出文件路径
+    """
+    plt = _setup_matplotlib()
+    import seaborn as sns
+    import numpy as np
+
+    font = chinese_font()
+    test_param = spec["test_param"]
+
+    # 创建大图
+    fig = plt.figure(figsize=(20, 30))
+    sns.set_style("whitegrid")
+    fig.suptitle(
+        f"{spec['backend']} - 性能测试报告", fontsize=30, fontweight="bold", y=0.95,
+        fontproperties=font,
+    )
+
+    # 网格布局：第一行用于配置信息，下面每行一幅指标图
+    metrics = spec["metrics"]
+    grid_spec = plt.GridSpec(
+        len(metrics) + 1, 1, height_ratios=[0.8] + [1] * len(metrics), hspace=0.4
+    )
+
+    # 第一行：配置信息区域
+    config_ax = fig.add_subplot(grid_spec[0])
+    config_ax.axis("off")  # 隐藏坐标轴
+    config_ax.text(
+        0.02, 0.5, spec["config_text"], fontsize=11, va="center", ha="left",
+        bbox=dict(boxstyle="round,pad=0.5", facecolor="lightgray", alpha=0.7),
+        fontproperties=font,
+    )
+
+    # 为每个指标创建子图
+    for i, metric in enumerate(metrics):
+        ax = fig.add_subplot(grid_spec[i + 1])
+        series = metric["series"]
+        colors = plt.cm.Set3(np.linspace(0, 1, len(series)))
+        for (model, points), color in zip(series.items(), colors):
+            x = [p[0] for p in points]
+            y = [p[1] for p in points]
+            ax.plot(x, y, marker="o", label=model, linewidth=2, markersize=6, color=color)
+
+            # 在数据点上添加数值标签
+            for x_val, y_val in zip(x, y):
+                ax.annotate(
+                    f"{y_val:.2f}", (x_val, y_val), textcoords="offset points",
+                    xytext=(0, 8), ha="center", fontsize=8,
+                )
+
+        # 子图设置
+        ax.set_xlabel(test_param, fontsize=11)
+        ax.set_ylabel(f"{metric['metric_name']} ({metric['y_unit']})", fontsize=11)
+        ax.set_title(f"{metric['metric_name']} vs {test_param}", fontsize=13, fontweight="bold")
+        ax.legend(title="Models", fontsize=9)
+        ax.tick_params(axis="x", rotation=45)
+        ax.grid(True, alpha=0.3)
+
+    plt.tight_layout()
+    plt.savefig(spec["path"], dpi=spec.get("dpi", 300), bbox_inches="tight")
+    plt.close()
+    return spec["path"]
+
+
+RENDERERS = {
+    "metric": render_metric_chart,
+    "combined": render_combined_chart,
+}
+
+
+def render_chart(spec: Dict[str, Any]) -> str:
+    """按规格中的 kind 渲染图表"""
+    return RENDERERS[spec["kind"]](spec)
+
+
+def render_all(specs: List[Dict[str, Any]], workers: int = None) -> List[str]:
+    """
+    并行渲染全部图表
+
+    每个子进程独立导入matplotlib并使用Agg后端，图表之间互不影响；
+    只有一幅图或 workers 为1时在当前进程中渲染。
+
+    Args:
+        specs: 图表规格列表
+        workers: 进程数 (可选，默认为CPU核数)
+
+    Returns:
+        已生成的文件路径列表
+    """
+    if not specs:
+        return []
+    workers = min(workers or os.cpu_count() or 1, len(specs))
+    if workers <= 1:
+        return [render_chart(spec) for spec in specs]
+
+    # 使用spawn启动子进程，避免在有后台线程 (日志跟踪、进程管理) 的进程中fork
+    context = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            return list(executor.map(render_chart, specs))
+    except (BrokenProcessPool, OSError) as e:
+        print(f"并行渲染失败 ({e})，改为逐个渲染")
+        return [render_chart(spec) for spec in specs]
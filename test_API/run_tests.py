@@ -15,6 +15,14 @@ command_args = {
     "--repeat": "--repeat nums                  设置测试重复次数",
     "--maxtokens": "--maxtokens nums               覆盖最大生成token数",
     "--prompts": "--prompts prompt               覆盖测试提示词",
+    "--resume": "--resume run_dir(str)           续跑中断的运行目录，跳过已完成的测试和请求",
+    "--axis": "--axis param(str)              报告横坐标参数，可以是任意扫描维度(覆盖配置中的report_axis)",
+    "--autotune": "--autotune                     按配置中的autotune段自动调优vLLM服务参数(延迟SLO下最大化goodput)",
+    "--live": "--live                         测试期间显示实时指标(滚动tokens/s、进行中请求、TTFT/ITL百分位、错误率、KV cache)",
+    "--live-port": "--live-port port(int)          在本地端口提供实时看板网页，可在页面上中止当前测试",
+    "--metrics-port": "--metrics-port port(int)       在该端口提供OpenMetrics指标(/metrics)，供Prometheus抓取压测端观测到的延迟",
+    "--trace": "--trace                        为每个测试导出请求时间线(运行目录/traces/*.trace.json，可用ui.perfetto.dev打开)",
+    "--profile": "--profile [sample|cprofile]     分析客户端开销(请求循环、流式块解析、汇总统计)，保存到运行目录/profiles，客户端成为瓶颈时告警",
     "--helps": "--helps                        测试代码使用说明",
 }
 
@@ -44,6 +52,19 @@ def main():
     parser.add_argument("--repeat", type=int, help="覆盖测试重复次数")
     parser.add_argument("--maxtokens", type=int, help="覆盖最大生成token数")
     parser.add_argument("--prompts", nargs="+", help="覆盖测试提示词")
+    parser.add_argument("--axis", type=str, help="报告横坐标参数 (任意扫描维度)")
+    parser.add_argument("--resume", type=str, help="续跑中断的运行目录")
+    parser.add_argument(
+        "--autotune", action="store_true", help="自动调优vLLM服务参数"
+    )
+    parser.add_argument("--live", action="store_true", help="测试期间显示实时指标")
+    parser.add_argument("--live-port", type=int, help="实时看板网页端口")
+    parser.add_argument("--metrics-port", type=int, help="OpenMetrics指标端口")
+    parser.add_argument("--trace", action="store_true", help="导出请求时间线")
+    parser.add_argument(
+        "--profile", nargs="?", const="sample", choices=["sample", "cprofile"],
+        help="分析客户端开销 (默认采样模式)",
+    )
     # 用户帮助手册
     parser.add_argument("--helps", action="store_true", help="测试代码使用说明")
 
@@ -70,6 +91,13 @@ def main():
             print(f"{i + 1}. {test['name']} ({test['backend']})")
         return
 
+    if args.axis:
+        orchestrator.config.config["report_axis"] = args.axis
+
+    # 续跑已有的运行目录 (也可与 --generate-report 一起使用，为该目录生成报告)
+    if args.resume and not orchestrator.resume(args.resume):
+        return
+
     # 只生成报告
     if args.generate_report:
         orchestrator.generate_report()
@@ -87,6 +115,24 @@ def main():
         orchestrator.config.config["max_tokens"] = args.maxtokens
     if args.prompts:
         orchestrator.config.config["prompts"] = args.prompts
+    if args.live or args.live_port:
+        live_config = orchestrator.config.config.setdefault("live_metrics", {})
+        live_config["enabled"] = True
+        if args.live_port:
+            live_config["http_port"] = args.live_port
+    if args.profile:
+        orchestrator.config.config["profile"] = dict(
+            orchestrator.config.config.get("profile", {}), enabled=True, mode=args.profile
+        )
+    if args.trace:
+        orchestrator.config.config.setdefault("trace", {})["enabled"] = True
+    if args.metrics_port:
+        orchestrator.config.config["openmetrics"] = dict(
+            orchestrator.config.config.get("openmetrics", {}), enabled=True, port=args.metrics_port
+        )
+
+    # 本地模式下，只部署或不清理时服务需要在脚本退出后继续运行
+    orchestrator.service_manager.detach_services = args.deploy_only or args.no_cleanup
 
     # 运行测试
     try:
@@ -137,14 +183,16 @@ def main():
             # for test in selected_tests:
             #    orchestrator.run_test(test)
             #    orchestrator.save_results()
+        if args.autotune:
+            # 自动调优，每次试验的测试结果同样保存并生成报告
+            orchestrator.run_autotune()
         # 运行选中的测试
-        if tests_to_run:
+        elif tests_to_run:
             for test in tests_to_run:
                 # 应用重复次数覆盖
                 if args.repeat:
                     test["repeat"] = args.repeat
-                orchestrator.run_test(test)
-                orchestrator.save_results()
+            orchestrator.run_all_tests(tests_to_run)
         else:
             # 运行所有测试
             orchestrator.run_all_tests()
@@ -0,0 +1,394 @@
+import os
+import json
+import stat
+import time
+import shlex
+import hashlib
+import argparse
+import threading
+import posixpath
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional, Tuple
+
+from ssh_connecting import SSHManager
+
+BLOCK_SIZE = 1024 * 1024  # 单次读写的块大小
+PART_SUFFIX = ".part"  # 传输中的临时文件后缀
+MANIFEST_SUFFIX = ".part.json"  # 断点续传进度文件后缀
+
+
+class RateLimiter:
+    """多个传输线程共享的带宽限制器"""
+
+    def __init__(self, bytes_per_second: float):
+        self.rate = bytes_per_second
+        self.lock = threading.Lock()
+        self.next_time = time.monotonic()
+
+    def consume(self, nbytes: int):
+        """登记传输的字节数，超出速率时阻塞"""
+        with self.lock:
+            now = time.monotonic()
+            start = max(self.next_time, now)
+            self.next_time = start + nbytes / self.rate
+        if start > now:
+            time.sleep(start - now)
+
+
+class LocalEndpoint:
+    """本地文件系统端点"""
+
+    join = staticmethod(os.path.join)
+
+    def __init__(self):
+        self.sep = os.sep
+
+    @contextmanager
+    def session(self):
+        yield self
+
+    def open(self, path: str, mode: str):
+        return open(path, mode)
+
+    def open_range(self, path: str, offset: int, length: int):
+        """以读取方式打开文件并定位到 offset (length 只对远程会话的预读取有意义)"""
+        f = open(path, "rb")
+        f.seek(offset)
+        return f
+
+    def stat(self, path: str) -> Optional[os.stat_result]:
+        try:
+            return os.stat(path)
+        except FileNotFoundError:
+            return None
+
+    def is_dir(self, path: str) -> bool:
+        return os.path.isdir(path)
+
+    def makedirs(self, path: str):
+        os.makedirs(path, exist_ok=True)
+
+    def walk(self, root: str) -> List[Tuple[str, int]]:
+        """返回 (相对路径, 大小) 列表，相对路径统一使用 / 分隔"""
+        files = []
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                full = os.path.join(dirpath, filename)
+                rel = os.path.relpath(full, root).replace(os.sep, "/")
+                files.append((rel, os.path.getsize(full)))
+        return files
+
+    def replace(self, src: str, dst: str):
+        os.replace(src, dst)
+
+    def remove(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def sha256(self, path: str) -> Optional[str]:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+
+class RemoteEndpoint:
+    """远程服务器端点，通过池化的SFTP会话访问"""
+
+    join = staticmethod(posixpath.join)
+
+    def __init__(self, ssh_manager: SSHManager):
+        self.ssh = ssh_manager
+        self.sep = "/"
+
+    @contextmanager
+    def session(self):
+        with self.ssh.sftp_session() as sftp:
+            yield _RemoteSession(sftp)
+
+    def stat(self, path: str):
+        with self.session() as session:
+            return session.stat(path)
+
+    def is_dir(self, path: str) -> bool:
+        attrs = self.stat(path)
+        return attrs is not None and stat.S_ISDIR(attrs.st_mode)
+
+    def makedirs(self, path: str):
+        self.ssh.execute_command(f"mkdir -p {shlex.quote(path)}")
+
+    def walk(self, root: str) -> List[Tuple[str, int]]:
+        files = []
+        with self.ssh.sftp_session() as sftp:
+            pending = [""]
+            while pending:
+                rel_dir = pending.pop()
+                for attrs in sftp.listdir_attr(posixpath.join(root, rel_dir)):
+                    rel = posixpath.join(rel_dir, attrs.filename) if rel_dir else attrs.filename
+                    if stat.S_ISDIR(attrs.st_mode):
+                        pending.append(rel)
+                    else:
+                        files.append((rel, attrs.st_size))
+        return files
+
+    def replace(self, src: str, dst: str):
+        with self.ssh.sftp_session() as sftp:
+            sftp.posix_rename(src, dst)
+
+    def remove(self, path: str):
+        with self.ssh.sftp_session() as sftp:
+            try:
+                sftp.remove(path)
+            except IOError:
+                pass
+
+    def sha256(self, path: str) -> Optional[str]:
+        quoted = shlex.quote(path)
+        code, out, _ = self.ssh.execute_command(
+            f"sha256sum -- {quoted} 2>/dev/null || shasum -a 256 {quoted}", timeout=3600
+        )
+        if code != 0 or not out.strip():
+            return None
+        return out.split()[0]
+
+
+class _RemoteSession:
+    """单个SFTP会话上的文件操作"""
+
+    def __init__(self, sftp):
+        self.sftp = sftp
+
+    def open(self, path: str, mode: str):
+        f = self.sftp.open(path, mode)
+        if "r" in mode and "+" not in mode:
+            f.prefetch()  # 预读取整个文件，减少往返等待
+        else:
+            f.set_pipelined(True)  # 写入不逐块等待确认
+        return f
+
+    def open_range(self, path: str, offset: int, length: int):
+        """以读取方式打开文件，只预读取 [offset, offset + length) 范围 (分块并行读取时使用)"""
+        f = self.sftp.open(path, "rb")
+        f.seek(offset)
+        f.prefetch(file_size=offset + length)  # 预读取从当前位置开始，到 file_size 为止
+        return f
+
+    def stat(self, path: str):
+        try:
+            return self.sftp.stat(path)
+        except IOError:
+            return None
+
+
+class BulkTransfer:
+    """
+    大文件/目录批量传输：池化SFTP会话、分块并行、断点续传、跳过相同文件
+
+    传输过程中写入 <目标>.part 临时文件，并在目标端记录 <目标>.part.json 进度，
+    中断后再次传输时只补传未完成的分块；全部完成后原子重命名为目标文件。
+    """
+
+    def __init__(
+        self,
+        ssh_manager: SSHManager,
+        workers: int = 4,
+        chunk_size: int = 64 * 1024 * 1024,
+        verify: str = "checksum",
+        bwlimit_kbps: int = None,
+    ):
+        """
+        初始化批量传输
+
+        Args:
+            ssh_manager: SSH管理器
+            workers: 并行传输线程数 (每个线程使用独立的SFTP会话)
+            chunk_size: 分块大小(字节)
+            verify: 跳过/校验策略，checksum (大小+sha256) 或 size (仅大小)
+            bwlimit_kbps: 总带宽上限(KB/s)，为None时不限速
+        """
+        self.ssh = ssh_manager
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.verify = verify
+        self.limiter = RateLimiter(bwlimit_kbps * 1024) if bwlimit_kbps else None
+        self.local = LocalEndpoint()
+        self.remote = LocalEndpoint() if ssh_manager.local_mode else RemoteEndpoint(ssh_manager)
+
+    def upload(self, local_path: str, remote_path: str) -> Dict[str, Any]:
+        """上传本地文件或目录到服务器"""
+        return self._transfer(self.local, local_path, self.remote, remote_path)
+
+    def download(self, remote_path: str, local_path: str) -> Dict[str, Any]:
+        """从服务器下载文件或目录"""
+        return self._transfer(self.remote, remote_path, self.local, local_path)
+
+    def _transfer(self, src, src_root: str, dst, dst_root: str) -> Dict[str, Any]:
+        """传输文件或目录，返回统计信息"""
+        start_time = time.time()
+        if src.is_dir(src_root):
+            files = src.walk(src_root)
+            pairs = [
+                (src.join(src_root, *rel.split("/")), dst.join(dst_root, *rel.split("/")), size)
+                for rel, size in files
+            ]
+        else:
+            attrs = src.stat(src_root)
+            if attrs is None:
+                raise FileNotFoundError(f"源文件不存在: {src_root}")
+            pairs = [(src_root, dst_root, attrs.st_size)]
+
+        for directory in sorted({self._parent(dst, dst_path) for _, dst_path, _ in pairs}):
+            if directory:
+                dst.makedirs(directory)
+
+        stats = {"files": len(pairs), "skipped": 0, "bytes": 0, "seconds": 0.0}
+        total_bytes = sum(size for _, _, size in pairs)
+        print(f"开始传输 {len(pairs)} 个文件，共 {total_bytes / 1024 ** 3:.2f} GB")
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sftp") as executor:
+            for src_path, dst_path, size in pairs:
+                if self._is_same(src, src_path, dst, dst_path, size):
+                    stats["skipped"] += 1
+                    continue
+                stats["bytes"] += self._transfer_file(executor, src, src_path, dst, dst_path, size)
+
+        stats["seconds"] = round(time.time() - start_time, 3)
+        rate = stats["bytes"] / stats["seconds"] / 1024 ** 2 if stats["seconds"] > 0 else 0
+        print(
+            f"传输完成: {stats['files']} 个文件 (跳过 {stats['skipped']} 个)，"
+            f"{stats['bytes'] / 1024 ** 3:.2f} GB，耗时 {stats['seconds']:.1f} 秒 ({rate:.1f} MB/s)"
+        )
+        return stats
+
+    @staticmethod
+    def _parent(endpoint, path: str) -> str:
+        return os.path.dirname(path) if endpoint.sep == os.sep else posixpath.dirname(path)
+
+    def _is_same(self, src, src_path: str, dst, dst_path: str, size: int) -> bool:
+        """目标文件大小一致 (且校验和一致) 时跳过"""
+        attrs = dst.stat(dst_path)
+        if attrs is None or attrs.st_size != size:
+            return False
+        if self.verify == "size":
+            return True
+        return src.sha256(src_path) == dst.sha256(dst_path)
+
+    def _load_manifest(self, dst, manifest_path: str, size: int) -> List[int]:
+        """读取断点续传进度，分块参数不一致时视为无效"""
+        if dst.stat(manifest_path) is None:
+            return []
+        try:
+            with dst.session() as session:
+                with session.open(manifest_path, "r") as f:
+                    manifest = json.loads(f.read())
+        except (IOError, ValueError):
+            return []
+        if manifest.get("size") != size or manifest.get("chunk_size") != self.chunk_size:
+            return []
+        return manifest.get("done", [])
+
+    def _save_manifest(self, dst, manifest_path: str, size: int, done: List[int]):
+        data = json.dumps({"size": size, "chunk_size": self.chunk_size, "done": sorted(done)})
+        with dst.session() as session:
+            with session.open(manifest_path, "w") as f:
+                f.write(data)
+
+    def _transfer_file(self, executor, src, src_path: str, dst, dst_path: str, size: int) -> int:
+        """分块并行传输单个文件，返回本次实际传输的字节数"""
+        part_path = dst_path + PART_SUFFIX
+        manifest_path = dst_path + MANIFEST_SUFFIX
+        chunk_count = max(1, (size + self.chunk_size - 1) // self.chunk_size)
+
+        done = set(self._load_manifest(dst, manifest_path, size))
+        part_attrs = dst.stat(part_path)
+        if not done or part_attrs is None or part_attrs.st_size != size:
+            done = set()
+            # 预分配临时文件，各分块可以独立定位写入
+            with dst.session() as session:
+                with session.open(part_path, "wb") as f:
+                    f.truncate(size)
+        else:
+            print(f"续传 {dst_path}: 已完成 {len(done)}/{chunk_count} 个分块")
+
+        pending = [i for i in range(chunk_count) if i not in done]
+        futures = {
+            executor.submit(self._copy_chunk, src, src_path, dst, part_path, index, size): index
+            for index in pending
+        }
+        transferred = 0
+        try:
+            for future in as_completed(futures):
+                transferred += future.result()
+                done.add(futures[future])
+                self._save_manifest(dst, manifest_path, size, list(done))
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+
+        if self.verify == "checksum":
+            src_sum = src.sha256(src_path)
+            if src_sum != dst.sha256(part_path):
+                dst.remove(manifest_path)
+                raise IOError(f"校验和不一致: {dst_path}")
+        dst.replace(part_path, dst_path)
+        dst.remove(manifest_path)
+        return transferred
+
+    def _copy_chunk(self, src, src_path: str, dst, part_path: str, index: int, size: int) -> int:
+        """复制一个分块，每个线程使用独立的会话"""
+        offset = index * self.chunk_size
+        length = min(self.chunk_size, size - offset)
+        with src.session() as src_session, dst.session() as dst_session:
+            with src_session.open_range(src_path, offset, length) as reader, \
+                    dst_session.open(part_path, "r+b") as writer:
+                writer.seek(offset)
+                remaining = length
+                while remaining > 0:
+                    block = reader.read(min(BLOCK_SIZE, remaining))
+                    if not block:
+                        raise IOError(f"读取 {src_path} 时提前结束")
+                    if self.limiter:
+                        self.limiter.consume(len(block))
+                    writer.write(block)
+                    remaining -= len(block)
+        return length
+
+
+def main():
+    parser = argparse.ArgumentParser(description="InferMatrix 批量文件传输")
+    parser.add_argument("direction", choices=["upload", "download"], help="传输方向")
+    parser.add_argument("source", help="源路径 (文件或目录)")
+    parser.add_argument("target", help="目标路径")
+    parser.add_argument("--config", type=str, default="config_v00.json", help="配置文件路径 (读取ssh配置)")
+    parser.add_argument("--workers", type=int, default=4, help="并行传输线程数")
+    parser.add_argument("--chunk-mb", type=int, default=64, help="分块大小(MB)")
+    parser.add_argument("--verify", choices=["checksum", "size"], default="checksum", help="跳过/校验策略")
+    parser.add_argument("--bwlimit", type=int, help="带宽上限(KB/s)")
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        ssh_config = json.load(f)["ssh"]
+    ssh_manager = SSHManager(ssh_config)
+    transfer = BulkTransfer(
+        ssh_manager,
+        workers=args.workers,
+        chunk_size=args.chunk_mb * 1024 * 1024,
+        verify=args.verify,
+        bwlimit_kbps=args.bwlimit,
+    )
+    try:
+        if args.direction == "upload":
+            transfer.upload(args.source, args.target)
+        else:
+            transfer.download(args.source, args.target)
+    finally:
+        ssh_manager.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+import math
+from statistics import NormalDist
+from typing import Dict, Any, List, Iterable, Optional
+
+import numpy as np
+
+# 请求级指标 (结果字段 -> 汇总统计前缀)
+METRICS = ["ttft", "tpot", "throughput", "total_time", "token_count"]
+
+PERCENTILES = [50, 90, 95, 99]
+
+
+def describe(
+    values: Iterable[float],
+    bootstrap: int = 1000,
+    confidence: float = 0.95,
+    seed: int = 0,
+) -> Dict[str, float]:
+    """
+    一组数值的描述统计
+
+    Args:
+        values: 数值序列 (None 与 NaN 会被忽略)
+        bootstrap: 自助法重采样次数，为0时不计算置信区间
+        confidence: 置信水平
+        seed: 随机种子，保证同一数据的置信区间可复现
+
+    Returns:
+        包含 count / avg / std / cv / min / max / p50 / p90 / p95 / p99 以及
+        平均值的置信区间 ci_low / ci_high 的字典，没有有效数值时返回空字典
+    """
+    data = np.asarray([v for v in values if v is not None], dtype=float)
+    data = data[~np.isnan(data)]
+    if data.size == 0:
+        return {}
+
+    mean = float(data.mean())
+    std = float(data.std(ddof=1)) if data.size > 1 else 0.0
+    stats = {
+        "count": int(data.size),
+        "avg": mean,
+        "std": std,
+        "cv": std / mean if mean else 0.0,
+        "min": float(data.min()),
+        "max": float(data.max()),
+    }
+    for p, value in zip(PERCENTILES, np.percentile(data, PERCENTILES)):
+        stats[f"p{p}"] = float(value)
+
+    if bootstrap and data.size > 1:
+        stats["ci_low"], stats["ci_high"] = bootstrap_ci(data, bootstrap, confidence, seed)
+    return stats
+
+
+def bootstrap_ci(
+    data: np.ndarray,
+    resamples: int = 1000,
+    confidence: float = 0.95,
+    seed: int = 0,
+    statistic: str = "mean",
+) -> tuple:
+    """
+    自助法 (bootstrap) 置信区间
+
+    一次生成全部重采样下标矩阵，按行计算统计量；样本很多时减少重采样次数，
+    使下标矩阵不超过约500万个元素。
+
+    Args:
+        data: 一维数值数组
+        resamples: 重采样次数
+        confidence: 置信水平
+        seed: 随机种子
+        statistic: mean 或百分位 (如 p95)
+
+    Returns:
+        (下限, 上限)
+    """
+    rng = np.random.default_rng(seed)
+    resamples = max(100, min(resamples, 5_000_000 // data.size))
+    samples = data[rng.integers(0, data.size, size=(resamples, data.size))]
+    if statistic == "mean":
+        estimates = samples.mean(axis=1)
+    else:
+        estimates = np.percentile(samples, float(statistic.lstrip("p")), axis=1)
+    alpha = (1 - confidence) / 2
+    low, high = np.percentile(estimates, [alpha * 100, (1 - alpha) * 100])
+    return float(low), float(high)
+
+
+def ci_precision(
+    values: Iterable[float],
+    statistic: str = "mean",
+    resamples: int = 1000,
+    confidence: float = 0.95,
+) -> Dict[str, float]:
+    """
+    统计量的点估计、自助法置信区间与相对宽度
+
+    Args:
+        values: 数值序列 (None 与 NaN 会被忽略)
+        statistic: mean 或百分位 (如 p50)
+        resamples: 重采样次数
+        confidence: 置信水平
+
+    Returns:
+        estimate / ci_low / ci_high / relative_width (区间宽度 / 点估计) / samples，
+        有效数值少于2个时返回空字典
+    """
+    data = np.asarray([v for v in values if v is not None], dtype=float)
+    data = data[~np.isnan(data)]
+    if data.size < 2:
+        return {}
+    if statistic == "mean":
+        estimate = float(data.mean())
+    else:
+        estimate = float(np.percentile(data, float(statistic.lstrip("p"))))
+    low, high = bootstrap_ci(data, resamples, confidence, statistic=statistic)
+    return {
+        "estimate": estimate,
+        "ci_low": low,
+        "ci_high": high,
+        "relative_width": (high - low) / abs(estimate) if estimate else math.inf,
+        "samples": int(data.size),
+    }
+
+
+def summarize_requests(
+    test_results: List[Dict[str, Any]], bootstrap: int = 1000, confidence: float = 0.95
+) -> Dict[str, float]:
+    """
+    汇总一个测试全部请求的指标
+
+    Returns:
+        扁平字典，键形如 ttft_p95 / tpot_avg / throughput_ci_low
+    """
+    summary = {}
+    for metric in METRICS:
+        stats = describe((r.get(metric) for r in test_results), bootstrap, confidence)
+        for name, value in stats.items():
+            if name != "count":
+                summary[f"{metric}_{name}"] = value
+    return summary
+
+
+class MetricSketch:
+    """
+    单个指标的可合并流式摘要
+
+    - 计数、总和、平方和、最小值、最大值: 精确的平均值、标准差与极值
+    - 对数分桶直方图: 相对误差不超过 alpha 的百分位估计，内存与样本数无关
+    - 固定大小的均匀水塘抽样: 样本数不超过水塘容量时做精确的自助法置信区间
+
+    两个摘要可以合并 (merge)，合并结果与把两批数据放在一起计算相同 (水塘为
+    均匀抽样)，因此可以按块处理数据，或合并多个运行目录的摘要。
+    """
+
+    def __init__(self, alpha: float = 0.01, reservoir: int = 2048, seed: int = 0):
+        self.alpha = alpha
+        self.log_gamma = math.log((1 + alpha) / (1 - alpha))
+        self.reservoir = reservoir
+        self.rng = np.random.default_rng(seed)
+        self.buckets: Dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sample = np.empty(0)
+
+    def update(self, values) -> "MetricSketch":
+        """加入一批数值 (NaN会被忽略)"""
+        data = np.asarray(values, dtype=float)
+        data = data[~np.isnan(data)]
+        if data.size == 0:
+            return self
+        positive = data[data > 0]
+        self.zeros += data.size - positive.size
+        keys, counts = np.unique(
+            np.ceil(np.log(positive) / self.log_gamma).astype(np.int64), return_counts=True
+        )
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self._merge_sample(data, data.size)
+        self.count += data.size
+        self.total += float(data.sum())
+        self.total_sq += float(np.square(data).sum())
+        self.min = min(self.min, float(data.min()))
+        self.max = max(self.max, float(data.max()))
+        return self
+
+    def merge(self, other: "MetricSketch") -> "MetricSketch":
+        """合并另一个摘要 (分桶精度需相同)"""
+        if other.count == 0:
+            return self
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.zeros += other.zeros
+        self._merge_sample(other.sample, other.count)
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def _merge_sample(self, sample: np.ndarray, count: int):
+        """合并两个均匀样本: 按超几何分布决定各取多少，保持合并后仍为均匀抽样"""
+        size = min(self.reservoir, self.count + count)
+        if self.count == 0:
+            taken = 0
+        else:
+            taken = int(self.rng.hypergeometric(self.count, count, size))
+        self.sample = np.concatenate(
+            [
+                self.rng.choice(self.sample, taken, replace=False),
+                self.rng.choice(sample, size - taken, replace=False),
+            ]
+        )
+
+    def quantile(self, q: float) -> float:
+        """估计分位数 (0 <= q <= 1)"""
+        if self.count == 0:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return max(self.min, 0.0)
+        gamma = math.exp(self.log_gamma)
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                estimate = 2 * gamma ** key / (gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def count_at_most(self, value: float) -> int:
+        """
+        估计不大于 value 的样本数 (直方图累计计数)
+
+        与 value 落在同一分桶的样本全部计入，误差不超过一个分桶 (相对误差 alpha)
+        """
+        if value == math.inf or value >= self.max:
+            return self.count
+        if value <= 0:
+            return self.zeros if value == 0 else 0
+        limit = math.ceil(math.log(value) / self.log_gamma)
+        return self.zeros + sum(count for key, count in self.buckets.items() if key <= limit)
+
+    def describe(self, bootstrap: int = 1000, confidence: float = 0.95) -> Dict[str, float]:
+        """与 describe() 相同字段的描述统计"""
+        if self.count == 0:
+            return {}
+        mean = self.total / self.count
+        if self.count > 1:
+            variance = (self.total_sq - self.count * mean ** 2) / (self.count - 1)
+            std = math.sqrt(max(variance, 0.0))
+        else:
+            std = 0.0
+        stats = {
+            "count": self.count,
+            "avg": mean,
+            "std": std,
+            "cv": std / mean if mean else 0.0,
+            "min": self.min,
+            "max": self.max,
+        }
+        for p in PERCENTILES:
+            stats[f"p{p}"] = self.quantile(p / 100)
+
+        if bootstrap and self.count > 1:
+            if self.count <= self.sample.size:
+                # 水塘中就是全部数据
+                stats["ci_low"], stats["ci_high"] = bootstrap_ci(self.sample, bootstrap, confidence)
+            else:
+                # 样本量大时平均值近似正态分布
+                half = NormalDist().inv_cdf((1 + confidence) / 2) * std / math.sqrt(self.count)
+                stats["ci_low"], stats["ci_high"] = mean - half, mean + half
+        return stats
+
+
+class StreamingStats:
+    """
+    按块折叠请求记录，得到各分组的指标摘要
+
+    每块记录转换为列式数据后按分组批量更新 MetricSketch，内存占用只与分组数
+    有关，与请求数无关；测试记录 (type=test) 单独收集，同名测试保留最后一条。
+    """
+
+    def __init__(
+        self,
+        groupings: Dict[str, List[str]],
+        metrics: Optional[List[str]] = None,
+        bootstrap: int = 1000,
+        confidence: float = 0.95,
+    ):
+        """
+        Args:
+            groupings: {分组名称: 分组字段}，如 {"by_test": ["backend", "test"]}
+            metrics: 要统计的指标 (默认全部)
+            bootstrap: 自助法重采样次数，为0时不计算置信区间
+            confidence: 置信水平
+        """
+        self.groupings = groupings
+        self.metrics = metrics or METRICS
+        self.bootstrap = bootstrap
+        self.confidence = confidence
+        self.sketches: Dict[str, Dict[tuple, Dict[str, MetricSketch]]] = {
+            name: {} for name in groupings
+        }
+        self.tests: Dict[str, Dict[str, Any]] = {}
+        self.requests = 0
+
+    def add_chunk(self, records: List[Dict[str, Any]]):
+        """折叠一块记录"""
+        import pandas as pd
+
+        rows = []
+        for record in records:
+            if record.get("type") == "test":
+                self.tests[record.get("name")] = record
+            elif record.get("type", "request") == "request" and record.get("success"):
+                rows.append(record)  # 预热记录 (type 为 warmup) 不计入统计
+        if not rows:
+            return
+        self.requests += len(rows)
+        frame = pd.DataFrame(rows)
+        metrics = [m for m in self.metrics if m in frame.columns]
+        for m in metrics:
+            frame[m] = pd.to_numeric(frame[m], errors="coerce")
+
+        for name, by in self.groupings.items():
+            groups = self.sketches[name]
+            for key, group in frame.groupby(by, sort=False, dropna=False):
+                key = key if isinstance(key, tuple) else (key,)
+                sketches = groups.setdefault(key, {m: MetricSketch() for m in self.metrics})
+                for m in metrics:
+                    sketches[m].update(group[m].to_numpy(dtype=float))
+
+    def group(self, name: str, key: tuple) -> Dict[str, Dict[str, float]]:
+        """某个分组的描述统计: {指标: describe() 结果}"""
+        sketches = self.sketches[name].get(key, {})
+        return {m: sketch.describe(self.bootstrap, self.confidence) for m, sketch in sketches.items()}
+
+    def table(self, name: str):
+        """
+        分组统计表
+
+        Returns:
+            pandas.DataFrame，每组一行，列形如 ttft_p95 / ttft_cv / ttft_ci_low
+        """
+        import pandas as pd
+
+        by = self.groupings[name]
+        rows = []
+        for key in sorted(self.sketches[name], key=lambda k: tuple(str(v) for v in k)):
+            row = dict(zip(by, key))
+            stats = self.group(name, key)
+            row["count"] = max((s.get("count", 0) for s in stats.values()), default=0)
+            for m, values in stats.items():
+                for stat, value in values.items():
+                    if stat != "count":
+                        row[f"{m}_{stat}"] = value
+            rows.append(row)
+        return pd.DataFrame(rows)
@@ -0,0 +1,159 @@
+import copy
+import json
+import hashlib
+import itertools
+from typing import Dict, Any, List, Iterator, Tuple
+
+# 参数路径的简写前缀
+PATH_ALIASES = {"args": "backend_config.args"}
+
+
+def resolve_path(path: str) -> List[str]:
+    """
+    把参数路径解析为测试配置中的键序列
+
+    - backend_config.xxx: 后端配置
+    - args.xxx: backend_config.args.xxx 的简写
+    - 其他 (如 concurrency / streaming / max_tokens / backend): 测试级配置
+    """
+    head, _, rest = path.partition(".")
+    if head in PATH_ALIASES and rest:
+        path = f"{PATH_ALIASES[head]}.{rest}"
+    return path.split(".")
+
+
+def set_path(test: Dict[str, Any], path: str, value: Any):
+    """按参数路径设置测试配置中的值，中间层不存在时自动创建"""
+    keys = resolve_path(path)
+    node = test
+    for key in keys[:-1]:
+        node = node.setdefault(key, {})
+    node[keys[-1]] = value
+
+
+def get_path(test: Dict[str, Any], path: str, default: Any = None) -> Any:
+    """按参数路径读取测试配置中的值"""
+    node = test
+    for key in resolve_path(path):
+        if not isinstance(node, dict) or key not in node:
+            return default
+        node = node[key]
+    return node
+
+
+def expand_values(spec: Any) -> List[Any]:
+    """
+    展开单个维度的取值
+
+    支持:
+        - 列表: [8, 16, 32]
+        - 等差范围 (包含终点): {"start": 8, "stop": 64, "step": 8}
+        - 等比范围 (包含终点): {"start": 1, "stop": 64, "factor": 2}
+        - 单个值: 视为只有一个取值
+    """
+    if isinstance(spec, list):
+        return spec
+    if isinstance(spec, dict) and "start" in spec and "stop" in spec:
+        start, stop = spec["start"], spec["stop"]
+        values = []
+        if "factor" in spec:
+            if spec["factor"] <= 1 or start <= 0:
+                raise ValueError(f"等比范围需要 factor > 1 且 start > 0: {spec}")
+            value = start
+            while value <= stop:
+                values.append(value)
+                value *= spec["factor"]
+        else:
+            step = spec.get("step", 1)
+            if step <= 0:
+                raise ValueError(f"范围步长必须为正数: {spec}")
+            count = int((stop - start) / step + 1e-9) + 1
+            values = [start + i * step for i in range(max(0, count))]
+            if all(isinstance(v, int) for v in (start, step)):
+                values = [int(v) for v in values]
+            else:
+                values = [round(v, 10) for v in values]
+        return values
+    return [spec]
+
+
+def dimension_labels(paths: List[str]) -> Dict[str, str]:
+    """
+    为每个维度生成简短标签 (路径最后一段)，最后一段重名时使用完整路径
+
+    标签用于测试名称、结果中的 sweep 字段以及报告横坐标
+    """
+    tails = [p.split(".")[-1] for p in paths]
+    return {p: (t if tails.count(t) == 1 else p) for p, t in zip(paths, tails)}
+
+
+def _format_value(value: Any) -> str:
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+    # 取路径最后一段，避免模型路径等长字符串让名称过长
+    text = text.rstrip("/").split("/")[-1]
+    return "".join(c if c.isalnum() or c in "-_.:" else "_" for c in text)
+
+
+def config_hash(test: Dict[str, Any]) -> str:
+    """测试配置的内容哈希 (不含名称与扫描元信息)，配置相同的测试哈希相同"""
+    content = {k: v for k, v in test.items() if k not in ("name", "sweep", "config_hash")}
+    data = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()[:12]
+
+
+def _sweep_axes(spec: Dict[str, Any]) -> Tuple[List[Tuple[str, List[Any]]], List[str], List[tuple]]:
+    """解析扫描规格，返回 (笛卡尔积维度, 联动维度路径, 联动取值行)"""
+    product_dims = [(path, expand_values(values)) for path, values in spec.get("product", {}).items()]
+
+    zip_spec = spec.get("zip", {})
+    zip_paths = list(zip_spec)
+    zip_columns = [expand_values(zip_spec[path]) for path in zip_paths]
+    if zip_columns and len({len(c) for c in zip_columns}) != 1:
+        raise ValueError(f"扫描 {spec.get('name')} 的 zip 维度取值个数不一致")
+    zip_rows = list(zip(*zip_columns)) if zip_columns else [()]
+    return product_dims, zip_paths, zip_rows
+
+
+def count_sweep(spec: Dict[str, Any]) -> int:
+    """扫描规格展开后的测试数量 (不实际展开)"""
+    product_dims, _, zip_rows = _sweep_axes(spec)
+    count = len(zip_rows)
+    for _, values in product_dims:
+        count *= len(values)
+    return count
+
+
+def expand_sweep(spec: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    按需展开扫描规格为具体的测试配置
+
+    Args:
+        spec: 扫描规格，包含:
+            - name: 测试名称前缀
+            - base: 测试模板 (与 tests 中的测试配置格式相同)
+            - product: {参数路径: 取值} 各维度做笛卡尔积 (可选)
+            - zip: {参数路径: 取值} 各维度按位置联动，取值个数必须相同 (可选)
+
+    Yields:
+        测试配置，附带 sweep (维度标签 -> 取值) 与 config_hash 字段，
+        名称形如 <前缀>__<标签>=<取值>__...，同一规格每次展开的名称都相同
+    """
+    prefix = spec.get("name", "sweep")
+    base = spec.get("base", {})
+    product_dims, zip_paths, zip_rows = _sweep_axes(spec)
+    labels = dimension_labels(zip_paths + [path for path, _ in product_dims])
+
+    for zip_row in zip_rows:
+        for combo in itertools.product(*[values for _, values in product_dims]):
+            assignment = list(zip(zip_paths, zip_row)) + [
+                (path, value) for (path, _), value in zip(product_dims, combo)
+            ]
+            test = copy.deepcopy(base)
+            for path, value in assignment:
+                set_path(test, path, value)
+            test["sweep"] = {labels[path]: value for path, value in assignment}
+            test["name"] = "__".join(
+                [prefix] + [f"{labels[path]}={_format_value(value)}" for path, value in assignment]
+            )
+            test["config_hash"] = config_hash(test)
+            yield test
@@ -1,16 +1,33 @@
 import os
 import json
+import math
 import time
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from typing import Dict, Any, List, Optional
-from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Iterable, Iterator
+from collections import deque
+from itertools import islice
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 # 导入之前实现的模块
 from ssh_connecting import ServiceManager
 from llm_tester import LLMTester  # 您现有的测试类
+from remote_runner import RemoteLoadRunner
+from model_prefetch import ModelPrefetcher
+from sweep import count_sweep, expand_sweep, get_path
+from checkpoint import RunCheckpoint, test_key
+from autotune import AutoTuner
+from report_charts import render_all, RENDER_VERSION
+from chart_cache import ChartCache
+from matrix_cube import RUN_META_FILE
+from stats import summarize_requests, ci_precision, StreamingStats
+from records import RecordWriter, RECORDS_FILE, iter_current_chunks, records_from_results, chunked
+from live_metrics import MetricsHub, LiveMonitor
+from openmetrics import OpenMetricsExporter
+from trace_export import TraceRecorder
+from profiling import TestProfiler
+from raw_events import METRICS_VERSION
+from warmup import WarmupPhase
 
 
 class TestConfig:
@@ -40,7 +57,9 @@ class TestConfig:
             "max_tokens": 128,
             "result_dir": "results",
             "default_repeat": 1,
-            "test_param": ""
+            "test_param": "",
+            "sweeps": [],
+            "report_axis": "",
         }
 
         if config_path and os.path.exists(config_path):
@@ -62,8 +81,20 @@ class TestConfig:
         return self.config["ssh"]
 
     def get_tests(self) -> List[Dict[str, Any]]:
-        """获取所有测试配置"""
-        return self.config["tests"]
+        """获取所有测试配置 (包括扫描规格展开后的测试)"""
+        return list(self.iter_tests())
+
+    def iter_tests(self) -> Iterator[Dict[str, Any]]:
+        """按需逐个生成测试配置：先是 tests 中的测试，然后是 sweeps 展开的测试"""
+        yield from self.config["tests"]
+        for spec in self.config.get("sweeps", []):
+            yield from expand_sweep(spec)
+
+    def count_tests(self) -> int:
+        """测试总数 (扫描规格不实际展开)"""
+        return len(self.config["tests"]) + sum(
+            count_sweep(spec) for spec in self.config.get("sweeps", [])
+        )
 
     def get_prompts(self) -> List[str]:
         """获取测试提示"""
@@ -85,6 +116,55 @@ class TestConfig:
         """获取被测试的参数名"""
         return self.config["test_param"]
 
+    def get_report_axis(self) -> str:
+        """获取报告横坐标参数：report_axis 优先，其次 test_param"""
+        return self.config.get("report_axis") or self.config.get("test_param") or "model"
+
+    def get_remote_agent_config(self, test_config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        获取远程压测代理配置，测试级配置覆盖全局配置
+
+        测试级的 remote_agent 可以是布尔值或配置字典
+        """
+        agent_config = dict(self.config.get("remote_agent", {}))
+        test_agent = test_config.get("remote_agent")
+        if isinstance(test_agent, dict):
+            agent_config.update(test_agent)
+            agent_config.setdefault("enabled", True)
+        elif test_agent is not None:
+            agent_config["enabled"] = bool(test_agent)
+        return agent_config
+
+    def get_warmup_config(self, test_config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        获取预热配置，测试级配置覆盖全局配置
+
+        测试级的 warmup 可以是配置字典 (覆盖全局的对应项)、固定的预热请求数，或 false (不预热)
+        """
+        warmup_config = dict(self.config.get("warmup", {}))
+        test_warmup = test_config.get("warmup")
+        if isinstance(test_warmup, dict):
+            warmup_config.update(test_warmup)
+        elif test_warmup is False:
+            warmup_config = {}
+        elif test_warmup is not None:
+            warmup_config = {"requests": int(test_warmup)}
+        return warmup_config
+
+    def get_adaptive_config(self, test_config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        获取自适应重复配置，测试级配置覆盖全局配置
+
+        配置了 target 时启用；测试级的 adaptive 为 false 时按固定的 repeat 运行
+        """
+        adaptive_config = dict(self.config.get("adaptive", {}))
+        test_adaptive = test_config.get("adaptive")
+        if isinstance(test_adaptive, dict):
+            adaptive_config.update(test_adaptive)
+        elif test_adaptive is False:
+            adaptive_config = {}
+        return adaptive_config if adaptive_config.get("target") else {}
+
 
 class TestOrchestrator:
     """测试编排器，管理整个测试流程"""
@@ -101,12 +181,79 @@ class TestOrchestrator:
         self.results = []
         self.run_timestamp = time.strftime("%Y%m%d_%H%M%S")  # 记录运行时间戳
         self.run_dir = None  # 测试运行目录
+        self.checkpoint = None  # 请求级检查点，用于中断后续跑
+        self.records = None  # 请求级数值记录，报告按块读取
+        self.hub = MetricsHub()  # 请求事件总线，实时看板等订阅者从这里接收事件
+        self._recover_lock = threading.Lock()
+        self._backend_generation = 0  # 每次重新部署后端后递增
+        self._restarts = 0  # 当前测试中后端重新部署的次数
+
+    def resume(self, run_dir: str) -> bool:
+        """
+        从已有的运行目录继续未完成的测试
+
+        已完成的测试直接跳过，部分完成的测试只补跑缺少的 (轮次, 提示词) 请求
+
+        Args:
+            run_dir: 之前的运行目录，如 results/run_20250101_120000
+
+        Returns:
+            运行目录有效返回True，否则返回False
+        """
+        if not os.path.isdir(run_dir):
+            print(f"运行目录不存在: {run_dir}")
+            return False
+
+        self.run_dir = run_dir
+        self.run_timestamp = os.path.basename(os.path.normpath(run_dir)).replace("run_", "", 1)
+        self.checkpoint = RunCheckpoint(run_dir)
+
+        # 只保留已完成测试的结果，其余测试续跑后重新生成
+        result_path = os.path.join(run_dir, "test_results.json")
+        if os.path.exists(result_path):
+            with open(result_path, "r", encoding="utf-8") as f:
+                self.results = [
+                    r for r in json.load(f)
+                    if r.get("success") and r.get("name") in self.checkpoint.done_names
+                ]
+        print(f"续跑运行目录 {run_dir}，已有 {len(self.results)} 个测试结果")
+        return True
+
+    def _test_key(self, test_config: Dict[str, Any]) -> str:
+        return test_key(test_config, self.config.get_prompts(), self.config.get_max_tokens())
+
+    def _recover_backend(self, backend: str, backend_config: Dict[str, Any], generation: int) -> bool:
+        """
+        请求失败后检查后端是否仍在运行，已停止时重新部署
+
+        Args:
+            generation: 发出请求时的后端部署代数，用于避免多个并发请求重复部署
+
+        Returns:
+            后端已重新部署 (可以重试请求) 返回True
+        """
+        with self._recover_lock:
+            if generation != self._backend_generation:
+                return True  # 其他线程已经完成了重新部署
+            if self.service_manager.check_service():
+                return False  # 后端正常，属于单个请求失败
+            max_restarts = self.config.config.get("max_backend_restarts", 2)
+            if self._restarts >= max_restarts:
+                print(f"后端已重新部署 {self._restarts} 次，不再重试")
+                return False
+
+            self._restarts += 1
+            print(f"检测到后端服务已停止，重新部署 ({self._restarts}/{max_restarts})...")
+            deployed = self.service_manager.deploy_service(backend, backend_config)
+            self._backend_generation += 1
+            return deployed
 
     def initialize(self):
         """初始化服务管理器"""
         ssh_config = self.config.get_ssh_config()
         try:
             self.service_manager = ServiceManager(ssh_config)
+            self.service_manager.hub = self.hub
             if ssh_config["local_mode"] == False:
                 print(f"成功连接到服务器 {ssh_config['hostname']}")
             else:
@@ -127,6 +274,8 @@ class TestOrchestrator:
                 - backend_config: 后端配置
                 - streaming: 是否使用流式API
                 - repeat: 重复次数
+                - concurrency: 并发请求数 (可选，默认1)
+                - remote_agent: 是否在服务器端运行压测代理 (可选)
 
         Returns:
             测试结果
@@ -134,106 +283,464 @@ class TestOrchestrator:
         name = test_config.get("name", "unnamed_test")
         backend = test_config.get("backend")
         backend_config = test_config.get("backend_config", {})
-        streaming = test_config.get("streaming", True)
-        repeat = test_config.get("repeat", 1)
 
         print(f"\n开始测试: {name}")
         print(f"后端: {backend}")
         print(f"配置: {json.dumps(backend_config, indent=2, ensure_ascii=False)}")
 
+        self.hub.clear_skip()
+        self.hub.publish(
+            "test_start", test=name, backend=backend,
+            concurrency=max(1, int(test_config.get("concurrency", 1))), config=backend_config,
+            config_hash=test_config.get("config_hash"), sweep=test_config.get("sweep"),
+        )
+        result = self._run_test(test_config)
+        self.hub.publish("test_end", test=name, success=bool(result.get("success")))
+        return result
+
+    def _run_test(self, test_config: Dict[str, Any]) -> Dict[str, Any]:
+        """部署服务并发送全部请求 (当前测试被中止时停止发出新请求)"""
+        name = test_config.get("name", "unnamed_test")
+        backend = test_config.get("backend")
+        backend_config = test_config.get("backend_config", {})
+        streaming = test_config.get("streaming", True)
+        repeat = test_config.get("repeat", 1)
+
+        # 准备测试参数
+        model = backend_config.get("model", backend_config.get("model_path", "unknown"))
+        prompts = self.config.get_prompts()
+        max_tokens = test_config.get("max_tokens", self.config.get_max_tokens())
+        concurrency = max(1, int(test_config.get("concurrency", 1)))
+
+        # 自适应重复: 置信区间足够窄时停止，repeat 改为由样本上限决定的轮次上限
+        adaptive = self.config.get_adaptive_config(test_config)
+        if adaptive and self.config.get_remote_agent_config(test_config).get("enabled") and not (
+            self.service_manager.ssh_manager.local_mode
+        ):
+            print("服务器端压测代理不支持自适应重复，按固定的 repeat 运行")
+            adaptive = {}
+        if adaptive:
+            repeat = max(1, math.ceil(adaptive.get("max_samples", 500) / len(prompts)))
+
+        # 从检查点恢复已完成的请求
+        key = self._test_key(test_config)
+        completed = self.checkpoint.completed_requests(key) if self.checkpoint else {}
+        tasks = [
+            (i, j) for i in range(repeat) for j in range(len(prompts)) if (i, j) not in completed
+        ]
+        resumed = [completed[slot] for slot in sorted(completed) if slot[0] < repeat]
+        if resumed:
+            print(f"从检查点恢复 {len(resumed)} 个已完成的请求，剩余 {len(tasks)} 个")
+            if adaptive and self._precision(resumed, adaptive)["converged"]:
+                print("已恢复的请求已达到目标精度")
+                tasks = []
+        if not tasks:
+            print("该测试的全部请求均已完成，无需部署服务")
+            return self._finish_test(
+                name, backend, backend_config, streaming, resumed, concurrency, deployed=False,
+                precision=self._precision(resumed, adaptive) if adaptive else None, test_config=test_config,
+            )
+
         # 部署服务
         if not self.service_manager.deploy_service(backend, backend_config):
             return {"name": name, "success": False, "error": "服务部署失败"}
+        self._restarts = 0
+
+        test_start = time.time()
 
         # 获取API URL
         api_url = self.service_manager.get_api_url()
         if not api_url:
             return {"name": name, "success": False, "error": "无法获取API URL"}
 
-        # 准备测试参数
-        model = backend_config.get("model", backend_config.get("model_path", "unknown"))
-        prompts = self.config.get_prompts()
-        max_tokens = self.config.get_max_tokens()
+        agent_config = self.config.get_remote_agent_config(test_config)
+        if agent_config.get("enabled"):
+            if self.service_manager.ssh_manager.local_mode:
+                print("本地模式下无需远程压测代理，直接在本机测试")
+            else:
+                if WarmupPhase(self.config.get_warmup_config(test_config)).enabled:
+                    print("服务器端压测代理不支持预热阶段，跳过预热")
+                # 压测代理按轮次执行全部提示词，部分完成的测试整体重跑，之前的请求记录作废
+                if self.records:
+                    self.records.record_restart(name)
+                test_results = self._run_remote_agent(
+                    backend, api_url, model, prompts, max_tokens, repeat, streaming,
+                    concurrency, agent_config, key, name,
+                )
+                return self._finish_test(
+                    name, backend, backend_config, streaming, test_results, concurrency,
+                    test_start, test_config=test_config,
+                )
 
         # 创建测试器
-        tester = LLMTester(backend, api_url, model, streaming=streaming)
+        # 只有抽样的请求保存每个数据块的原始文本，其余请求只保存块的时间与token数
+        chunk_recording = self.config.config.get("chunk_recording", {})
+        tester = LLMTester(
+            backend, api_url, model, streaming=streaming, hub=self.hub,
+            chunk_sample_rate=chunk_recording.get("sample_rate", 0.01),
+            log_config=self.config.config.get("tester_logging"),
+        )
+        max_retries = self.config.config.get("max_backend_restarts", 2)
+
+        # 预热结束后才开始测量: 后端日志统计、性能分析均从这里开始
+        warmup = self._run_warmup(test_config, api_url, model, prompts, max_tokens, concurrency)
+        if warmup:
+            test_start = time.time()
+
+        # --profile: 分析请求循环、流式块解析与汇总统计的客户端开销
+        profile_config = self.config.config.get("profile", {})
+        profiler = TestProfiler(name, self.run_dir, profile_config, concurrency) if profile_config.get("enabled") else None
+
+        def run_one(round_index, prompt_id):
+            if self.hub.skip_requested():
+                return None  # 当前测试已被中止，剩余请求不再发出
+            prompt = prompts[prompt_id]
+            for _ in range(max_retries + 1):
+                generation = self._backend_generation
+                with profiler.request() if profiler else nullcontext():
+                    result = tester.run_performance_test(prompt, max_tokens)
+                # 请求失败时确认后端是否崩溃，崩溃则重新部署后重试该请求
+                if result.get("success") or not self._recover_backend(
+                    backend, backend_config, generation
+                ):
+                    break
+                print(f"后端已恢复，重试请求 (轮次 {round_index + 1}, 提示 {prompt_id + 1})")
+            result.update(
+                {
+                    "prompt_id": prompt_id,
+                    "prompt": prompt,
+                    "round": round_index,
+                    "timestamp": time.time(),
+                }
+            )
+            # 原始事件与抽样的块文本单独保存 (events/<测试名>.ndjson.gz)，不放入结果与检查点
+            raw = result.pop("raw", None)
+            chunks = result.pop("chunks", None)
+            self._report_request_result(result)
+            if result.get("success") and self.checkpoint:
+                self.checkpoint.record_request(key, result)
+            if self.records:
+                self.records.record_request(name, backend, concurrency, result)
+                if raw:
+                    self.records.record_raw(name, backend, concurrency, dict(result, raw=raw, chunks=chunks))
+            return result
+
+        all_results = list(resumed)
+        precision = None
+        if adaptive:
+            # 自适应重复: 保持并发度不变，边完成边检查置信区间，达到目标精度后停止发出新请求
+            precision = self._run_adaptive(run_one, tasks, all_results, adaptive, concurrency)
+        elif concurrency > 1:
+            # 以固定并发度发送全部轮次的请求
+            print(f"以并发度 {concurrency} 运行 {repeat} 轮测试...")
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = [executor.submit(run_one, i, j) for i, j in tasks]
+                all_results += [r for r in (f.result() for f in futures) if r is not None]
+        else:
+            for i, j in tasks:
+                if self.hub.skip_requested():
+                    break
+                if j == 0 or (i, j) == tasks[0]:
+                    print(f"第 {i + 1}/{repeat} 轮测试...")
+                print(f"提示 {j + 1}/{len(prompts)}: {prompts[j][:30]}...")
+                # 运行性能测试
+                result = run_one(i, j)
+                if result is not None:  # 检查之后才被中止的请求不会发出
+                    all_results.append(result)
+
+        all_results.sort(key=lambda r: (r["round"], r["prompt_id"]))
+        test_results = [r for r in all_results if r.get("success")]
+        with profiler.section() if profiler else nullcontext():
+            result = self._finish_test(
+                name, backend, backend_config, streaming, test_results, concurrency, test_start,
+                warmup=warmup, precision=precision, test_config=test_config,
+            )
+        if profiler:
+            result["profile"] = profiler.finish(test_results)
+        if self.hub.skip_requested():
+            # 中止的测试只有部分请求，不计入报告，也不标记完成 (续跑时会补跑剩余请求)
+            print(f"测试 {name} 已中止: {self.hub.skip_reason}，完成 {len(all_results) - len(resumed)}/{len(tasks)} 个请求")
+            result.update({"success": False, "aborted": True, "error": f"测试已中止: {self.hub.skip_reason}"})
+        return result
+
+    def _run_warmup(self, test_config, api_url, model, prompts, max_tokens, concurrency) -> Optional[Dict[str, Any]]:
+        """
+        正式测量前发送预热请求 (见 WarmupPhase)
 
-        # 运行测试
-        test_results = []
-        for i in range(repeat):
-            print(f"第 {i + 1}/{repeat} 轮测试...")
+        预热请求使用不连接事件总线的测试器，不进入实时看板、OpenMetrics 导出与请求轨迹；
+        总线上只发布预热的开始与结束事件
 
-            for j, prompt in enumerate(prompts):
-                print(f"提示 {j + 1}/{len(prompts)}: {prompt[:30]}...")
+        Returns:
+            预热摘要，results 为预热请求的结果 (单独保存，不计入汇总)；未配置预热时返回None
+        """
+        phase = WarmupPhase(self.config.get_warmup_config(test_config))
+        if not phase.enabled:
+            return None
+        name = test_config.get("name", "unnamed_test")
+        backend = test_config.get("backend")
+        tester = LLMTester(
+            backend, api_url, model, streaming=test_config.get("streaming", True),
+            chunk_sample_rate=0, log_config=self.config.config.get("tester_logging"),
+        )
 
-                # 运行性能测试
-                result = tester.run_performance_test(prompt, max_tokens)
+        def send(index):
+            prompt_id = index % len(prompts)
+            result = tester.run_performance_test(prompts[prompt_id], max_tokens)
+            result.pop("raw", None)
+            result.pop("chunks", None)
+            result.update({"prompt_id": prompt_id, "round": index, "timestamp": time.time()})
+            if self.records:
+                self.records.record_warmup(name, backend, concurrency, result)
+            return result
+
+        print(f"预热中 (并发度 {concurrency})...")
+        self.hub.publish("warmup", event="start", test=name)
+        info = phase.run(send, concurrency, stop=self.hub.skip_requested)
+        self.hub.publish("warmup", event="end", test=name, **info)
+        reasons = {"fixed": "达到设定的请求数/时间", "steady": "指标已稳定", "limit": "达到上限仍未稳定", "stopped": "测试已中止"}
+        print(
+            f"预热完成: {info['requests']} 个请求 (成功 {info['succeeded']} 个), "
+            f"耗时 {info['duration']:.1f}秒, {reasons.get(info['reason'], info['reason'])}"
+        )
+        info["results"] = phase.results
+        return info
 
-                if result.get("success"):
-                    result.update(
-                        {
-                            "prompt_id": j,
-                            "prompt": prompt,
-                            "round": i,
-                            "timestamp": time.time(),
-                        }
-                    )
-                    test_results.append(result)
-                    print(
-                        f"TTFT: {result.get('ttft', 'N/A'):.4f}秒, TPOT: {result.get('tpot', 'N/A'):.2f}毫秒"
-                    )
-                else:
-                    print(f"测试失败: {result.get('error')}")
+    def _run_adaptive(self, run_one, tasks, all_results, adaptive, concurrency) -> Dict[str, Any]:
+        """
+        按顺序发送请求直到达到目标精度
+
+        始终保持 concurrency 个请求在进行中 (与固定 repeat 的测试负载相同)，
+        每完成 check_every 个请求检查一次精度；达到目标或样本上限后不再发出新请求，
+        已发出的请求完成后一并计入结果
+
+        Args:
+            run_one: 发送一个请求的函数 (轮次, 提示词编号)
+            tasks: 全部候选请求，按轮次排列
+            all_results: 已完成的请求结果 (原地追加)
+            adaptive: adaptive 配置段
+            concurrency: 并发度
+
+        Returns:
+            最终精度 (见 _precision)
+        """
+        check_every = max(1, int(adaptive.get("check_every", concurrency)))
+        print(f"以并发度 {concurrency} 自适应重复，最多 {len(tasks)} 个请求...")
+        pending = iter(tasks)
+        precision = self._precision(all_results, adaptive)
+        since_check = 0
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            in_flight = set()
+
+            def submit():
+                for i, j in islice(pending, concurrency - len(in_flight)):
+                    in_flight.add(executor.submit(run_one, i, j))
+
+            if not precision["converged"]:
+                submit()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                in_flight.difference_update(done)
+                for future in done:
+                    result = future.result()
+                    if result is not None:
+                        all_results.append(result)
+                        since_check += 1
+                if since_check >= check_every:
+                    since_check = 0
+                    precision = self._precision(all_results, adaptive)
+                    if precision.get("relative_width") is not None:
+                        print(
+                            f"自适应重复: {precision['samples']} 个样本, {precision['metric']} "
+                            f"{precision['statistic']} 置信区间相对宽度 {precision['relative_width']:.1%} "
+                            f"(目标 {precision['target']:.1%})"
+                        )
+                if not (precision["converged"] or self.hub.skip_requested()):
+                    submit()
+        return self._precision(all_results, adaptive)
+
+    def _precision(self, results: List[Dict[str, Any]], adaptive: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        自适应重复的当前精度
+
+        Args:
+            results: 已完成的请求结果
+            adaptive: adaptive 配置段 (metric / statistic / target / min_samples / max_samples / confidence)
 
+        Returns:
+            ci_precision() 的结果加上配置项，converged 为True表示可以停止
+            (样本数不少于 min_samples 且相对宽度不超过 target，或已达到 max_samples)
+        """
+        stats_config = self.config.config.get("statistics", {})
+        metric = adaptive.get("metric", "ttft")
+        statistic = adaptive.get("statistic", "p50")
+        confidence = adaptive.get("confidence", stats_config.get("confidence", 0.95))
+        precision = ci_precision(
+            (r.get(metric) for r in results if r.get("success")),
+            statistic,
+            stats_config.get("bootstrap", 1000),
+            confidence,
+        )
+        samples = precision.get("samples", 0)
+        precision.update(
+            {
+                "metric": metric,
+                "statistic": statistic,
+                "confidence": confidence,
+                "target": adaptive["target"],
+                "samples": samples,
+                "reached_target": bool(
+                    precision
+                    and samples >= adaptive.get("min_samples", 30)
+                    and precision["relative_width"] <= adaptive["target"]
+                ),
+            }
+        )
+        precision["converged"] = precision["reached_target"] or samples >= adaptive.get("max_samples", 500)
+        return precision
+
+    def _report_request_result(self, result: Dict[str, Any]):
+        """打印单个请求的结果"""
+        if result.get("success"):
+            if result.get("ttft") is not None:
+                print(
+                    f"TTFT: {result.get('ttft', 'N/A'):.4f}秒, TPOT: {result.get('tpot', 'N/A'):.2f}毫秒"
+                )
+        else:
+            print(f"测试失败: {result.get('error')}")
+
+    def _run_remote_agent(
+        self, backend, api_url, model, prompts, max_tokens, repeat, streaming,
+        concurrency, agent_config, key=None, name=None,
+    ) -> List[Dict[str, Any]]:
+        """通过服务器端压测代理运行测试，消除网络往返对指标的影响"""
+
+        def on_result(result):
+            # 原始事件与本地测试一样单独保存，不放入结果与检查点
+            raw = result.pop("raw", None)
+            self._report_request_result(result)
+            self.hub.publish(
+                "request_end", id=None, success=bool(result.get("success")), ttft=result.get("ttft"),
+                tpot=result.get("tpot"), token_count=result.get("token_count"), error=result.get("error"),
+                total_time=result.get("total_time"),
+            )
+            if result.get("success") and self.checkpoint and key:
+                self.checkpoint.record_request(key, result)
+            if self.records and name:
+                self.records.record_request(name, backend, concurrency, result)
+                if raw:
+                    self.records.record_raw(name, backend, concurrency, dict(result, raw=raw))
+
+        runner = RemoteLoadRunner(self.service_manager.ssh_manager, agent_config)
+        results = runner.run(
+            backend, api_url, model, prompts, max_tokens,
+            repeat=repeat, streaming=streaming, concurrency=concurrency,
+            on_result=on_result,
+        )
+        # 与本地测试保持一致的排列顺序
+        results.sort(key=lambda r: (r["round"], r["prompt_id"]))
+        return [r for r in results if r.get("success")]
+
+    def _finish_test(
+        self, name, backend, backend_config, streaming, test_results, concurrency=1,
+        test_start=None, deployed=True, warmup=None, precision=None, test_config=None,
+    ) -> Dict[str, Any]:
+        """计算汇总统计并组装测试结果 (预热请求已在 test_results 之外单独保存)"""
         test_param=self.config.get_test_param()
 
         # 计算汇总统计
         summary_stats = {}
         if test_param:
-            param=backend_config.get(test_param,"no")
-            if param=="no":
-                args=backend_config.get("args",{})
-                param=args.get(test_param,'no')
-            if not param=="no":
+            # 测试级字段 (如 max_tokens / repeat) 也可以作为横坐标
+            param = self._get_param_value(
+                {
+                    "max_tokens": self.config.get_max_tokens(),
+                    **(test_config or {}),
+                    "config": backend_config,
+                    "streaming": streaming,
+                    "concurrency": concurrency,
+                },
+                test_param,
+            )
+            if param is not None:
                 summary_stats[test_param]=param
-        if test_results:
-            ttfts = [r.get("ttft") for r in test_results if r.get("ttft") is not None]
-            tpots = [r.get("tpot") for r in test_results if r.get("tpot") is not None]
-            throughputs = [
-                r.get("throughput")
-                for r in test_results
-                if r.get("throughput") is not None
+
+        # 冷启动耗时 (部署阶段测得，续跑时未部署则没有)
+        cold_start = self.service_manager.last_startup if deployed else None
+        if cold_start:
+            summary_stats["cold_start_total"] = cold_start["total"]
+            for phase, value in cold_start.get("phases", {}).items():
+                summary_stats[f"cold_start_{phase}"] = value
+
+        # 测试期间后端日志中的统计与告警
+        backend_log = self.service_manager.backend_log(since=test_start) if deployed else None
+        if backend_log:
+            kv_usage = [
+                e["gpu_kv_cache_usage"] for e in backend_log["stats"] if "gpu_kv_cache_usage" in e
             ]
+            if kv_usage:
+                summary_stats["gpu_kv_cache_usage_max"] = max(kv_usage)
+            if backend_log["warnings"]:
+                summary_stats["backend_warnings"] = len(backend_log["warnings"])
 
-            if ttfts:
-                summary_stats["ttft_avg"] = sum(ttfts) / len(ttfts)
-                summary_stats["ttft_min"] = min(ttfts)
-                summary_stats["ttft_max"] = max(ttfts)
+        if warmup:
+            summary_stats["warmup_requests"] = warmup["requests"]
+            summary_stats["warmup_duration"] = warmup["duration"]
+            summary_stats["warmup_steady"] = warmup["steady"]
 
-            if tpots:
-                summary_stats["tpot_avg"] = sum(tpots) / len(tpots)
-                summary_stats["tpot_min"] = min(tpots)
-                summary_stats["tpot_max"] = max(tpots)
+        if precision and "relative_width" in precision:
+            summary_stats["precision_relative_width"] = precision["relative_width"]
+            summary_stats["precision_samples"] = precision["samples"]
+            summary_stats["precision_target_met"] = precision["reached_target"]
 
-            if throughputs:
-                summary_stats["throughput_avg"] = sum(throughputs) / len(throughputs)
-                summary_stats["throughput_min"] = min(throughputs)
-                summary_stats["throughput_max"] = max(throughputs)
+        if test_results:
+            # 百分位、标准差、变异系数与平均值的自助法置信区间
+            stats_config = self.config.config.get("statistics", {})
+            summary_stats.update(
+                summarize_requests(
+                    test_results,
+                    bootstrap=stats_config.get("bootstrap", 1000),
+                    confidence=stats_config.get("confidence", 0.95),
+                )
+            )
 
         # 打印汇总结果
         if summary_stats:
             print("\n测试结果汇总:")
             if "ttft_avg" in summary_stats:
                 print(
-                    f"TTFT 平均: {summary_stats['ttft_avg']:.4f}秒, 最小: {summary_stats['ttft_min']:.4f}秒, 最大: {summary_stats['ttft_max']:.4f}秒"
+                    f"TTFT 平均: {summary_stats['ttft_avg']:.4f}秒, P50: {summary_stats['ttft_p50']:.4f}秒, "
+                    f"P95: {summary_stats['ttft_p95']:.4f}秒, P99: {summary_stats['ttft_p99']:.4f}秒, "
+                    f"最大: {summary_stats['ttft_max']:.4f}秒, CV: {summary_stats['ttft_cv']:.2f}"
                 )
             if "tpot_avg" in summary_stats:
                 print(
-                    f"TPOT 平均: {summary_stats['tpot_avg']:.2f}毫秒, 最小: {summary_stats['tpot_min']:.2f}毫秒, 最大: {summary_stats['tpot_max']:.2f}毫秒"
+                    f"TPOT 平均: {summary_stats['tpot_avg']:.2f}毫秒, P50: {summary_stats['tpot_p50']:.2f}毫秒, "
+                    f"P95: {summary_stats['tpot_p95']:.2f}毫秒, P99: {summary_stats['tpot_p99']:.2f}毫秒, "
+                    f"最大: {summary_stats['tpot_max']:.2f}毫秒, CV: {summary_stats['tpot_cv']:.2f}"
                 )
             if "throughput_avg" in summary_stats:
                 print(
-                    f"吞吐量 平均: {summary_stats['throughput_avg']:.2f}个/秒, 最小: {summary_stats['throughput_min']:.2f}个/秒, 最大: {summary_stats['throughput_max']:.2f}个/秒"
+                    f"吞吐量 平均: {summary_stats['throughput_avg']:.2f}个/秒, P50: {summary_stats['throughput_p50']:.2f}个/秒, "
+                    f"最小: {summary_stats['throughput_min']:.2f}个/秒, 最大: {summary_stats['throughput_max']:.2f}个/秒"
+                )
+            if "ttft_ci_low" in summary_stats:
+                print(
+                    f"TTFT 平均值置信区间: [{summary_stats['ttft_ci_low']:.4f}, {summary_stats['ttft_ci_high']:.4f}]秒"
+                )
+            if "precision_relative_width" in summary_stats:
+                print(
+                    f"精度: {precision['metric']} {precision['statistic']} = {precision['estimate']:.4f}, "
+                    f"{precision['confidence']:.0%} 置信区间 [{precision['ci_low']:.4f}, {precision['ci_high']:.4f}], "
+                    f"相对宽度 {precision['relative_width']:.1%} (目标 {precision['target']:.1%}), "
+                    f"{precision['samples']} 个样本, {'已达到目标' if precision['reached_target'] else '未达到目标'}"
+                )
+            if "warmup_requests" in summary_stats:
+                print(
+                    f"预热: {summary_stats['warmup_requests']} 个请求, {summary_stats['warmup_duration']:.1f}秒 (不计入以上统计)"
+                )
+            if "cold_start_total" in summary_stats:
+                print(
+                    f"冷启动 总耗时: {summary_stats['cold_start_total']:.2f}秒 (页缓存: {cold_start.get('page_cache') or '未处理'})"
                 )
 
         # 返回完整结果
@@ -243,31 +750,188 @@ class TestOrchestrator:
             "backend": backend,
             "config": backend_config,
             "streaming": streaming,
+            "concurrency": concurrency,
+            "metrics_version": METRICS_VERSION,
+            "cold_start": cold_start,
+            "backend_log": backend_log,
+            "process": self.service_manager.process_status() if deployed else None,
             "test_results": test_results,
+            "warmup": {k: v for k, v in warmup.items() if k != "results"} if warmup else None,
+            "warmup_results": warmup["results"] if warmup else [],
+            "precision": precision,
             "summary": summary_stats,
         }
 
-    def run_all_tests(self):
-        """运行所有配置的测试"""
-        # 创建运行目录
-        result_dir = self.config.get_result_dir()
-        self.run_dir = os.path.join(result_dir, f"run_{self.run_timestamp}")
-        os.makedirs(self.run_dir, exist_ok=True)
+    def _prepare_run_dir(self):
+        """创建运行目录与检查点 (续跑时使用已有目录)"""
+        if not self.run_dir:
+            result_dir = self.config.get_result_dir()
+            self.run_dir = os.path.join(result_dir, f"run_{self.run_timestamp}")
+            os.makedirs(self.run_dir, exist_ok=True)
+        if self.checkpoint is None:
+            self.checkpoint = RunCheckpoint(self.run_dir)
+        if self.records is None:
+            self.records = RecordWriter(
+                self.run_dir, compress_level=self.config.config.get("chunk_recording", {}).get("compress_level", 6)
+            )
+        if self.service_manager and not os.path.exists(os.path.join(self.run_dir, RUN_META_FILE)):
+            self._write_run_meta()
+
+    def _write_run_meta(self):
+        """
+        记录运行环境 (主机名、GPU型号与显存) 到 run_meta.json，供跨运行目录的矩阵使用
+
+        配置项 hardware 可以指定硬件标签 (如 "RTX 4090")，默认使用第一块GPU的型号
+        """
+        ssh = self.service_manager.ssh_manager
+        meta = {
+            "run": os.path.basename(os.path.normpath(self.run_dir)),
+            "timestamp": self.run_timestamp,
+            "local_mode": ssh.local_mode,
+            "host": None,
+            "gpus": [],
+        }
+        code, out, _ = ssh.execute_command("hostname")
+        if code == 0:
+            meta["host"] = out.strip()
+        code, out, _ = ssh.execute_command(
+            "nvidia-smi --query-gpu=name,memory.total --format=csv,noheader,nounits"
+        )
+        if code == 0:
+            for line in out.strip().splitlines():
+                name, _, memory = line.rpartition(",")
+                if name:
+                    meta["gpus"].append({"name": name.strip(), "memory_mb": int(float(memory))})
+        meta["hardware"] = self.config.config.get("hardware") or (
+            meta["gpus"][0]["name"] if meta["gpus"] else meta["host"]
+        )
+        with open(os.path.join(self.run_dir, RUN_META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2, ensure_ascii=False)
+        print(f"运行环境: {meta['host']}, 硬件: {meta['hardware']}")
 
-        tests = self.config.get_tests()
-        print(f"开始运行 {len(tests)} 个测试...")
+    def run_autotune(self) -> Dict[str, Any]:
+        """
+        按配置中的 autotune 段自动调优vLLM服务参数
+
+        Returns:
+            最佳试验记录，没有可行配置时返回None
+        """
+        tune_config = self.config.config.get("autotune")
+        if not tune_config:
+            print("配置文件中没有 autotune 段")
+            return None
+        self._prepare_run_dir()
+        print(f"调优结果将保存到: {self.run_dir}")
+        observers = self._start_observers()
+        try:
+            return AutoTuner(self, tune_config).run()
+        finally:
+            for observer in observers:
+                observer.stop()
+            if self.records:
+                self.records.close_events()  # 中断时也保证压缩文件完整
+            if self.checkpoint:
+                self.checkpoint.close()  # 刷新尚未写入磁盘的请求记录
+
+    def _start_observers(self) -> List[Any]:
+        """
+        按配置启动事件总线的订阅者:
+            - live_metrics: 实时看板 (终端状态行与可选的本地HTTP页面)
+            - openmetrics: 供 Prometheus 抓取的 /metrics 端点
+            - trace: 每个测试的请求时间线 (Chrome trace JSON)
+
+        Returns:
+            已启动的订阅者，运行结束时调用 stop()
+        """
+        telemetry = self.service_manager.latest_stats if self.service_manager else None
+        observers = []
+        live_config = self.config.config.get("live_metrics", {})
+        if live_config.get("enabled"):
+            observers.append(LiveMonitor(self.hub, live_config, telemetry))
+        metrics_config = self.config.config.get("openmetrics", {})
+        if metrics_config.get("enabled"):
+            observers.append(OpenMetricsExporter(self.hub, metrics_config, telemetry))
+        trace_config = self.config.config.get("trace", {})
+        if trace_config.get("enabled"):
+            history = self.service_manager.backend_log if self.service_manager else None
+            observers.append(TraceRecorder(self.hub, trace_config, self.run_dir, history))
+        for observer in observers:
+            observer.start()
+        return observers
+
+    def run_all_tests(self, tests: Iterable[Dict[str, Any]] = None):
+        """
+        运行所有配置的测试
+
+        Args:
+            tests: 要运行的测试 (可选，默认运行配置中的全部测试，扫描规格按需展开)
+        """
+        self._prepare_run_dir()
+
+        if tests is None:
+            tests = self.config.iter_tests()
+            total = self.config.count_tests()
+        else:
+            tests = list(tests)
+            total = len(tests)
+        print(f"开始运行 {total} 个测试...")
         print(f"测试结果将保存到: {self.run_dir}")
 
-        for i, test_config in enumerate(tests):
-            print(f"\n[{i + 1}/{len(tests)}] 运行测试: {test_config['name']}")
-            result = self.run_test(test_config)
-            self.results.append(result)
+        # 在当前测试运行时后台准备后续测试的模型
+        prefetch_config = self.config.config.get("prefetch", {})
+        prefetcher = None
+        if prefetch_config.get("enabled"):
+            prefetcher = ModelPrefetcher(self.service_manager, prefetch_config)
+
+        # 只提前展开预取所需的少量后续测试
+        lookahead = prefetcher.lookahead if prefetcher else 0
+        pending = iter(tests)
+        upcoming = deque(islice(pending, lookahead + 1))
 
-            # 保存中间结果
-            self.save_results()
+        observers = self._start_observers()
+        try:
+            i = 0
+            while upcoming:
+                test_config = upcoming.popleft()
+                upcoming.extend(islice(pending, 1))
+                i += 1
+                key = self._test_key(test_config)
+                if self.checkpoint.is_test_done(key):
+                    print(f"\n[{i}/{total}] 跳过已完成的测试: {test_config['name']}")
+                    continue
+                print(f"\n[{i}/{total}] 运行测试: {test_config['name']}")
+                if prefetcher:
+                    prefetcher.wait_for(test_config)
+                    prefetcher.schedule(list(upcoming))
+                with prefetcher.measuring() if prefetcher else nullcontext():
+                    result = self.run_test(test_config)
+                for field in ("sweep", "config_hash"):
+                    if field in test_config:
+                        result[field] = test_config[field]
+                self.add_result(result)
+
+                # 保存中间结果，保存之后再标记完成，续跑时已完成的测试一定有结果
+                self.save_results()
+                if result.get("success"):
+                    self.checkpoint.mark_test_done(key, test_config["name"])
+        finally:
+            for observer in observers:
+                observer.stop()
+            if self.records:
+                self.records.close_events()  # 中断时也保证压缩文件完整
+            if self.checkpoint:
+                self.checkpoint.close()  # 刷新尚未写入磁盘的请求记录
+            if prefetcher:
+                prefetcher.shutdown()
 
         print("\n所有测试完成!")
 
+    def add_result(self, result: Dict[str, Any]):
+        """加入一个测试结果，并把测试级记录追加到 records.ndjson"""
+        self.results.append(result)
+        if self.records:
+            self.records.record_test(result)
+
     def save_results(self):
         """保存测试结果"""
         if not self.run_dir:
@@ -330,6 +994,8 @@ class TestOrchestrator:
             return
 
         # 创建数据框
+        import pandas as pd
+
         df = pd.DataFrame(rows)
 
         # 生成汇总统计
@@ -363,6 +1029,12 @@ class TestOrchestrator:
 
     def _generate_charts(self, df, run_dir):
         """生成测试图表"""
+        import matplotlib
+
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
         # 创建图表目录
         charts_dir = os.path.join(run_dir, "charts")
         os.makedirs(charts_dir, exist_ok=True)
@@ -418,27 +1090,22 @@ class TestOrchestrator:
         plt.close()
 
     def generate_report(self):
-        """生成测试报告，将四幅图合并到一张大图中"""
-        import matplotlib.pyplot as plt
-        import seaborn as sns
-        import numpy as np
-        from collections import defaultdict
+        """
+        生成测试报告：每个后端每个指标一幅折线图，外加一张合并大图
 
-        # 设置中文字体，解决字符显示为方框的问题
-        plt.rcParams["font.family"] = ["SimHei", "WenQuanYi Micro Hei", "Heiti TC", "Arial Unicode MS"]
-        plt.rcParams["axes.unicode_minus"] = False  # 解决负号显示问题
+        图表数据在当前进程中准备，渲染由进程池并行完成 (进程数由配置
+        report_workers 指定，默认为CPU核数)；数据与绘图选项未变化的图表
+        直接从图表缓存复制
+        """
+        from collections import defaultdict
 
-        # 加载结果数据
-        if not self.results and self.run_dir and os.path.exists(self.run_dir):
-            result_path = os.path.join(self.run_dir, "test_results.json")
-            if os.path.exists(result_path):
-                with open(result_path, "r", encoding="utf-8") as f:
-                    self.results = json.load(f)
-            else:
-                print("没有找到测试结果数据，无法生成报告")
-                return
+        if not self.run_dir:
+            print("没有运行目录，无法生成报告")
+            return
 
-        if not self.results:
+        # 按块折叠请求级记录，内存占用与请求数无关
+        aggregates = self._aggregate_records()
+        if aggregates is None or not aggregates.tests:
             print("没有测试结果数据，无法生成报告")
             return
 
@@ -446,199 +1113,248 @@ class TestOrchestrator:
         report_dir = os.path.join(self.run_dir, "report")
         os.makedirs(report_dir, exist_ok=True)
 
-        # 从配置文件获取用户指定的横坐标参数（test_param）
-        test_param = self.config.config.get("test_param", "model")
+        # 从配置文件获取用户指定的横坐标参数（report_axis / test_param，可以是任意扫描维度）
+        test_param = self.config.get_report_axis()
         print(f"使用测试参数 '{test_param}' 作为横坐标")
 
-        # 按后端分组
+        # 按后端分组 (测试级记录，不含请求明细)
         backend_groups = defaultdict(list)
-        for result in self.results:
-            backend_groups[result["backend"]].append(result)
+        for result in aggregates.tests.values():
+            if result.get("success"):
+                # 旧版本结果的汇总中没有百分位等统计量，用请求级记录补齐
+                for metric, values in aggregates.group(
+                    "by_test", (result["backend"], result["name"])
+                ).items():
+                    for stat, value in values.items():
+                        if stat != "count":
+                            result["summary"].setdefault(f"{metric}_{stat}", value)
+                backend_groups[result["backend"]].append(result)
+
+        # 定义需要绘制的指标: (请求级指标, 单位, 统计量)
+        # 延迟类指标默认画P95 (均值会掩盖尾延迟)，吞吐量画中位数
+        statistic = self.config.config.get("report_statistic", "p95")
+        metrics = {
+            "TTFT": ("ttft", "s", statistic),
+            "TPOT": ("tpot", "ms", statistic),
+            "Throughput": ("throughput", "token/s", "p50"),
+            "Total Time": ("total_time", "s", statistic)
+        }
 
-        # 为每个后端生成单独图表（保留原有功能）
+        specs = []
         for backend, results in backend_groups.items():
-            # 定义需要绘制的指标
-            metrics = {
-                "TTFT": ("ttft_avg", "s"),
-                "TPOT": ("tpot_avg", "ms"),
-                "Throughput": ("throughput_avg", "token/s"),
-                "Total Time": ("total_time", "s")
-            }
+            combined_metrics = []
+            for name, (metric, y_unit, stat) in metrics.items():
+                metric_name = f"{name} {stat.upper()}"
+                series = self._metric_series(results, test_param, metric, stat)
+                # 每个指标一幅单独图表
+                specs.append(
+                    {
+                        "kind": "metric",
+                        "path": os.path.join(
+                            report_dir, f"{backend}_{name.lower()}_vs_{test_param}.png"
+                        ),
+                        "backend": backend,
+                        "metric_name": metric_name,
+                        "y_unit": y_unit,
+                        "test_param": test_param,
+                        "series": series,
+                    }
+                )
+                # 合并大图中横坐标按降序排列
+                combined_metrics.append(
+                    {
+                        "metric_name": metric_name,
+                        "y_unit": y_unit,
+                        "series": {label: points[::-1] for label, points in series.items()},
+                    }
+                )
+
+            # 合并大图
+            specs.append(
+                {
+                    "kind": "combined",
+                    "path": os.path.join(report_dir, f"{backend}_combined_report.png"),
+                    "backend": backend,
+                    "test_param": test_param,
+                    "config_text": self._prepare_config_info(results, test_param),
+                    "metrics": combined_metrics,
+                }
+            )
+
+        # 按测试 / 提示词 / 并发度分组的统计表
+        self._write_stats_tables(aggregates, report_dir)
+
+        start = time.time()
+        cache = self._chart_cache()
+        pending = [spec for spec in specs if not (cache and cache.restore(spec))]
+        if cache and cache.hits:
+            print(f"图表缓存命中 {cache.hits} 幅，需要重新渲染 {len(pending)} 幅")
+
+        workers = self.config.config.get("report_workers")
+        for path in render_all(pending, workers):
+            print(f"已生成图表: {path}")
+        if cache:
+            for spec in pending:
+                cache.store(spec)
+            cache.save()
+
+        print(f"所有报告图表已保存到: {report_dir} ({len(specs)} 幅，耗时 {time.time() - start:.1f} 秒)")
+
+    def _aggregate_records(self) -> Optional[StreamingStats]:
+        """
+        流式读取运行目录下的 records.ndjson 并折叠为分组摘要
+
+        没有记录文件的旧运行目录从 test_results.json 转换 (需要一次性读入)
 
-            # 为每个指标绘制单独图表（原有功能）
-            for metric_name, (metric_key, y_unit) in metrics.items():
-                plt.figure(figsize=(10, 6))
-                sns.set_style("whitegrid")
-
-                # 收集每个模型的数据
-                model_data = defaultdict(dict)
-                for result in results:
-                    model_name = result["name"]
-
-                    # 获取横坐标参数值
-                    backend_config = result["config"]
-                    x_value = backend_config.get(test_param)
-                    if x_value is None:
-                        x_value = backend_config.get("args", {}).get(test_param)
-                    if x_value is None:
-                        x_value = f"unknown_{test_param}"
-                    original_x_value = str(x_value)
-                    sort_x_value = x_value
-
-                    # 处理不同指标的数据来源
-                    if metric_name == "Total Time":
-                        total_times = [t["total_time"] for t in result["test_results"]]
-                        value = sum(total_times) / len(total_times) if total_times else 0
-                    else:
-                        value = result["summary"].get(metric_key, 0)
-
-                    model_data[model_name][(original_x_value, sort_x_value)] = value
-
-                # 绘制折线
-                for model, data in model_data.items():
-                    def sort_key(item):
-                        key = item[0][1]
-                        try:
-                            return float(key)
-                        except (ValueError, TypeError):
-                            return str(key)
-
-                    sorted_items = sorted(data.items(), key=sort_key, reverse=False)
-                    x = [item[0][0] for item in sorted_items]
-                    y = [item[1] for item in sorted_items]
-                    plt.plot(x, y, marker='o', label=model, linewidth=2, markersize=6)
-
-                # 图表设置
-                plt.xlabel(test_param, fontsize=12)
-                plt.ylabel(f"{metric_name} ({y_unit})", fontsize=12)
-                plt.title(f"{backend} - {metric_name} vs {test_param}", fontsize=14)
-                plt.legend(title="Models", fontsize=10)
-                plt.xticks(rotation=45, ha="right")
-                plt.tight_layout()
-
-                # 保存单独图表
-                plot_path = os.path.join(report_dir, f"{backend}_{metric_name.lower()}_vs_{test_param}.png")
-                plt.savefig(plot_path, dpi=300)
-                plt.close()
-                print(f"已生成单独图表: {plot_path}")
-
-            # 新功能：生成合并大图
-            self._generate_combined_chart(backend, results, test_param, report_dir)
-
-        print(f"所有报告图表已保存到: {report_dir}")
-
-    def _generate_combined_chart(self, backend, results, test_param, report_dir):
-        """生成合并四幅图的大图"""
+        Returns:
+            StreamingStats，没有任何结果数据时返回None
+        """
+        stats_config = self.config.config.get("statistics", {})
+        aggregates = StreamingStats(
+            {
+                "by_test": ["backend", "test"],
+                "by_prompt": ["backend", "test", "prompt_id"],
+                "by_concurrency": ["backend", "concurrency"],
+            },
+            bootstrap=stats_config.get("bootstrap", 1000),
+            confidence=stats_config.get("confidence", 0.95),
+        )
+        chunk_size = stats_config.get("chunk_size", 50000)
+
+        records_path = os.path.join(self.run_dir, RECORDS_FILE)
+        if os.path.exists(records_path):
+            chunks = iter_current_chunks(records_path, chunk_size)
+        else:
+            results = self.results
+            if not results:
+                result_path = os.path.join(self.run_dir, "test_results.json")
+                if not os.path.exists(result_path):
+                    print("没有找到测试结果数据，无法生成报告")
+                    return None
+                print(f"运行目录中没有 {RECORDS_FILE}，从 test_results.json 读取全部结果")
+                with open(result_path, "r", encoding="utf-8") as f:
+                    results = json.load(f)
+            chunks = chunked(records_from_results(results), chunk_size)
+
+        for chunk in chunks:
+            aggregates.add_chunk(chunk)
+        print(f"已汇总 {len(aggregates.tests)} 个测试，{aggregates.requests} 个成功请求")
+        return aggregates
+
+    def _write_stats_tables(self, aggregates: StreamingStats, report_dir: str):
+        """把按测试、提示词、并发度分组的描述统计写入CSV"""
+        for name in aggregates.groupings:
+            table = aggregates.table(name)
+            if table.empty:
+                continue
+            path = os.path.join(report_dir, f"stats_{name}.csv")
+            table.to_csv(path, index=False)
+            print(f"已生成统计表: {path}")
+
+        # 自适应重复的测试: 每个测试达到的精度
+        rows = [
+            dict({"backend": test.get("backend"), "test": name}, **test["precision"])
+            for name, test in aggregates.tests.items()
+            if test.get("precision")
+        ]
+        if rows:
+            import pandas as pd
+
+            path = os.path.join(report_dir, "precision.csv")
+            pd.DataFrame(rows).to_csv(path, index=False)
+            print(f"已生成精度表: {path}")
+
+    def _chart_cache(self) -> Optional[ChartCache]:
+        """
+        按配置创建图表缓存
+
+        配置项 chart_cache:
+            - enabled: 是否启用 (默认True)
+            - dir: 缓存目录 (默认为结果目录下的 .chart_cache，各运行目录共用)
+            - max_mb: 缓存大小上限 (默认512MB)
+        """
+        cache_config = self.config.config.get("chart_cache", {})
+        if not cache_config.get("enabled", True):
+            return None
+        cache_dir = cache_config.get(
+            "dir", os.path.join(self.config.get_result_dir(), ".chart_cache")
+        )
+        return ChartCache(cache_dir, cache_config.get("max_mb", 512), RENDER_VERSION)
+
+    def _metric_series(self, results, test_param, metric, stat) -> Dict[str, List]:
+        """
+        收集一个指标的折线数据
+
+        Args:
+            results: 同一后端的测试结果
+            test_param: 横坐标参数
+            metric: 请求级指标 (ttft / tpot / throughput / total_time)
+            stat: 统计量 (avg / p50 / p95 / p99 等)
+
+        Returns:
+            {图例名称: [(横坐标, 数值), ...]}，按横坐标升序排列
+        """
         from collections import defaultdict
 
-        # 设置中文字体，确保中文显示正常
-        plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'WenQuanYi Micro Hei', 'Heiti TC', 'Arial Unicode MS']
-        plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
-        
-        # 创建大图
-        fig = plt.figure(figsize=(20, 30))
-        sns.set_style("whitegrid")
-        
-        # 定义子图布局
-        # 顶部预留空间用于配置信息，下面放2x2的四幅图
-        fig.suptitle(f'{backend} - 性能测试报告', fontsize=30, fontweight='bold', y=0.95,fontproperties=self._get_chinese_font())
-        
-        # 创建网格布局：5行1列，第一行用于配置信息，下面四行用于图表
-        grid_spec = plt.GridSpec(5, 1, height_ratios=[0.8, 1, 1, 1, 1], hspace=0.4)
-        
-        # 第一行：配置信息区域
-        config_ax = fig.add_subplot(grid_spec[0])
-        config_ax.axis('off')  # 隐藏坐标轴
-        
-        # 准备配置信息文本
-        config_text = self._prepare_config_info(results, test_param)
-        config_ax.text(0.02, 0.5, config_text, fontsize=11, va='center', ha='left', 
-                    bbox=dict(boxstyle="round,pad=0.5", facecolor="lightgray", alpha=0.7),
-                     fontproperties=self._get_chinese_font())
-        
-        # 定义指标和对应的子图位置
-        metrics = {
-            "TTFT": ("ttft_avg", "s", grid_spec[1]),
-            "TPOT": ("tpot_avg", "ms", grid_spec[2]),
-            "Throughput": ("throughput_avg", "token/s", grid_spec[3]),
-            "Total Time": ("total_time", "s", grid_spec[4])
+        # 收集每个模型的数据
+        model_data = defaultdict(dict)
+        for result in results:
+            model_name = self._series_label(result, test_param)
+
+            # 获取横坐标参数值
+            x_value = self._get_param_value(result, test_param)
+            if x_value is None:
+                x_value = f"unknown_{test_param}"
+
+            value = result["summary"].get(f"{metric}_{stat}", 0)
+
+            model_data[model_name][(str(x_value), x_value)] = value
+
+        def sort_key(item):
+            key = item[0][1]
+            try:
+                return float(key)
+            except (ValueError, TypeError):
+                return str(key)
+
+        return {
+            model: [(x[0], value) for x, value in sorted(data.items(), key=sort_key)]
+            for model, data in model_data.items()
         }
-        
-        # 为每个指标创建子图
-        for i, (metric_name, (metric_key, y_unit, subplot_spec)) in enumerate(metrics.items()):
-            ax = fig.add_subplot(subplot_spec)
-            
-            # 收集每个模型的数据
-            model_data = defaultdict(dict)
-            for result in results:
-                model_name = result["name"]
-
-                # 获取横坐标参数值
-                backend_config = result["config"]
-                x_value = backend_config.get(test_param)
-                if x_value is None:
-                    x_value = backend_config.get("args", {}).get(test_param)
-                if x_value is None:
-                    x_value = f"unknown_{test_param}"
-                original_x_value = str(x_value)
-                sort_x_value = x_value
-
-                # 处理不同指标的数据来源
-                if metric_name == "Total Time":
-                    total_times = [t["total_time"] for t in result["test_results"]]
-                    value = sum(total_times) / len(total_times) if total_times else 0
-                else:
-                    value = result["summary"].get(metric_key, 0)
-
-                model_data[model_name][(original_x_value, sort_x_value)] = value
-
-            # 绘制折线
-            colors = plt.cm.Set3(np.linspace(0, 1, len(model_data)))
-            for (model, data), color in zip(model_data.items(), colors):
-                def sort_key(item):
-                    key = item[0][1]
-                    try:
-                        return float(key)
-                    except (ValueError, TypeError):
-                        return str(key)
-
-                sorted_items = sorted(data.items(), key=sort_key, reverse=True)
-                x = [item[0][0] for item in sorted_items]
-                y = [item[1] for item in sorted_items]
-                ax.plot(x, y, marker='o', label=model, linewidth=2, markersize=6, color=color)
-                
-                # 在数据点上添加数值标签
-                for j, (x_val, y_val) in enumerate(zip(x, y)):
-                    ax.annotate(f'{y_val:.2f}', (x_val, y_val), 
-                            textcoords="offset points", xytext=(0,8), 
-                            ha='center', fontsize=8)
-
-            # 子图设置
-            ax.set_xlabel(test_param, fontsize=11)
-            ax.set_ylabel(f"{metric_name} ({y_unit})", fontsize=11)
-            ax.set_title(f"{metric_name} vs {test_param}", fontsize=13, fontweight='bold')
-            ax.legend(title="Models", fontsize=9)
-            ax.tick_params(axis='x', rotation=45)
-            ax.grid(True, alpha=0.3)
-        
-        # 调整布局
-        plt.tight_layout()
-        
-        # 保存合并大图
-        combined_plot_path = os.path.join(report_dir, f"{backend}_combined_report.png")
-        plt.savefig(combined_plot_path, dpi=300, bbox_inches='tight')
-        plt.close()
-        print(f"已生成合并大图: {combined_plot_path}")
-
-    def _get_chinese_font(self):
-        """获取中文字体属性，确保中文显示正常"""
-        from matplotlib.font_manager import FontProperties
-        # 尝试使用系统中可能的中文字体
-        chinese_fonts = ['SimHei', 'Microsoft YaHei', 'WenQuanYi Micro Hei', 
-                        'Heiti TC', 'Arial Unicode MS', 'DejaVu Sans']
-        
-        # 返回第一个可用的字体
-        return FontProperties(family=chinese_fonts)
+
+    @staticmethod
+    def _get_param_value(result: Dict[str, Any], param: str) -> Any:
+        """
+        从测试结果中获取参数值
+
+        查找顺序: 扫描维度 > 后端配置 > args > 测试级字段 (如 concurrency) > 汇总中记录的参数值，
+        也支持点分路径 (如 args.max-num-seqs / backend_config.model)
+        """
+        sweep = result.get("sweep") or {}
+        if param in sweep:
+            return sweep[param]
+        config = result.get("config") or {}
+        if "." in param:
+            return get_path({**result, "backend_config": config}, param)
+        if param in config:
+            return config[param]
+        args = config.get("args") or {}
+        if param in args:
+            return args[param]
+        if param in result:
+            return result[param]
+        return (result.get("summary") or {}).get(param)
+
+    @staticmethod
+    def _series_label(result: Dict[str, Any], axis: str) -> str:
+        """图例名称：扫描测试按横坐标以外的维度分组，普通测试使用测试名称"""
+        sweep = result.get("sweep")
+        if not sweep:
+            return result["name"]
+        others = [
+            f"{k}={str(v).rstrip('/').split('/')[-1]}" for k, v in sweep.items() if k != axis
+        ]
+        return ", ".join(others) or result["backend"]
 
     def _prepare_config_info(self, results, test_param):
         """准备配置信息文本"""
@@ -656,8 +1372,7 @@ class TestOrchestrator:
         # 添加每个测试的基本信息
         config_info.append("\n测试详情:")
         for i, result in enumerate(results):
-            backend_config = result["config"]
-            value=backend_config.get(test_param)
+            value = self._get_param_value(result, test_param)
             config_info.append(f"  {i+1}. {result['name']} {test_param}={value}")
             #config_info.append(f"     模型: {result['config'].get('model', 'N/A')}")
             config_info.append(f"     流式: {result.get('streaming', 'N/A')}")
@@ -0,0 +1,257 @@
+import os
+import json
+import threading
+from typing import Dict, Any, List, Callable, Optional
+
+from records import safe_name
+
+TRACE_DIR = "traces"
+
+# 进程 (Chrome trace 中的分组)
+REQUESTS_PID = 1
+BACKEND_PID = 2
+
+# 后端遥测中作为计数器轨道导出的字段
+COUNTER_FIELDS = ["gpu_kv_cache_usage", "running", "waiting", "avg_generation_throughput"]
+
+
+def trace_filename(test_name: str) -> str:
+    return safe_name(test_name) + ".trace.json"
+
+
+class TraceRecorder:
+    """
+    把每个请求导出为 Chrome trace (JSON) 时间线，可用 chrome://tracing 或 ui.perfetto.dev 打开
+
+    订阅事件总线，每个测试结束时写出 traces/<测试名>.trace.json:
+        - 每个并发槽 (发送请求的工作线程) 一条轨道，请求为一个区间，下面分为
+          connect (到收到响应头)、prefill (到首个内容块) 与 decode (到请求结束) 三段
+        - 首个数据块、首个内容token、每个token到达与请求完成为瞬时事件
+        - 后端部署、就绪、停止与日志告警为后端轨道上的事件，冷启动各阶段为区间
+        - 进行中请求数与后端遥测 (KV cache使用率、运行/等待请求数) 为计数器轨道
+
+    逐token事件暴露了平均TPOT掩盖的问题: 队头阻塞表现为某条轨道上长时间没有token，
+    批处理引起的停顿表现为多条轨道在同一时刻同时出现间隔。
+    """
+
+    def __init__(
+        self,
+        hub,
+        config: Dict[str, Any],
+        run_dir: str,
+        telemetry_history: Callable[[float], Optional[Dict[str, Any]]] = None,
+    ):
+        """
+        初始化时间线导出
+
+        Args:
+            hub: 事件总线
+            config: trace 配置段:
+                - tokens: 是否导出每个token的瞬时事件 (默认True，长输出的大规模测试可关闭以减小文件)
+            run_dir: 运行目录，时间线写入其下的 traces 目录
+            telemetry_history: 返回某时间之后后端日志事件的函数 (可选)，返回值格式同 backend_log()
+        """
+        self.hub = hub
+        self.tokens = config.get("tokens", True)
+        self.out_dir = os.path.join(run_dir, TRACE_DIR)
+        self.telemetry_history = telemetry_history
+        self.lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, test_event: Optional[Dict[str, Any]]):
+        self.test = test_event
+        self.requests: Dict[Any, Dict[str, Any]] = {}
+        self.remote: List[Dict[str, Any]] = []
+        self.backend_events: List[Dict[str, Any]] = []
+        self.slots: Dict[int, int] = {}  # 线程 -> 并发槽
+        self.in_flight: List[tuple] = []  # (时间, 进行中请求数)
+        self.active = 0
+
+    def on_event(self, event: Dict[str, Any]):
+        kind = event["type"]
+        with self.lock:
+            if kind == "test_start":
+                self._reset(event)
+                return
+            if kind == "backend":
+                # 后端事件可能发生在测试之外 (如运行结束时停止服务)，只记录测试期间的
+                if self.test is not None:
+                    self.backend_events.append(event)
+                return
+            if self.test is None:
+                return
+            if kind == "test_end":
+                test, requests, remote = self.test, self.requests, self.remote
+                backend_events, slots, in_flight = self.backend_events, self.slots, self.in_flight
+                self._reset(None)
+            elif kind == "request_start":
+                slot = self.slots.setdefault(event["thread"], len(self.slots))
+                self.requests[event["id"]] = {"start": event["t"], "slot": slot, "tokens": []}
+                self.active += 1
+                self.in_flight.append((event["t"], self.active))
+                return
+            elif kind == "request_end" and event.get("id") is None:
+                self.remote.append(event)
+                return
+            else:
+                request = self.requests.get(event.get("id"))
+                if request is None:
+                    return
+                if kind == "token":
+                    request["tokens"].append(event["t"])
+                elif kind in ("connect", "first_byte"):
+                    request[kind] = event["t"]
+                elif kind == "request_end":
+                    request["end"] = event["t"]
+                    request["result"] = {
+                        k: event.get(k) for k in ("success", "ttft", "tpot", "token_count", "error")
+                    }
+                    self.active -= 1
+                    self.in_flight.append((event["t"], self.active))
+                return
+
+        # 测试结束: 在锁外生成并写出文件
+        self.write(test, requests, remote, backend_events, slots, in_flight, event["t"])
+
+    def write(self, test, requests, remote, backend_events, slots, in_flight, end_time) -> Optional[str]:
+        """生成一个测试的时间线文件"""
+        name = test.get("test")
+        t0 = test["t"]
+
+        def us(t):
+            return round((t - t0) * 1e6, 1)
+
+        events = [
+            {"ph": "M", "pid": REQUESTS_PID, "name": "process_name", "args": {"name": f"{name} 请求"}},
+            {"ph": "M", "pid": BACKEND_PID, "name": "process_name", "args": {"name": f"{test.get('backend')} 后端"}},
+            {"ph": "M", "pid": BACKEND_PID, "tid": 0, "name": "thread_name", "args": {"name": "生命周期"}},
+        ]
+        for slot in sorted(set(slots.values())):
+            events.append(
+                {"ph": "M", "pid": REQUESTS_PID, "tid": slot, "name": "thread_name", "args": {"name": f"并发槽 {slot}"}}
+            )
+
+        for request_id, r in sorted(requests.items(), key=lambda item: item[1]["start"]):
+            start, slot = r["start"], r["slot"]
+            end = r.get("end", end_time)
+            result = r.get("result") or {"success": False, "error": "测试结束时未完成"}
+            tokens = r["tokens"]
+            base = {"pid": REQUESTS_PID, "tid": slot}
+            events.append(
+                dict(base, ph="X", name=f"请求 {request_id}", cat="request", ts=us(start),
+                     dur=us(end) - us(start), args=dict(result, id=request_id, tokens=len(tokens)))
+            )
+            # 请求内的阶段
+            phases = []
+            connect = r.get("connect")
+            if connect:
+                phases.append(("connect", start, connect))
+            if tokens:
+                phases.append(("prefill", connect or start, tokens[0]))
+                phases.append(("decode", tokens[0], end))
+            for phase, begin, finish in phases:
+                events.append(
+                    dict(base, ph="X", name=phase, cat="phase", ts=us(begin), dur=max(0.0, us(finish) - us(begin)))
+                )
+            if r.get("first_byte"):
+                events.append(dict(base, ph="i", s="t", name="first_byte", cat="marker", ts=us(r["first_byte"])))
+            if tokens:
+                events.append(dict(base, ph="i", s="t", name="first_token", cat="marker", ts=us(tokens[0])))
+            if self.tokens:
+                for index, t in enumerate(tokens[1:], 1):
+                    events.append(
+                        dict(base, ph="i", s="t", name="token", cat="token", ts=us(t),
+                             args={"index": index, "gap_ms": round((t - tokens[index - 1]) * 1000, 3)})
+                    )
+            events.append(dict(base, ph="i", s="t", name="complete", cat="marker", ts=us(end)))
+
+        # 服务器端压测代理的请求没有逐token事件，按完成时间与总耗时还原区间
+        if remote:
+            events.append(
+                {"ph": "M", "pid": REQUESTS_PID, "tid": len(slots), "name": "thread_name", "args": {"name": "压测代理"}}
+            )
+            for e in remote:
+                total = e.get("total_time") or 0.0
+                events.append(
+                    {"ph": "X", "pid": REQUESTS_PID, "tid": len(slots), "name": "请求", "cat": "request",
+                     "ts": us(e["t"] - total), "dur": round(total * 1e6, 1),
+                     "args": {k: e.get(k) for k in ("success", "ttft", "tpot", "token_count", "error")}}
+                )
+
+        for t, count in in_flight:
+            events.append(
+                {"ph": "C", "pid": REQUESTS_PID, "name": "进行中请求", "ts": us(t), "args": {"in_flight": count}}
+            )
+
+        events.extend(self._backend_events(backend_events, us))
+        events.extend(self._log_events(t0, us))
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, trace_filename(name))
+        trace = {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"test": name, "backend": test.get("backend"), "start_time": t0},
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(trace, f, ensure_ascii=False, separators=(",", ":"), default=str)
+        os.replace(tmp_path, path)
+        print(f"请求时间线已保存: {path} ({len(requests) + len(remote)} 个请求)")
+        return path
+
+    @staticmethod
+    def _backend_events(backend_events, us) -> List[Dict[str, Any]]:
+        """后端生命周期: 部署到就绪为区间，冷启动阶段为子区间，其余为瞬时事件"""
+        events = []
+        base = {"pid": BACKEND_PID, "tid": 0}
+        deploy_start = None
+        for e in backend_events:
+            kind = e.get("event")
+            if kind == "deploy":
+                deploy_start = e["t"]
+            elif kind in ("ready", "deploy_failed") and deploy_start is not None:
+                events.append(
+                    dict(base, ph="X", name=f"部署 {e.get('backend')}", cat="backend",
+                         ts=us(deploy_start), dur=us(e["t"]) - us(deploy_start), args={"result": kind})
+                )
+                # 冷启动各阶段按顺序排列在部署区间内
+                startup = e.get("startup") or {}
+                offset = deploy_start
+                for phase, seconds in (startup.get("phases") or {}).items():
+                    events.append(
+                        dict(base, ph="X", name=phase, cat="startup", ts=us(offset), dur=round(seconds * 1e6, 1))
+                    )
+                    offset += seconds
+                deploy_start = None
+            events.append(dict(base, ph="i", s="p", name=kind, cat="backend", ts=us(e["t"])))
+        return events
+
+    def _log_events(self, t0, us) -> List[Dict[str, Any]]:
+        """测试期间后端日志中的周期统计 (计数器) 与告警 (瞬时事件)"""
+        if self.telemetry_history is None:
+            return []
+        try:
+            log = self.telemetry_history(t0)
+        except Exception as e:
+            print(f"读取后端日志事件失败: {e}")
+            return []
+        if not log:
+            return []
+        events = []
+        for stats in log.get("stats", []):
+            values = {k: stats[k] for k in COUNTER_FIELDS if k in stats}
+            if values:
+                events.append({"ph": "C", "pid": BACKEND_PID, "name": "后端统计", "ts": us(stats["t"]), "args": values})
+        for warning in log.get("warnings", []):
+            events.append(
+                {"ph": "i", "s": "p", "pid": BACKEND_PID, "tid": 0, "name": "warning", "cat": "log",
+                 "ts": us(warning["t"]), "args": {"line": warning.get("line")}}
+            )
+        return events
+
+    def start(self):
+        self.hub.subscribe(self.on_event)
+
+    def stop(self):
+        self.hub.unsubscribe(self.on_event)
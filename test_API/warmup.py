@@ -0,0 +1,153 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Callable, Optional
+
+import numpy as np
+
+# 自动判断稳定时默认观察的指标
+STEADY_METRICS = ["ttft", "throughput"]
+
+
+def is_steady(values: List[float], window: int, tolerance: float) -> bool:
+    """
+    判断一个指标是否已进入稳态
+
+    比较最近两个滚动窗口的中位数，相对变化不超过 tolerance 时认为已稳定
+
+    Args:
+        values: 按完成顺序排列的指标值
+        window: 窗口大小 (请求数)
+        tolerance: 允许的相对变化，如 0.1 表示 10%
+
+    Returns:
+        样本不足两个窗口时返回False
+    """
+    if len(values) < 2 * window:
+        return False
+    recent = float(np.median(values[-window:]))
+    previous = float(np.median(values[-2 * window:-window]))
+    if previous == 0:
+        return recent == 0
+    return abs(recent - previous) / abs(previous) <= tolerance
+
+
+class WarmupPhase:
+    """
+    正式测量前的预热阶段
+
+    部署后的首批请求包含 CUDA graph 捕获、JIT 编译与各类缓存的预热，
+    预热请求在相同并发度下发送，结果单独保存，不计入汇总统计。结束条件 (全部满足):
+        - 至少发送 requests 个请求
+        - 至少持续 duration 秒
+        - auto 为True时，滚动窗口内的 TTFT / 吞吐量 (metrics) 均已稳定，
+          或达到 max_requests / max_duration 上限
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Args:
+            config: warmup 配置段:
+                - requests: 固定的预热请求数 (默认0)
+                - duration: 预热的最短时间 (秒，默认0)
+                - auto: 是否自动判断稳态 (默认False)
+                - window: 稳态判断的滚动窗口 (请求数，默认5)
+                - tolerance: 相邻两个窗口中位数允许的相对变化 (默认0.1)
+                - metrics: 判断稳态的指标 (默认 ttft 与 throughput)
+                - max_requests: 自动模式下最多的预热请求数 (默认100)
+                - max_duration: 自动模式下最长的预热时间 (秒，默认300)
+        """
+        self.requests = int(config.get("requests", 0))
+        self.duration = float(config.get("duration", 0))
+        self.auto = bool(config.get("auto", False))
+        self.window = max(1, int(config.get("window", 5)))
+        self.tolerance = config.get("tolerance", 0.1)
+        self.metrics = config.get("metrics", STEADY_METRICS)
+        self.max_requests = int(config.get("max_requests", 100))
+        self.max_duration = float(config.get("max_duration", 300))
+        self.lock = threading.Lock()
+        self.results: List[Dict[str, Any]] = []
+        self.issued = 0
+        self.start = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests > 0 or self.duration > 0 or self.auto
+
+    def steady(self) -> bool:
+        """全部有数据的指标均已稳定 (没有任何指标有数据时为False)"""
+        succeeded = [r for r in self.results if r.get("success")]
+        checked = False
+        for metric in self.metrics:
+            values = [r[metric] for r in succeeded if r.get(metric) is not None]
+            if not values:
+                continue  # 如非流式请求没有TTFT
+            if not is_steady(values, self.window, self.tolerance):
+                return False
+            checked = True
+        return checked
+
+    def _finished(self) -> Optional[str]:
+        """预热已满足结束条件时返回原因"""
+        elapsed = time.time() - self.start
+        if self.issued < self.requests or elapsed < self.duration:
+            return None
+        if not self.auto:
+            return "fixed"
+        if self.steady():
+            return "steady"
+        if self.issued >= self.max_requests or elapsed >= self.max_duration:
+            return "limit"
+        return None
+
+    def run(
+        self,
+        send: Callable[[int], Dict[str, Any]],
+        concurrency: int = 1,
+        stop: Callable[[], bool] = None,
+    ) -> Dict[str, Any]:
+        """
+        发送预热请求直到满足结束条件
+
+        Args:
+            send: 发送第 n 个预热请求并返回结果的函数
+            concurrency: 并发度 (与正式测试相同)
+            stop: 返回True时提前结束 (如测试被中止)
+
+        Returns:
+            预热摘要: requests / succeeded / duration / reason (fixed / steady / limit / stopped)
+            以及 steady (结束时是否已稳定)
+        """
+        self.start = time.time()
+        reason = None
+
+        def worker():
+            nonlocal reason
+            while True:
+                with self.lock:
+                    if reason is None and stop and stop():
+                        reason = "stopped"
+                    if reason is None:
+                        reason = self._finished()
+                    if reason is not None:
+                        return
+                    index = self.issued
+                    self.issued += 1
+                result = send(index)
+                with self.lock:
+                    self.results.append(result)
+
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                for future in [executor.submit(worker) for _ in range(concurrency)]:
+                    future.result()
+        else:
+            worker()
+
+        return {
+            "requests": len(self.results),
+            "succeeded": sum(1 for r in self.results if r.get("success")),
+            "duration": time.time() - self.start,
+            "reason": reason,
+            "steady": self.steady(),
+        }